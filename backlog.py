@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+# Net change of the open backlog per (day, severity): +1 for every issue created that day, -1 for every issue closed.
+# Events of separate partitions merge by summing, like the other aggregates.
+def events(df_open, df_close):
+    closed = df_close[df_close["IssueClosedDate"].notnull()]
+    frame = pd.concat(
+        [
+            pd.DataFrame({"Date": df_open["IssueCreatedAt"], "Severity": df_open["Severity"], "Change": 1}),
+            pd.DataFrame({"Date": df_close["IssueCreatedAt"], "Severity": df_close["Severity"], "Change": 1}),
+            pd.DataFrame({"Date": closed["IssueClosedDate"], "Severity": closed["Severity"], "Change": -1}),
+        ]
+    )
+    frame["Date"] = pd.to_datetime(frame["Date"]).dt.normalize()
+    changes = frame.groupby(["Date", "Severity"], observed=True)["Change"].sum()
+    return changes[changes != 0]
+
+
+# Sweep-line over the backlog events: sorted once by day, then a cumulative sum per severity gives the number of
+# open issues at the end of every day with an event. Any other day is answered by a binary search for the last
+# event day before it. Works for any (day, column) events, columns listed in order come first.
+class Backlog:
+    def __init__(self, events, order=()):
+        table = events.unstack(-1, fill_value=0).sort_index()
+        table.columns = [str(c) for c in table.columns]
+        first = [c for c in order if c in table.columns]
+        table = table[first + [c for c in table.columns if c not in first]]
+        self.dates = table.index.values.astype("datetime64[D]")
+        self.columns = list(table.columns)
+        self.open = np.cumsum(table.values, axis=0)
+
+    # Open issues per column at the end of the given day
+    def as_of(self, date):
+        i = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date).date(), "D"), side="right") - 1
+        counts = self.open[i] if i >= 0 else np.zeros(len(self.columns), dtype=self.open.dtype)
+        return pd.Series(counts, index=self.columns)
+
+    # Open issues per column for every day of [start, end], by default from the first event day
+    def daily(self, start=None, end=None):
+        if len(self.dates) == 0:
+            return pd.DataFrame(columns=self.columns)
+        start = self.dates[0] if start is None else np.datetime64(pd.Timestamp(start).date(), "D")
+        end = self.dates[-1] if end is None else np.datetime64(pd.Timestamp(end).date(), "D")
+        days = np.arange(start, end + np.timedelta64(1, "D"), dtype="datetime64[D]")
+        i = np.searchsorted(self.dates, days, side="right") - 1
+        counts = np.where((i >= 0)[:, None], self.open[np.maximum(i, 0)], 0)
+        return pd.DataFrame(counts, index=pd.DatetimeIndex(days, name="Date"), columns=self.columns)
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+# Named sizes accepted by --rows
+SIZES = {"10k": 10000, "100k": 100000, "1M": 1000000, "10M": 10000000}
+
+# Value distributions of the synthetic export, loosely following Analytics_data.csv
+SEVERITIES = {"Major": 0.78, "Not Assigned": 0.1, "Minor": 0.05, "Medium": 0.03, "Blocker": 0.03, "Critical": 0.01}
+LABELS = {
+    " [Auto_Created;Clair;security]": 0.35,
+    " [Anchore;Auto_Created;security]": 0.15,
+    " [APIFuzztest;Auto_Created;security]": 0.12,
+    " [security;vams]": 0.1,
+    " [bug]": 0.15,
+    " [Auto_Created;performance]": 0.08,
+    " [documentation]": 0.05,
+}
+TITLES = ["AutoCreated: Issue ", "Anchore: Issue", "Nessus: Issue", "APIFuzz: Issue"]
+
+
+def choice(rng, distribution, size):
+    values = np.array(list(distribution), dtype=object)
+    p = np.array(list(distribution.values()), dtype=float)
+    return values[rng.choice(len(values), size=size, p=p / p.sum())]
+
+
+# Rows generated and written at a time, so that not even the 10M row export is held in memory at once
+CHUNK_ROWS = 250000
+
+
+# Synthetic issue tracker export with the CSV schema of Analytics_data.csv, generated in frames of up to chunksize rows.
+# Issues are created over the two years before today_date, about 80% are closed after a long tailed delay,
+# and a few hundred assignees get issues with a Zipf like skew (some issues have no assignee).
+def generate_issues(rows, today_date=None, seed=0, chunksize=CHUNK_ROWS):
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(pd.to_datetime(main.as_of(today_date), format="%d-%m-%Y").date(), "D")
+
+    # Format each day of the two years once instead of every row
+    first = today - np.timedelta64(729, "D")
+    days = pd.date_range(pd.Timestamp(first), pd.Timestamp(today))
+    created_days = np.asarray(days.strftime("%d/%m/%Y"), dtype=object)
+    closed_days = np.asarray(days.strftime("%Y-%m-%d"), dtype=object)
+
+    assignee_count = max(10, int(np.sqrt(rows)))
+    assignees = np.array(["Assignee {:04d}".format(i) for i in range(assignee_count)], dtype=object)
+
+    for start in range(0, rows, chunksize):
+        size = min(chunksize, rows - start)
+        created = today - rng.integers(0, 730, size).astype("timedelta64[D]")
+        closed = rng.random(size) < 0.8
+        closed_at = np.minimum(created + rng.geometric(1 / 25, size).astype("timedelta64[D]"), today)
+
+        assignee = assignees[np.minimum(rng.zipf(1.5, size) - 1, assignee_count - 1)]
+        assignee[rng.random(size) < 0.02] = np.nan
+
+        yield pd.DataFrame(
+            {
+                "Git Issue Id": np.arange(1000 + start, 1000 + start + size),
+                "Title": np.array(TITLES, dtype=object)[rng.integers(0, len(TITLES), size)],
+                "Labels": choice(rng, LABELS, size),
+                "State": np.where(closed, " closed", " opened"),
+                "AssigneeName": assignee,
+                "IssueCreatedAt": created_days[(created - first).astype(np.int64)],
+                "IssueClosedDate": np.where(closed, closed_days[(closed_at - first).astype(np.int64)], np.nan),
+                "Severity": choice(rng, SEVERITIES, size),
+            }
+        )
+
+
+# Write the synthetic export chunk by chunk, only one chunk is in memory at a time
+def write_issues(path, rows, seed=0):
+    for number, chunk in enumerate(generate_issues(rows, seed=seed)):
+        chunk.to_csv(path, sep=";", index=False, header=number == 0, mode="w" if number == 0 else "a")
+
+
+# Time one stage and, when tracemalloc is running, record the peak memory it allocated on top of what was held before
+def measure(results, stage, rows, function, *args):
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        held = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    peak_mb = (tracemalloc.get_traced_memory()[1] - held) / 2 ** 20 if tracing else None
+    results.append({"stage": stage, "rows": rows, "seconds": seconds, "peak_mb": peak_mb})
+    return value
+
+
+# Table callback through the Dash server, as the browser would request a page of violated issues
+def request_table_page(client, sort_by):
+    inputs = [
+        ("dropdown", "value", "violated"),
+        ("scope", "data", {"labels": [], "projects": [], "version": 0}),
+        ("main-table", "page_current", 0),
+        ("main-table", "page_size", 25),
+        ("main-table", "sort_by", sort_by),
+        ("main-table", "filter_query", ""),
+    ]
+    body = {
+        "output": "..main-table.data...main-table.page_count..",
+        "outputs": [{"id": "main-table", "property": "data"}, {"id": "main-table", "property": "page_count"}],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "changedPropIds": ["dropdown.value"],
+    }
+    return client.post("/_dash-update-component", json=body)
+
+
+# Figure callback through the Dash server, as the browser requests every scoped figure after a filter change
+def request_scoped_figures(client, filters):
+    import run
+
+    graphs = [run.KPI_GRAPHS[name] for name in run.SCOPED_FIGURES]
+    scope = run.scope_data(filters=filters)
+    body = {
+        "output": "..{}..".format("...".join("{}.figure".format(graph) for graph in graphs)),
+        "outputs": [{"id": graph, "property": "figure"} for graph in graphs],
+        "inputs": [{"id": "scope", "property": "data", "value": scope}],
+        "changedPropIds": ["scope.data"],
+    }
+    return client.post("/_dash-update-component", json=body)
+
+
+# Run every pipeline stage against a synthetic export of the given number of rows
+def run_benchmark(rows, results, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "issues.csv")
+        measure(results, "generate", rows, write_issues, path, rows, seed)
+        # Chunked ingestion of exports larger than memory (KPI_CHUNK_SIZE), then the in-memory pipeline
+        chunksize = main.CHUNK_SIZE or 100000
+        measure(results, "stream_aggregates", rows, main.stream_aggregates, path, main.today_date, chunksize)
+        security_data, df_open, df_close = measure(
+            results, "load_issues", rows, main.load_issues, path, main.today_date
+        )
+
+    n = len(df_close)
+    measure(results, "business_days", n, main.business_days, df_close["IssueCreatedAt"], df_close["IssueClosedDate"])
+    aggregates = measure(
+        results, "issue_aggregates", len(security_data), main.issue_aggregates, security_data, df_open, df_close
+    )
+    main.publish(aggregates, (security_data, df_open, df_close))
+    measure(results, "openIssuesFilter", len(df_open), main.openIssuesFilter)
+    measure(results, "closedIssuesFilter", n, main.closedIssuesFilter)
+
+    # Cross-filters: the index is built once per dataset, every filter change then queries it
+    measure(results, "issue_query", len(security_data), main.issue_query)
+    created = security_data["IssueCreatedAt"]
+    filters = {
+        "start": created.quantile(0.25),
+        "end": created.quantile(0.75),
+        "severities": ["Critical", "Major", "Medium"],
+        "states": ["opened", "closed"],
+    }
+    measure(results, "filtered_aggregates", len(security_data), main.filtered_aggregates, None, filters)
+
+    # What-if targets: the issue days are sorted once, every slider move then counts against them
+    measure(results, "target_simulator", len(security_data), main.target_simulator)
+    targets = {severity: (warn + 3, limit + 7) for severity, (warn, limit) in main.KPI_TARGETS.items()}
+    measure(results, "whatIfKPITargets", len(security_data), main.whatIfKPITargets, targets)
+
+    import run
+
+    for name, function in run.KPI_FIGURES.items():
+        measure(results, name, len(security_data), function)
+
+    client = run.server.test_client()
+    at_risk = len(main.aggregates["at_risk"])
+    measure(results, "display_table", at_risk, request_table_page, client, [])
+    sort_by = [{"column_id": "Title", "direction": "asc"}]
+    measure(results, "display_table sorted", at_risk, request_table_page, client, sort_by)
+    # A filter change end to end: the filtered aggregates (cached above, so another selection) and every scoped figure
+    filters = dict(filters, severities=["Critical", "Major"])
+    measure(results, "display_label_scope filtered", len(security_data), request_scoped_figures, client, filters)
+
+
+# Cold start of the dashboard in a fresh interpreter: until run.py is imported and the server can bind,
+# then the first page load, which loads the dataset and builds the figures
+STARTUP_SCRIPT = """
+import json, time
+import run
+bound = time.time()
+run.server.test_client().get("/_dash-layout")
+print(json.dumps({"bound": bound, "first_layout": time.time() - bound}))
+"""
+
+
+def measure_startup(results, budget):
+    start = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    bind = timings["bound"] - start
+    results.append({"stage": "startup bind", "rows": None, "seconds": bind, "peak_mb": None})
+    results.append({"stage": "startup first layout", "rows": None, "seconds": timings["first_layout"], "peak_mb": None})
+    return bind <= budget
+
+
+def parse_rows(value):
+    return SIZES[value] if value in SIZES else int(value)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile the KPI pipeline on synthetic exports")
+    parser.add_argument("--rows", nargs="+", default=["10k"], help="row counts or sizes ({})".format(", ".join(SIZES)))
+    parser.add_argument("--memory", action="store_true", help="record peak memory per stage with tracemalloc (slower)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results to this CSV file")
+    parser.add_argument("--startup", action="store_true", help="also time the cold start of the dashboard")
+    parser.add_argument("--startup-budget", type=float, default=1.5, help="seconds until the server can bind")
+    args = parser.parse_args(argv)
+    # Creation dates are parsed month-first as the dashboard always has, pandas warns about every day-first one
+    warnings.filterwarnings("ignore", message="Parsing dates in DD/MM/YYYY format", category=UserWarning)
+
+    if args.memory:
+        tracemalloc.start()
+    results = []
+    # The cold start is timed in its own interpreter, unaffected by what this one has imported
+    within_budget = measure_startup(results, args.startup_budget) if args.startup else None
+    for rows in args.rows:
+        run_benchmark(parse_rows(rows), results, args.seed)
+
+    df = pd.DataFrame(results)
+    print(df.to_string(index=False, float_format=lambda x: "{:.4f}".format(x)))
+    if within_budget is not None:
+        print("Startup budget of {}s: {}".format(args.startup_budget, "met" if within_budget else "exceeded"))
+    if args.output:
+        df.to_csv(args.output, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    main_cli(sys.argv[1:])
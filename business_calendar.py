@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+# Working days of the week (Monday first) and public holidays per region.
+# Extend a region's holidays here or load them from a file with load_holidays.
+CALENDARS = {
+    "default": {"weekmask": "1111100", "holidays": []},
+}
+
+
+# Add holidays from a ";" separated file with "Region" and "Date" columns to CALENDARS
+def load_holidays(path):
+    df = pd.read_csv(path, delimiter=";", parse_dates=["Date"])
+    for region, dates in df.groupby("Region")["Date"]:
+        calendar = CALENDARS.setdefault(region, {"weekmask": CALENDARS["default"]["weekmask"], "holidays": []})
+        calendar["holidays"] = sorted(set(calendar["holidays"]) | set(dates.dt.strftime("%Y-%m-%d")))
+
+
+# Business days of one region as a cumulative count over a date range.
+# count(start, end) equals np.busday_count(start, end) but is two array lookups and a subtraction.
+# The range grows (by at least a year on each side) whenever dates outside of it are asked for.
+# The first date and the counts are published together as one table, so that threads counting while another one
+# grows the range never pair the first date of one table with the counts of another.
+class BusinessCalendar:
+    def __init__(self, weekmask="1111100", holidays=()):
+        self.weekmask = weekmask
+        self.holidays = list(holidays)
+        self.busdaycalendar = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+        self.table = None
+
+    # (first, cumulative) covering [first, last], cumulative[i] is the number of business days in [first, first + i)
+    def extend(self, first, last):
+        table = self.table
+        if table is not None:
+            start, cumulative = table
+            if first >= start and last < start + len(cumulative) - 1:
+                return table
+            first = min(first, start)
+            last = max(last, start + len(cumulative) - 2)
+        first = first - np.timedelta64(366, "D")
+        last = last + np.timedelta64(366, "D")
+        days = np.arange(first, last + np.timedelta64(1, "D"), dtype="datetime64[D]")
+        cumulative = np.concatenate([[0], np.cumsum(np.is_busday(days, busdaycal=self.busdaycalendar))])
+        self.table = (first, cumulative)
+        return self.table
+
+    # Business days in [start, end) for datetime64[D] arrays without NaT.
+    # Like np.busday_count, when end < start the days in (end, start] are counted negatively.
+    def count(self, start, end):
+        if len(start) == 0:
+            return np.zeros(0, dtype=np.int64)
+        first, cumulative = self.extend(min(start.min(), end.min()), max(start.max(), end.max()))
+        shift = (end < start).astype(np.int64)
+        i = (start - first).astype(np.int64) + shift
+        j = (end - first).astype(np.int64) + shift
+        return cumulative[j] - cumulative[i]
+
+    # Same as np.busday_offset with this calendar's weekmask and holidays
+    def offset(self, dates, offsets, roll="forward"):
+        return np.busday_offset(dates, offsets, roll=roll, busdaycal=self.busdaycalendar)
+
+    # First date on which issues created on the given days are `days` business days old, i.e. the first date with
+    # count(created, date) >= days: the day after their days-th business day, the creation day itself for 0 days
+    def first_aged(self, created, days):
+        created = np.asarray(created, dtype="datetime64[D]")
+        created, days = np.broadcast_arrays(created, np.asarray(days, dtype=np.int64))
+        result = created.copy()
+        later = days > 0
+        result[later] = self.offset(created[later], days[later] - 1) + np.timedelta64(1, "D")
+        return result
+
+
+def business_calendar(region="default"):
+    return BusinessCalendar(**CALENDARS[region])
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+# Directory holding the cached frames, next to the CSV export
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".kpi_cache")
+
+# Bump when the parsing pipeline in main.py changes so that old caches are rebuilt
+CACHE_VERSION = 2
+
+
+# Hash the source file in blocks so that large exports never sit in memory at once
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Identify a source file by its size, modification time and content hash
+def fingerprint(path, key=None):
+    stat = os.stat(path)
+    return {
+        "version": CACHE_VERSION,
+        "key": key,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": file_hash(path),
+    }
+
+
+# Compare a stored fingerprint with the source file.
+# Size and mtime are checked first, the file is only re-hashed when the size matches but the mtime moved.
+def is_fresh(stored, path, key=None):
+    if stored.get("version") != CACHE_VERSION or stored.get("key") != key:
+        return False
+    stat = os.stat(path)
+    if stat.st_size != stored.get("size"):
+        return False
+    if stat.st_mtime == stored.get("mtime"):
+        return True
+    return file_hash(path) == stored.get("sha256")
+
+
+def frame_path(cache_dir, name):
+    return os.path.join(cache_dir, name + ".feather")
+
+
+def fingerprint_path(cache_dir):
+    return os.path.join(cache_dir, "fingerprint.json")
+
+
+# Write a file next to its destination first so a crash never leaves a half written cache behind.
+# Every writer gets a temporary file of its own: processes writing the same file at once (server workers, jobs) never
+# remove or swap in each other's, the last complete one wins.
+def atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_fingerprint(stored, cache_dir=CACHE_DIR):
+    def dump(path):
+        with open(path, "w") as f:
+            json.dump(stored, f)
+
+    atomic_write(fingerprint_path(cache_dir), dump)
+
+
+# Store the frames as Feather files (the index is kept as a column).
+# The old fingerprint is dropped first and the new one written last, so partial writes are never trusted.
+def write_frames(frames, names, stored, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(fingerprint_path(cache_dir)):
+        os.remove(fingerprint_path(cache_dir))
+    for name, df in zip(names, frames):
+        atomic_write(frame_path(cache_dir, name), df.reset_index().to_feather)
+    write_fingerprint(stored, cache_dir)
+
+
+# Read the frames back, restoring the index and NaN (Arrow returns None) in string columns
+def read_frames(names, cache_dir=CACHE_DIR):
+    frames = []
+    for name in names:
+        df = pd.read_feather(frame_path(cache_dir, name)).set_index("index").rename_axis(None)
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].notnull(), np.nan)
+        frames.append(df)
+    return tuple(frames)
+
+
+def read_fingerprint(cache_dir=CACHE_DIR):
+    try:
+        with open(fingerprint_path(cache_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Return the frames built by build() for the given source file, served from the cache while the file is unchanged.
+# key holds any other input the frames depend on (e.g. the reporting date).
+# Without pyarrow, or with an unreadable cache, the frames are simply rebuilt.
+def cached_frames(build, source, key=None, names=(), cache_dir=CACHE_DIR):
+    names = list(names)
+    stored = read_fingerprint(cache_dir)
+    if stored and is_fresh(stored, source, key):
+        try:
+            frames = read_frames(names, cache_dir)
+        except (ImportError, OSError, ValueError, KeyError):
+            pass
+        else:
+            # Remember the new mtime so that a touched but unchanged file is hashed only once
+            mtime = os.stat(source).st_mtime
+            if stored["mtime"] != mtime:
+                stored["mtime"] = mtime
+                write_fingerprint(stored, cache_dir)
+            return frames
+
+    frames = build()
+    try:
+        write_frames(frames, names, fingerprint(source, key), cache_dir)
+    except (ImportError, OSError, ValueError):
+        pass
+    return frames
@@ -0,0 +1,117 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+# Sorted schedule of the dates on which open issues cross their KPI thresholds.
+# An issue becomes about_to_violate once it is `warn` business days old and violated one day past `limit`.
+def transition_schedule(df_open):
+    warn, limit = main.kpi_thresholds(df_open["Severity"])
+    created = df_open["IssueCreatedAt"].values.astype("datetime64[D]")
+    ids = df_open["Git Issue Id"].values
+
+    parts = []
+    for days, target in ((warn, "about_to_violate"), (limit + 1, "violated")):
+        known = ~np.isnan(days) & ~np.isnat(created)
+        parts.append(
+            pd.DataFrame(
+                {
+                    "date": main.calendar.first_aged(created[known], days[known].astype(int)),
+                    "Git Issue Id": ids[known],
+                    "Target": target,
+                }
+            )
+        )
+    return pd.concat(parts, ignore_index=True).sort_values("date", kind="mergesort", ignore_index=True)
+
+
+# Reporting date the open issues of df_open are aged as of (see split_issues), today_date when there are none
+def aged_as_of(df_open):
+    if len(df_open):
+        return np.datetime64(df_open["Today_Date"].iloc[0], "D")
+    return np.datetime64(datetime.strptime(main.today_date, "%d-%m-%Y").date(), "D")
+
+
+# Moves the reporting date of the open issues forward.
+# Only issues whose scheduled transitions fall between the old and the new date are reclassified and re-aggregated.
+# Frames published by anyone else (e.g. a reload) replace the schedule on the next advance.
+class LiveClock:
+    def __init__(self):
+        with main.publish_lock:
+            self.rebuild()
+
+    # Schedule the transitions of the published open issues, from the date they are aged as of
+    def rebuild(self):
+        self.version = main.version
+        self.today = aged_as_of(main.df_open)
+        self.schedule = transition_schedule(main.df_open)
+        self.dates = self.schedule["date"].values
+        # Transitions before this position have already been applied
+        self.position = np.searchsorted(self.dates, self.today, side="right")
+
+    # Transitions on dates in (current today, today], found with a binary search on the schedule
+    def due(self, today):
+        end = np.searchsorted(self.dates, today, side="right")
+        due = self.schedule.iloc[self.position : end]
+        self.position = max(self.position, end)
+        return due
+
+    # Advance to today and publish the reclassified aggregates, returns the number of reclassified issues
+    def advance(self, today=None):
+        today = np.datetime64(datetime.today().date() if today is None else today, "D")
+        with main.publish_lock:
+            if main.version != self.version:
+                self.rebuild()
+            if today <= self.today:
+                return 0
+            ids = self.due(today)["Git Issue Id"].unique()
+            self.today = today
+            main.today_date = pd.Timestamp(today).strftime("%d-%m-%Y")
+
+            # Issues the one year window moved past leave the frames and the aggregates
+            frames, aggregates, expired = main.expire_issues(
+                (main.security_data, main.df_open, main.df_close), main.aggregates, main.window_start(main.today_date)
+            )
+            security_data, aged, df_close = frames
+            ids = ids[np.isin(ids, aged["Git Issue Id"].values)]
+
+            df_open = aged.copy()
+            df_open["Today_Date"] = pd.Timestamp(today)
+            df_open["bussinessDays"] = main.business_days(df_open["IssueCreatedAt"], df_open["Today_Date"])
+            if len(ids) == 0 and expired == 0:
+                # No target changed, the aggregates (and the indexes and jobs built on them) stay as they are
+                main.publish_ages((security_data, df_open, df_close))
+                return 0
+
+            # Retract the old classification of the transitioned issues and add the new one
+            no_security = security_data.iloc[:0]
+            no_close = df_close.iloc[:0]
+            old = main.issue_aggregates(no_security, aged[aged["Git Issue Id"].isin(ids)], no_close)
+            new = main.issue_aggregates(no_security, df_open[df_open["Git Issue Id"].isin(ids)], no_close)
+            at_risk = aggregates["at_risk"]
+            current = dict(aggregates, at_risk=at_risk[~at_risk["Git Issue Id"].isin(ids)])
+            aggregates = main.merge_aggregates([current, main.negate_aggregates(old), new])
+            main.publish(aggregates, (security_data, df_open, df_close))
+            self.version = main.version
+            return len(ids)
+
+
+# Advance the clock every interval seconds in a daemon thread so figures age without a restart.
+# The clock is set up in the thread, as it needs the loaded issue frames (there are none to age in some modes).
+def start_refresher(interval=600):
+    def run():
+        if main.df_open is None:
+            return
+        clock = LiveClock()
+        while True:
+            time.sleep(interval)
+            clock.advance()
+
+    thread = threading.Thread(target=run, name="kpi-clock", daemon=True)
+    thread.start()
+    return thread
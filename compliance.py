@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+import main
+
+# Closing day of issues that are still open, after any day a report is made for
+NEVER = np.datetime64("9999-12-31", "D")
+
+
+# Transitions of every row as (row, day, target code, +1 / -1) arrays, target codes index
+# main.OPEN_TARGETS + main.CLOSED_TARGETS. An open issue enters normal on its creation day, moves on when its business
+# day age crosses the (warn, limit) thresholds of its severity and leaves on its closing day, from which on it counts
+# as hit or miss (outcome). Rows without thresholds have no transitions.
+def transitions(created, closed, warn, limit, outcome):
+    created = np.asarray(created, dtype="datetime64[D]")
+    closed = np.asarray(closed, dtype="datetime64[D]")
+    warn = np.asarray(warn, dtype=float)
+    limit = np.asarray(limit, dtype=float)
+    outcome = np.asarray(outcome, dtype=object)
+
+    rows = np.flatnonzero(~np.isnat(created) & ~np.isnan(warn) & ~np.isnan(limit))
+    created, closed, warn, limit, outcome = created[rows], closed[rows], warn[rows], limit[rows], outcome[rows]
+
+    # Ages are whole business days: about to violate from an age of ceil(warn), violated above limit
+    end = np.where(np.isnat(closed), NEVER, closed)
+    about = main.calendar.first_aged(created, np.ceil(warn).astype(np.int64))
+    violated = main.calendar.first_aged(created, np.floor(limit).astype(np.int64) + 1)
+    bounds = [created, np.maximum(about, created), np.maximum(violated, about), end]
+
+    parts = []
+    for code, target in enumerate(main.OPEN_TARGETS):
+        start = np.minimum(bounds[code], end)
+        stop = np.minimum(bounds[code + 1], end)
+        entered = start < stop
+        left = entered & (stop < NEVER)
+        parts.append((rows[entered], start[entered], code, 1))
+        parts.append((rows[left], stop[left], code, -1))
+    for code, target in enumerate(main.CLOSED_TARGETS, len(main.OPEN_TARGETS)):
+        reached = (outcome == target) & (end < NEVER)
+        parts.append((rows[reached], end[reached], code, 1))
+
+    return (
+        np.concatenate([p[0] for p in parts]),
+        np.concatenate([p[1] for p in parts]),
+        np.concatenate([np.full(len(p[0]), p[2], dtype=np.int8) for p in parts]),
+        np.concatenate([np.full(len(p[0]), p[3], dtype=np.int64) for p in parts]),
+    )
+
+
+# Net change of the open normal / about_to_violate / violated counts and of the closed hit / miss counts per
+# (day, target), see transitions. weight counts rows that stand for several issues.
+# Events of separate partitions merge by summing, like the backlog events.
+def events(created, closed, warn, limit, outcome, weight=None):
+    rows, dates, targets, changes = transitions(created, closed, warn, limit, outcome)
+    if weight is not None:
+        changes = changes * np.asarray(weight, dtype=np.int64)[rows]
+    frame = pd.DataFrame(
+        {
+            "Date": pd.DatetimeIndex(dates),
+            "Target": pd.Categorical.from_codes(targets, categories=main.OPEN_TARGETS + main.CLOSED_TARGETS),
+            "Change": changes,
+        }
+    )
+    changes = frame.groupby(["Date", "Target"], observed=True)["Change"].sum()
+    return changes[changes != 0]
+
+
+# Open issues per target and closed issues hit / missed so far for every day of [start, end],
+# plus the hit rate (in %) of the issues closed so far
+def daily(swept, start, end):
+    df = swept.daily(start, end).reindex(columns=main.OPEN_TARGETS + main.CLOSED_TARGETS, fill_value=0)
+    closed = df["hit"] + df["miss"]
+    df["hit_rate"] = (100 * df["hit"] / closed.where(closed > 0)).round(1)
+    return df
@@ -0,0 +1,151 @@
+import argparse
+import functools
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+import plotly.offline
+
+import main
+import projects
+
+
+# KPI figures written for every date, by name of their function in main.py
+FIGURES = [
+    "issuesTimeChart",
+    "openIssuesWithAssignee",
+    "openCriticalIssues",
+    "openIssuesSeverityKPITargets",
+    "openCriticalIssuesWithAssignee",
+    "closedIssuesKPITargets",
+    "closedIssuesSeverityKPITargets",
+    "averageIssueResolutionTime",
+    "totalOpenIssues",
+    "openBacklog",
+    "kpiComplianceOverTime",
+    "resolutionTimePercentiles",
+]
+
+
+# Raw export of one file, read at most once per worker process
+@functools.lru_cache(maxsize=None)
+def read_export(path):
+    return pd.read_csv(path, **main.CSV_OPTIONS)
+
+
+# The export as it stood at the end of the given day: issues created later are left out and
+# issues closed later are open again. Issues exist from the creation date the closed issue KPIs count from (see
+# closed_issue_dates): the month-first parse of filter_security_issues puts day-first dates such as 09/01/2020
+# (9 January) after the reporting dates they were created before.
+def as_of_export(file_df, date):
+    created = main.parse_distinct(pd.to_datetime, file_df["IssueCreatedAt"].rename("created"))
+    kpi_created, closed = main.parse_distinct(
+        main.closed_issue_dates, created.rename("created"), file_df["IssueClosedDate"]
+    )
+    existing = ((kpi_created <= date) | (closed <= date)).values
+    file_df = file_df[existing].copy()
+    reopened = (closed[existing] > date).values
+    file_df.loc[reopened, "State"] = " opened"
+    file_df.loc[reopened, "IssueClosedDate"] = np.nan
+    return file_df
+
+
+# Worker: write every KPI figure as of one date to <output>/<date>[/<project>] as HTML and JSON, plus the at-risk table.
+# The HTML pages load plotly.js from <output>/plotly.min.js (written by write_plotlyjs) unless cdn is set.
+# Returns the number of security issues in the report.
+def export_snapshot(date, project, paths, output, cdn=False):
+    today_date = date.strftime("%d-%m-%Y")
+    # The figures read the reporting date from main, each worker process reports one date at a time
+    main.today_date = today_date
+    file_df = pd.concat([read_export(path) for path in paths], ignore_index=True)
+    security_data, df_open, df_close = main.prepare_issues(as_of_export(file_df, date), today_date)
+    if security_data.empty:
+        return 0
+
+    scope = main.issue_aggregates(security_data, df_open, df_close)
+    directory = os.path.join(output, date.strftime("%Y-%m-%d"), project or "")
+    os.makedirs(directory, exist_ok=True)
+    include_plotlyjs = "cdn" if cdn else os.path.relpath(os.path.join(output, PLOTLYJS), directory)
+    for name in FIGURES:
+        figure = go.Figure(getattr(main, name)(scope))
+        path = os.path.join(directory, name)
+        with open(path + ".json", "w") as f:
+            f.write(pio.to_json(figure))
+        pio.write_html(figure, path + ".html", include_plotlyjs=include_plotlyjs)
+    scope["at_risk"].to_csv(os.path.join(directory, "at_risk.csv"), index=False)
+    return len(security_data)
+
+
+# One copy of plotly.js shared by every page of the reports, so that they also open offline
+PLOTLYJS = "plotly.min.js"
+
+
+def write_plotlyjs(output):
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, PLOTLYJS), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+
+
+# As-of dates from the command line: explicit dates and/or every freq between the two dates of a range
+def report_dates(dates=(), date_range=None, freq="7D"):
+    result = [pd.Timestamp(d) for d in dates]
+    if date_range:
+        result.extend(pd.date_range(date_range[0], date_range[1], freq=freq))
+    return sorted(set(result))
+
+
+# One task per date for all exports together and, with per_project, one more per date and project
+def snapshot_tasks(dates, sources=None, per_project=False):
+    paths = projects.source_files(sources) if sources else [main.CSV_FILE]
+    if not paths:
+        raise ValueError("No exports found for {}".format(sources))
+    tasks = [(date, None, paths) for date in dates]
+    if per_project and len(paths) > 1:
+        for project, path in zip(projects.project_names(paths), paths):
+            tasks.extend((date, project, [path]) for date in dates)
+    return tasks
+
+
+# Creation dates are parsed month-first as the dashboard always has, pandas warns about every day-first one.
+# Set in the CLI and in every worker, which start without the CLI's warning filters.
+def ignore_date_warnings():
+    warnings.filterwarnings("ignore", message="Parsing dates in DD/MM/YYYY format", category=UserWarning)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Write the KPI figures as of a list of dates to static HTML and JSON")
+    parser.add_argument("dates", nargs="*", help="as-of dates (YYYY-MM-DD)")
+    parser.add_argument("--range", nargs=2, metavar=("START", "END"), help="also every --freq from START to END")
+    parser.add_argument("--freq", default="7D", help="pandas frequency of --range (default: 7D)")
+    parser.add_argument("--sources", help="directory or glob of exports (default: {})".format(main.CSV_FILE))
+    parser.add_argument("--per-project", action="store_true", help="also write one report per export")
+    parser.add_argument("--output", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--cdn", action="store_true", help="load plotly.js from its CDN instead of a local copy")
+    args = parser.parse_args(argv)
+    ignore_date_warnings()
+
+    output = args.output
+    dates = report_dates(args.dates, args.range, args.freq)
+    if not dates:
+        parser.error("no dates given")
+    tasks = snapshot_tasks(dates, args.sources, args.per_project)
+    if not args.cdn:
+        write_plotlyjs(output)
+
+    with projects.process_pool(args.workers, ignore_date_warnings) as pool:
+        futures = [
+            pool.submit(export_snapshot, date, project, paths, output, args.cdn)
+            for date, project, paths in tasks
+        ]
+        for (date, project, _), future in zip(tasks, futures):
+            issues = future.result()
+            print("{} {}: {} security issues".format(date.date(), project or "all", issues))
+
+
+if __name__ == "__main__":
+    main_cli(sys.argv[1:])
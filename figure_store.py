@@ -0,0 +1,72 @@
+import gzip
+import hashlib
+import json
+import threading
+
+import flask
+import plotly
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# One serialized payload: the JSON body, its compressed variants and a content based ETag.
+# The ETag only depends on the content, so every gunicorn worker hands out the same one.
+class Payload:
+    def __init__(self, value):
+        self.value = value
+        self.body = json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode("utf-8")
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.encoded = {"gzip": gzip.compress(self.body)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body)
+
+    # Response for the current flask request: 304 when the client already has it, else the best accepted encoding
+    def response(self):
+        if self.etag in flask.request.if_none_match:
+            response = flask.Response(status=304)
+        else:
+            accepted = flask.request.accept_encodings
+            encoding = next((e for e in ("br", "gzip") if e in self.encoded and accepted[e]), None)
+            response = flask.Response(self.encoded.get(encoding, self.body), mimetype="application/json")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+        response.set_etag(self.etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+# Builds every payload once per dataset version and keeps it serialized and compressed until the version changes
+class FigureStore:
+    def __init__(self, builders, version):
+        self.builders = builders
+        self.version = version
+        self.payloads = {}
+        # Reentrant because the layout payload builds the figure payloads it contains
+        self.lock = threading.RLock()
+
+    def payload(self, name):
+        version = self.version()
+        cached = self.payloads.get(name)
+        if cached is None or cached[0] != version:
+            with self.lock:
+                cached = self.payloads.get(name)
+                if cached is None or cached[0] != version:
+                    cached = self.payloads[name] = (version, Payload(self.builders[name]()))
+        return cached[1]
+
+    # The figure itself, e.g. to place it in the layout
+    def figure(self, name):
+        return self.payload(name).value
+
+    # Serve the payloads of the store from GET <url>/<name>
+    def register(self, server, url):
+        def serve(name):
+            if name not in self.builders:
+                flask.abort(404)
+            return self.payload(name).response()
+
+        server.add_url_rule(url + "/<name>", "figure_store", serve)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pandas as pd
+
+import main
+
+
+# Keep security_data, df_open, df_close and the KPI aggregates up to date with a growing export.
+# Every refresh re-reads the CSV but only parses, classifies and aggregates the issues that are new
+# (Git Issue Id above the watermark) or whose row changed since the last refresh (e.g. opened -> closed).
+# Without a today_date new issues are aged as of main.today_date at the time of the refresh.
+class IncrementalIssues:
+    def __init__(self, path=main.CSV_FILE, today_date=None):
+        self.path = path
+        self.fixed_date = today_date
+        self.reset()
+
+    def reset(self):
+        # Highest Git Issue Id seen so far and a hash of the last seen row of every issue
+        self.watermark = None
+        self.row_hashes = pd.Series(dtype="uint64")
+        self.security_data = None
+        self.df_open = None
+        self.df_close = None
+        self.aggregates = None
+        self.published = False
+
+    @property
+    def today_date(self):
+        return self.fixed_date or main.today_date
+
+    # Split the export into new/changed rows and the ids of issues that changed or disappeared
+    def delta(self, file_df):
+        ids = file_df["Git Issue Id"]
+        row_hashes = pd.Series(pd.util.hash_pandas_object(file_df, index=False).values, index=ids.values)
+        if self.watermark is None:
+            return file_df, pd.Index([]), row_hashes
+
+        # Rows above the watermark are new, older ones are compared against their last seen hash
+        new = (ids > self.watermark).values
+        seen = self.row_hashes.reindex(ids[~new].values).values
+        changed = row_hashes.values[~new] != seen
+        delta = new.copy()
+        delta[~new] = changed
+
+        removed = self.row_hashes.index.difference(row_hashes.index)
+        retracted = pd.Index(ids[~new][changed].values).append(removed)
+        return file_df[delta], retracted, row_hashes
+
+    # Take the rows of the given issues out of the frames and return their aggregates
+    def retract(self, ids):
+        frames = []
+        for df in (self.security_data, self.df_open, self.df_close):
+            gone = df["Git Issue Id"].isin(ids)
+            frames.append((df[~gone], df[gone]))
+        (self.security_data, old_security), (self.df_open, old_open), (self.df_close, old_close) = frames
+        if old_security.empty:
+            return None
+        return main.negate_aggregates(main.issue_aggregates(old_security, old_open, old_close))
+
+    # Bring the frames and aggregates up to date with the export (read from path unless given), returns the number of
+    # issues added, changed, removed or expired
+    def refresh(self, file_df=None):
+        file_df = pd.read_csv(self.path, **main.CSV_OPTIONS) if file_df is None else file_df
+        delta, retracted, row_hashes = self.delta(file_df)
+        start = main.window_start(self.today_date)
+
+        parts = []
+        expired = 0
+        if self.aggregates is not None:
+            # Issues the one year window moved past since the last refresh leave the frames and aggregates first
+            frames = (self.security_data, self.df_open, self.df_close)
+            frames, self.aggregates, expired = main.expire_issues(frames, self.aggregates, start)
+            self.security_data, self.df_open, self.df_close = frames
+            # at_risk holds rows rather than counts, so retracted issues are dropped from it directly
+            at_risk = self.aggregates["at_risk"]
+            parts.append(dict(self.aggregates, at_risk=at_risk[~at_risk["Git Issue Id"].isin(retracted)]))
+            retraction = self.retract(retracted)
+            if retraction is not None:
+                parts.append(retraction)
+
+        security_delta = main.filter_security_issues(delta, start)
+        if not security_delta.empty:
+            open_delta, close_delta = main.split_issues(security_delta, self.today_date)
+            parts.append(main.issue_aggregates(security_delta, open_delta, close_delta))
+            if self.security_data is None:
+                self.security_data, self.df_open, self.df_close = security_delta, open_delta, close_delta
+            else:
+                self.security_data = main.concat_frames([self.security_data, security_delta])
+                self.df_open = main.concat_frames([self.df_open, open_delta])
+                self.df_close = main.concat_frames([self.df_close, close_delta])
+
+        if parts:
+            self.aggregates = main.merge_aggregates(parts)
+
+        self.row_hashes = row_hashes
+        self.watermark = file_df["Git Issue Id"].max()
+        return len(retracted.union(delta["Git Issue Id"])) + expired
+
+    # Take over what was published since the last refresh_and_publish. The same issues aged by the live clock are
+    # adopted with its ages, anything else (e.g. a reload of the export) makes the next refresh start over.
+    def follow(self):
+        if not self.published or main.aggregates is self.aggregates and main.df_open is self.df_open:
+            return
+        if main.security_data is self.security_data:
+            self.df_open, self.aggregates = main.df_open, main.aggregates
+        else:
+            self.reset()
+
+    # Refresh and hand the result to the KPI functions in main
+    def refresh_and_publish(self):
+        file_df = pd.read_csv(self.path, **main.CSV_OPTIONS)
+        with main.publish_lock:
+            self.follow()
+            count = self.refresh(file_df)
+            if count and self.aggregates is not None:
+                main.publish(self.aggregates, (self.security_data, self.df_open, self.df_close))
+                self.published = True
+        return count
+
+
+# Refresh the dashboard from the export every interval seconds in a daemon thread (KPI_REFRESH_INTERVAL).
+# Only the frames kept in memory can be refreshed incrementally, there is nothing to refresh in the other modes.
+def start_refresher(interval):
+    def run():
+        if main.df_open is None:
+            return
+        issues = IncrementalIssues()
+        while True:
+            issues.refresh_and_publish()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="kpi-refresh", daemon=True)
+    thread.start()
+    return thread
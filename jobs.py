@@ -0,0 +1,309 @@
+import atexit
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+
+import cache
+import main
+import projects
+
+# Job store shared by every server process, results are pickled next to it
+JOBS_DATABASE = os.environ.get("KPI_JOBS_DATABASE", os.path.join(cache.CACHE_DIR, "jobs.sqlite"))
+RESULTS_DIR = os.path.join(os.path.dirname(JOBS_DATABASE), "jobs")
+
+# Worker processes running the jobs, KPI_JOB_WORKERS defaults to two so that the server keeps its cores
+JOB_WORKERS = int(os.environ.get("KPI_JOB_WORKERS", 2))
+
+# Seconds a queued or running job may go without progress before it is failed, e.g. after its server process died
+JOB_TIMEOUT = float(os.environ.get("KPI_JOB_TIMEOUT", 1800))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, state);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (kind, state, updated);
+"""
+
+# Job states, a job is queued until a worker picks it up and ends done or failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+# Jobs in a SQLite file: workers report their progress to it and every server process polls it, no broker needed.
+# A result is written to its own file first and the job only marked done after the file is in place.
+class JobStore:
+    def __init__(self, database=JOBS_DATABASE, timeout=JOB_TIMEOUT):
+        self.database = database
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(database) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.database, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, kind, key):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, key, state, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, QUEUED, now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join("{} = ?".format(name) for name in fields)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("UPDATE jobs SET {} WHERE id = ?".format(columns), list(fields.values()) + [job_id])
+
+    # Fail a job that is not finished yet, e.g. one whose worker died
+    def fail(self, job_id, error, message="Failed"):
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, message = ?, error = ?, updated = ? WHERE id = ? AND state IN (?, ?)",
+                (FAILED, message, error, time.time(), job_id, QUEUED, RUNNING),
+            )
+
+    # The job as a dict, None for unknown ids. A job without progress for timeout seconds is failed first.
+    def get(self, job_id):
+        now = time.time()
+        error = "No progress for {:g} seconds".format(self.timeout)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, message = ?, error = ?, updated = ? "
+                "WHERE id = ? AND state IN (?, ?) AND updated < ?",
+                (FAILED, "Timed out", error, now, job_id, QUEUED, RUNNING, now - self.timeout),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    # Latest job of the given key finished after the given time, None if there is none
+    def find_done(self, key, since=0):
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE key = ? AND state = ? AND updated > ? ORDER BY updated DESC LIMIT 1",
+                (key, DONE, since),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    # Latest job of a kind finished after the given time, None if there is none
+    def latest_done(self, kind, since=0):
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND state = ? AND updated > ? ORDER BY updated DESC LIMIT 1",
+                (kind, DONE, since),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    # Write the result file, then mark the job done: readers never see a done job without its complete result
+    def publish(self, job_id, result):
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, job_id + ".pickle")
+
+        def dump(tmp):
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        cache.atomic_write(path, dump)
+        self.update(job_id, state=DONE, progress=1.0, message="Done", result=path)
+
+    def load(self, job):
+        with open(job["result"], "rb") as f:
+            return pickle.load(f)
+
+
+# Worker initializer: take over the dataset of the server at the time the pool was started. Workers start without it
+# (see projects.process_pool) and would otherwise load the export as of the import-time today_date.
+def adopt_dataset(today_date, frames, by_project, aggregates):
+    main.today_date = today_date
+    main.swap(aggregates, frames, by_project)
+
+
+# Aggregates of a label or project selection (its main.scope_key), computed from the worker's copy of the data
+def scope_job(key, report):
+    report(0.1, "Selecting issues")
+    if key[0] == "projects":
+        result = main.project_aggregates(key[1:])
+    else:
+        result = main.label_aggregates(key[1:])
+    report(0.9, "Saving the aggregates")
+    return result
+
+
+# The export read and aggregated again from scratch as of the given reporting date, e.g. after it was replaced.
+# The date is passed along as the worker's main.today_date may be older than the server's.
+def reload_job(params, report):
+    report(0.1, "Loading the export")
+    frames, by_project, aggregates = main.load_dataset(params[0])
+    report(0.9, "Saving the aggregates")
+    return {"frames": frames, "by_project": by_project, "aggregates": aggregates, "today_date": params[0]}
+
+
+JOB_KINDS = {"scope": scope_job, "reload": reload_job}
+
+
+# Worker: run one job and record its progress, result or error in the store
+def run_job(database, job_id, kind, params):
+    store = JobStore(database)
+
+    def report(progress, message):
+        store.update(job_id, state=RUNNING, progress=progress, message=message)
+
+    try:
+        report(0.0, "Started")
+        store.publish(job_id, JOB_KINDS[kind](params, report))
+    except Exception:
+        store.update(job_id, state=FAILED, message="Failed", error=traceback.format_exc())
+
+
+# Runs heavy recomputations in a local process pool, off the request threads of the server.
+# Jobs are identified by their kind, parameters and the dataset they are computed from, so that repeated requests
+# for the same result share one job and finished results are reused by every server process.
+class JobRunner:
+    def __init__(self, store=None, workers=JOB_WORKERS):
+        self.store = store or JobStore()
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_version = None
+        # Pool found broken by a dead worker, replaced on the next submit
+        self.broken = None
+        # Latest job submitted by this process per key
+        self.pending = {}
+        self.results = {}
+        self.started = time.time()
+        self.reloaded = None
+        self.synced = 0.0
+        atexit.register(self.shutdown)
+
+    # Identifies the dataset a job is computed from: the export, its settings and the reload it came from
+    def dataset(self):
+        return "{}|{}|{}".format(main.cache_key(), self.reloaded, main.version)
+
+    def job_key(self, kind, params):
+        return json.dumps([kind, params, self.dataset()], sort_keys=True)
+
+    # Workers hold a copy of the dataset the pool was started with, so the pool is started again once it changed
+    # or when it broke
+    def executor(self):
+        if self.pool is None or self.pool_version != main.version or self.pool is self.broken:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+            with main.publish_lock:
+                main.load()
+                frames = (main.security_data, main.df_open, main.df_close)
+                dataset = (main.today_date, frames, main.by_project, main.aggregates)
+                self.pool_version = main.version
+            self.pool = projects.process_pool(self.workers, adopt_dataset, dataset)
+        return self.pool
+
+    # Run a job in the pool. The job is failed when its worker never reports back (it was killed, ran out of
+    # memory, ...), the pool such a worker breaks is replaced.
+    def start(self, job_id, kind, params):
+        try:
+            future = self.executor().submit(run_job, self.store.database, job_id, kind, params)
+        except BrokenProcessPool:
+            self.broken = self.pool
+            future = self.executor().submit(run_job, self.store.database, job_id, kind, params)
+        pool = self.pool
+
+        def finished(future):
+            if future.cancelled():
+                self.store.fail(job_id, None, "Cancelled")
+                return
+            error = future.exception()
+            if error is None:
+                return
+            if isinstance(error, BrokenProcessPool):
+                self.broken = pool
+            self.store.fail(job_id, "".join(traceback.format_exception(type(error), error, error.__traceback__)))
+
+        future.add_done_callback(finished)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # Id of the job computing kind with params: a running one or, with reuse, one finished since this process started
+    # (the export may have changed before), else a new one
+    def submit(self, kind, params, reuse=True):
+        key = self.job_key(kind, params)
+        with self.lock:
+            job_id = self.pending.get(key)
+            if job_id is not None and self.store.get(job_id)["state"] not in (DONE, FAILED):
+                return job_id
+            done = self.store.find_done(key, self.started) if reuse else None
+            if done is not None:
+                return done["id"]
+            job_id = self.store.create(kind, key)
+            self.pending[key] = job_id
+            self.start(job_id, kind, params)
+            return job_id
+
+    def status(self, job_id):
+        return self.store.get(job_id)
+
+    # Result of a finished job, read from its file once per process
+    def result(self, job):
+        if job["id"] not in self.results:
+            if len(self.results) >= 8:
+                self.results.clear()
+            self.results[job["id"]] = self.store.load(job)
+        return self.results[job["id"]]
+
+    # Aggregates of a label or project selection: the current ones, already computed in this process or by a
+    # finished job, else computed in the request as a last resort
+    def scope_aggregates(self, selected_labels=None, selected_projects=None):
+        key = main.scope_key(selected_labels, selected_projects)
+        if key is not None and key not in main.scope_cache()["aggregates"]:
+            done = self.store.find_done(self.job_key("scope", key), self.started)
+            if done is not None:
+                main.scope_cache()["aggregates"][key] = self.result(done)
+        return main.scoped_aggregates(selected_labels, selected_projects)
+
+    # Job computing the aggregates of a selection, None when they are at hand without one
+    def submit_scope(self, selected_labels=None, selected_projects=None):
+        key = main.scope_key(selected_labels, selected_projects)
+        if key is None or key in main.scope_cache()["aggregates"]:
+            return None
+        return self.submit("scope", key)
+
+    # Publish the dataset of the latest reload job finished since this process started, unless it already did
+    def adopt_reload(self):
+        job = self.store.latest_done("reload", self.started)
+        if job is None or job["id"] == self.reloaded:
+            return False
+        result = self.result(job)
+        with main.publish_lock:
+            self.reloaded = job["id"]
+            main.today_date = result["today_date"]
+            main.publish(result["aggregates"], result["frames"], result["by_project"])
+        return True
+
+    # Adopt finished reloads at most every interval seconds, cheap enough to run before every request
+    def sync(self, interval=2.0):
+        now = time.monotonic()
+        if now - self.synced < interval:
+            return False
+        self.synced = now
+        return self.adopt_reload()
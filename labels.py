@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+# Labels of one "Labels" cell of the export, e.g. " [APIFuzztest;Auto_Created;security]"
+def split_labels(text):
+    if not isinstance(text, str):
+        return []
+    return [label.strip() for label in text.strip().strip("[]").split(";") if label.strip()]
+
+
+# Multi-hot label index of a "Labels" column.
+# Every distinct label combination is parsed once into a bitmask over the label vocabulary, rows point to their
+# combination through the categorical codes, so any label query is a bitwise test over the combinations and a gather.
+class LabelIndex:
+    def __init__(self, labels):
+        if not pd.api.types.is_categorical_dtype(labels):
+            labels = labels.astype("category")
+        combinations = [split_labels(c) for c in labels.cat.categories]
+        self.vocabulary = sorted(set(label for combination in combinations for label in combination))
+        self.positions = {label: i for i, label in enumerate(self.vocabulary)}
+        words = max(1, -(-len(self.vocabulary) // 64))
+
+        # One row of 64 bit words per combination, plus an empty last row for missing labels (code -1)
+        self.bits = np.zeros((len(combinations) + 1, words), dtype=np.uint64)
+        for i, combination in enumerate(combinations):
+            self.bits[i] = self.query_bits(combination)
+        self.codes = labels.cat.codes.values
+
+    # Bitmask of a set of labels, None when one of them never occurs
+    def query_bits(self, names):
+        bits = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for name in names:
+            if name not in self.positions:
+                return None
+            position = self.positions[name]
+            bits[position // 64] |= np.uint64(1) << np.uint64(position % 64)
+        return bits
+
+    # Rows carrying all labels of all_of and, if given, at least one label of any_of
+    def mask(self, all_of=(), any_of=()):
+        match = np.ones(len(self.bits), dtype=bool)
+        if all_of:
+            bits = self.query_bits(all_of)
+            match = np.zeros(len(self.bits), dtype=bool) if bits is None else ((self.bits & bits) == bits).all(axis=1)
+        if any_of:
+            bits = self.query_bits([name for name in any_of if name in self.positions])
+            match &=((self.bits & bits) != 0).any(axis=1)
+        return match[self.codes]
@@ -1,177 +1,747 @@
-import dash
-import dash_core_components as dcc
 import plotly.graph_objs as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
+import os
+import threading
 from datetime import datetime, timedelta
 
+import backlog
+import business_calendar
+import cache
+import compliance
+import labels
+import metrics
+import projects
+import query
+import resolution
+import sqlite_backend
+import timeseries
+import whatif
 
-# Reading CSV file 
-file_df = pd.read_csv("Analytics_data.csv", delimiter=";", error_bad_lines=False, skip_blank_lines=False,)
 
-# Filter only security data from file
-security_data = file_df[file_df["Labels"].str.contains("security")]
+# Source export and the options it is parsed with
+CSV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Analytics_data.csv")
+CSV_OPTIONS = dict(delimiter=";", on_bad_lines="skip", skip_blank_lines=False)
+
+# Set KPI_CHUNK_SIZE to a number of rows to stream exports larger than memory instead of loading them at once
+CHUNK_SIZE = int(os.environ.get("KPI_CHUNK_SIZE", 0))
+
+# Set KPI_SOURCES to a directory or glob of exports, one per project, to ingest them in parallel into one dashboard.
+# KPI_WORKERS caps the number of worker processes (default: one per core).
+SOURCES = os.environ.get("KPI_SOURCES")
+WORKERS = int(os.environ.get("KPI_WORKERS", 0)) or None
+
+# Set KPI_BACKEND=sqlite to load the export into a local SQLite database (KPI_DATABASE) and compute the KPIs in SQL
+BACKEND = os.environ.get("KPI_BACKEND", "pandas")
+DATABASE = os.environ.get("KPI_DATABASE", os.path.join(cache.CACHE_DIR, "issues.sqlite"))
+
+# Set KPI_LIVE_CLOCK=1 to report as of the real current date and age open issues while the server runs
+LIVE_CLOCK = os.environ.get("KPI_LIVE_CLOCK") == "1"
+
+# Set KPI_REFRESH_INTERVAL to a number of seconds to pick up changes of the export every so often, only the issues
+# that were added or changed since the last refresh are parsed and aggregated again (see incremental.py)
+REFRESH_INTERVAL = float(os.environ.get("KPI_REFRESH_INTERVAL", 0))
+
+# Region whose working week and holidays count as business days, KPI_HOLIDAYS_FILE adds holidays per region
+REGION = os.environ.get("KPI_REGION", "default")
+if os.environ.get("KPI_HOLIDAYS_FILE"):
+    business_calendar.load_holidays(os.environ["KPI_HOLIDAYS_FILE"])
+calendar = business_calendar.business_calendar(REGION)
+
+# Labels an issue must carry to be part of the dashboard, KPI_LABELS takes a comma separated list
+SCOPE_LABELS = os.environ.get("KPI_LABELS", "security").split(",")
 
-# Filter: Show only a year old data
 # prev_year = pd.to_datetime((datetime.today() - timedelta(days=366)))
-today_date ="03-07-2020"
-start = datetime.strptime(today_date, "%d-%m-%Y") #string to date
-prev_year = pd.to_datetime(start - timedelta(days=366))
+today_date = datetime.today().strftime("%d-%m-%Y") if LIVE_CLOCK else "03-07-2020"
 
-security_data.loc[:, "IssueCreatedAt"] = pd.to_datetime(security_data["IssueCreatedAt"])
-security_data = security_data.loc[(security_data["IssueCreatedAt"] >= prev_year)]
 
+# The given reporting date, or the current today_date (the live clock and reloads move it after import)
+def as_of(today=None):
+    return today or today_date
 
-# Replace Nan values of column "AssigneeName" with "No assignee"
-security_data["AssigneeName"] = security_data["AssigneeName"].fillna("No Assignee")
 
-# Filter: Show only State="opened" data
-open_issues = security_data["State"].str.strip() == "opened"
-df_open = security_data[open_issues]
+# Filter: Show only a year old data
+def window_start(today_date):
+    start = datetime.strptime(today_date, "%d-%m-%Y") #string to date
+    return pd.to_datetime(start - timedelta(days=366))
 
-# Filter: Show only State="closed" data
-closed_issues = security_data["State"].str.strip() == "closed"
-df_close = security_data[closed_issues]
 
-# Logic to calculate business days by ignoring NaTs value and insert Nan where we cannot calculate businessdays
+# Logic to calculate business days by ignoring NaTs value and insert Nan where we cannot calculate businessdays.
+# Business days follow the region's calendar and are looked up in its cumulative business day index.
+@metrics.timed("business_days")
 def business_days(start, end):
     mask = pd.notnull(start) & pd.notnull(end)
     start = start.values.astype("datetime64[D]")[mask]
     end = end.values.astype("datetime64[D]")[mask]
     result = np.empty(len(mask), dtype=float)
-    result[mask] = np.busday_count(start, end)
+    result[mask] = calendar.count(start, end)
     result[~mask] = np.nan
     return result
 
 
-# Convert string to pandas date time format for open issues dataframe
-df_open.loc[:, "Today_Date"] = pd.to_datetime(today_date, format="%d-%m-%Y") # Can add current date 
-df_open.loc[:, "IssueCreatedAt"] = pd.to_datetime(df_open["IssueCreatedAt"])
+# Severity levels shown in the KPI charts, in display order
+SEVERITY_LEVELS = ["Critical", "Blocker", "Major", "Medium", "Minor", "Not Assigned"]
 
-# Add a column in Open issues dataframe of name bussinessdays to calculate number of days between currentdate and Issue creation date
-df_open.loc[:, "bussinessDays"] = business_days(df_open["IssueCreatedAt"], df_open["Today_Date"])
+# Issue states after stripping the stray whitespace of the export
+STATES = ["opened", "closed"]
 
-# Sanatize date format for closed issues
-df_close.loc[:, "IssueClosedDate"] = pd.to_datetime(
-    df_close["IssueClosedDate"], dayfirst=False, yearfirst=True
-)
-df_close.loc[:, "IssueCreatedAt"] = pd.to_datetime(df_close["IssueCreatedAt"], dayfirst=True, yearfirst=True)
-df_close.loc[:, "IssueCreatedAt"] = df_close["IssueCreatedAt"].dt.strftime("%d-%m-%Y")
-df_close.loc[:, "IssueClosedDate"] = df_close["IssueClosedDate"].dt.strftime("%Y-%m-%d")
+OPEN_TARGETS = ["normal", "about_to_violate", "violated"]
+CLOSED_TARGETS = ["hit", "miss"]
 
-# Convert string to pandas date time format for closed issues dataframe
-df_close.loc[:, "IssueClosedDate"] = pd.to_datetime(df_close["IssueClosedDate"])
-df_close.loc[:, "IssueCreatedAt"] = pd.to_datetime(df_close["IssueCreatedAt"])
 
-# Add a column in Open issues dataframe of name bussinessdays to calculate number of days between IssueClosedDate and Issue creation date
-df_close.loc[:, "days_to_KPI_target"] = business_days(df_close["IssueCreatedAt"], df_close["IssueClosedDate"])
+# Categorical with the given categories first, values outside of them are appended in sorted order instead of lost
+def fixed_categorical(values, categories):
+    extra = sorted(set(values.dropna().unique()) - set(categories))
+    return pd.Categorical(values, categories=categories + extra)
 
-# Filter Open Issues as per their KPI targets
-def openIssuesFilter():
-    df = df_open
-    df.loc[
-        (
-            (df["bussinessDays"].between(7, 14))
-            & (
-                (df["Severity"] == "Major")
-                | (df["Severity"] == "Critical")
-                | (df["Severity"] == "Blocker")
-            )
-        ),
-        "Target",
-    ] = "about_to_violate"
 
-    df.loc[((df["bussinessDays"].between(83, 90)) & (df["Severity"] == "Medium")), "Target",] = "about_to_violate"
+# Compact dtypes of the issue frames: categories with fixed orders for severity and state,
+# data driven categories for assignees and labels and int32 ids. Groupbys and masks then run on integer codes.
+def apply_schema(df):
+    df["Git Issue Id"] = df["Git Issue Id"].astype(np.int32)
+    df["State"] = fixed_categorical(df["State"].astype(str).str.strip(), STATES)
+    df["Severity"] = fixed_categorical(df["Severity"], SEVERITY_LEVELS)
+    df["AssigneeName"] = df["AssigneeName"].astype("category")
+    df["Labels"] = df["Labels"].astype("category")
+    return df
 
-    df.loc[((df["bussinessDays"].between(358, 365)) & (df["Severity"] == "Minor")), "Target",] = "about_to_violate"
 
-    df.loc[
-        (
-            (df["bussinessDays"] > 14)
-            & (
-                (df["Severity"] == "Major")
-                | (df["Severity"] == "Critical")
-                | (df["Severity"] == "Blocker")
-            )
-        ),
-        "Target",
-    ] = "violated"
-
-    df.loc[((df["bussinessDays"] > 90) & (df["Severity"] == "Medium")), "Target"] = "violated"
-    df.loc[((df["bussinessDays"] > 365) & (df["Severity"] == "Minor")), "Target"] = "violated"
-
-    df.loc[
-        (
-            (df["bussinessDays"] < 7)
-            & (
-                (df["Severity"] == "Major")
-                | (df["Severity"] == "Critical")
-                | (df["Severity"] == "Blocker")
-            )
-        ),
-        "Target",
-    ] = "normal"
+# Concatenate issue frames, unifying the categories of categorical columns so they stay categorical
+def concat_frames(frames):
+    frames = [df for df in frames if df is not None]
+    for column in frames[0].columns:
+        if all(pd.api.types.is_categorical_dtype(df[column]) for df in frames):
+            categories = pd.api.types.union_categoricals([df[column].values for df in frames]).categories
+            frames = [df.assign(**{column: df[column].cat.set_categories(categories)}) for df in frames]
+    return pd.concat(frames)
 
-    df.loc[((df["bussinessDays"] < 83) & (df["Severity"] == "Medium")), "Target"] = "normal"
 
-    df.loc[((df["bussinessDays"] < 358) & (df["Severity"] == "Minor")), "Target"] = "normal"
+# Filter only security data (issues carrying all SCOPE_LABELS) created after prev_year from a raw export (or a chunk of it)
+@metrics.timed("filter_security_issues")
+def filter_security_issues(file_df, prev_year):
+    index = labels.LabelIndex(file_df["Labels"])
+    security_data = file_df[index.mask(all_of=SCOPE_LABELS)].copy()
 
-    return df
+    security_data.loc[:, "IssueCreatedAt"] = pd.to_datetime(security_data["IssueCreatedAt"])
+    security_data = security_data.loc[(security_data["IssueCreatedAt"] >= prev_year)]
+
+    # Replace Nan values of column "AssigneeName" with "No assignee"
+    security_data["AssigneeName"] = security_data["AssigneeName"].fillna("No Assignee")
+    return apply_schema(security_data)
+
+
+# Parse every distinct value (or pair of values) once, exports repeat the same few hundred dates over and over
+def parse_distinct(parse, *columns):
+    frame = pd.concat(columns, axis=1)
+    codes = frame.groupby(list(frame.columns), sort=False, dropna=False).ngroup().values
+    distinct = frame.drop_duplicates()
+    parsed = parse(*(distinct[c] for c in distinct.columns))
+    if isinstance(parsed, tuple):
+        return tuple(pd.Series(p.values[codes], index=frame.index) for p in parsed)
+    return pd.Series(parsed.values[codes], index=frame.index)
+
+
+# Creation and closing dates of closed issues as the closed issue KPIs count them
+def closed_issue_dates(created, closed):
+    # Sanatize date format for closed issues
+    closed = pd.to_datetime(closed, dayfirst=False, yearfirst=True)
+    created = pd.to_datetime(created, dayfirst=True, yearfirst=True)
+    created = created.dt.strftime("%d-%m-%Y")
+    closed = closed.dt.strftime("%Y-%m-%d")
 
+    # Convert string to pandas date time format for closed issues dataframe
+    return pd.to_datetime(created), pd.to_datetime(closed)
 
-# Filter Closed Issues as per their KPI targets
+
+# Split security data into open and closed issues and compute their business days
+@metrics.timed("split_issues")
+def split_issues(security_data, today_date):
+    # Filter: Show only State="opened" data
+    open_issues = security_data["State"] == "opened"
+    df_open = security_data[open_issues].copy()
+
+    # Filter: Show only State="closed" data
+    closed_issues = security_data["State"] == "closed"
+    df_close = security_data[closed_issues].copy()
+
+    # Convert string to pandas date time format for open issues dataframe
+    df_open["Today_Date"] = pd.to_datetime(today_date, format="%d-%m-%Y") # Can add current date 
+    df_open.loc[:, "IssueCreatedAt"] = pd.to_datetime(df_open["IssueCreatedAt"])
+
+    # Add a column in Open issues dataframe of name bussinessdays to calculate number of days between currentdate and Issue creation date
+    df_open["bussinessDays"] = business_days(df_open["IssueCreatedAt"], df_open["Today_Date"]).astype(np.float32)
+
+    df_close["IssueCreatedAt"], df_close["IssueClosedDate"] = closed_issue_dates(
+        df_close["IssueCreatedAt"], df_close["IssueClosedDate"]
+    )
+
+    # Add a column in Open issues dataframe of name bussinessdays to calculate number of days between IssueClosedDate and Issue creation date
+    days = business_days(df_close["IssueCreatedAt"], df_close["IssueClosedDate"])
+    df_close["days_to_KPI_target"] = days.astype(np.float32)
+    return df_open, df_close
+
+
+# Read the CSV file and build security_data, df_open and df_close from scratch
+@metrics.timed("load_issues")
+def load_issues(path=CSV_FILE, today_date=None):
+    return prepare_issues(pd.read_csv(path, **CSV_OPTIONS), as_of(today_date))
+
+
+# Build security_data, df_open and df_close from a raw export already in memory
+def prepare_issues(file_df, today_date=None):
+    today_date = as_of(today_date)
+    security_data = filter_security_issues(file_df, window_start(today_date))
+    df_open, df_close = split_issues(security_data, today_date)
+    return security_data, df_open, df_close
+
+
+# KPI targets per severity as (about to violate, violated) thresholds in business days
+# Severities missing from this table (e.g. "Not Assigned") are never classified
+KPI_TARGETS = {
+    "Critical": (7, 14),
+    "Blocker": (7, 14),
+    "Major": (7, 14),
+    "Medium": (83, 90),
+    "Minor": (358, 365),
+}
+
+# Look up the (warn, limit) thresholds of every row through the severity codes, NaN where there is no target
+def kpi_thresholds(severity, targets=None):
+    targets = KPI_TARGETS if targets is None else targets
+    codes = pd.Categorical(severity, categories=list(targets)).codes
+    # Last slot holds NaN so that code -1 (unknown severity) picks it up
+    warn = np.append(np.array([t[0] for t in targets.values()], dtype=float), np.nan)
+    limit = np.append(np.array([t[1] for t in targets.values()], dtype=float), np.nan)
+    return warn[codes], limit[codes]
+
+
+# Label open issues normal / about_to_violate / violated in a single pass, NaN where it cannot be decided
+def classify_open(days, severity, targets=None):
+    warn, limit = kpi_thresholds(severity, targets)
+    days = np.asarray(days, dtype=float)
+    code = np.full(len(days), -1, dtype=np.int8)
+    code[days < warn] = 0
+    code[(days >= warn) & (days <= limit)] = 1
+    code[days > limit] = 2
+    target = pd.Categorical.from_codes(code, categories=OPEN_TARGETS)
+    return pd.Series(target, index=getattr(severity, "index", None), name="Target")
+
+
+# Label closed issues hit / miss in a single pass, NaN where it cannot be decided
+def classify_closed(days, severity, targets=None):
+    _, limit = kpi_thresholds(severity, targets)
+    days = np.asarray(days, dtype=float)
+    code = np.full(len(days), -1, dtype=np.int8)
+    code[days <= limit] = 0
+    code[days > limit] = 1
+    target = pd.Categorical.from_codes(code, categories=CLOSED_TARGETS)
+    return pd.Series(target, index=getattr(severity, "index", None), name="Target")
+
+
+# Filter Open Issues as per their KPI targets, returns a copy of df_open with the "Target" column
+@metrics.timed("openIssuesFilter")
+def openIssuesFilter():
+    load()
+    return df_open.assign(Target=classify_open(df_open["bussinessDays"], df_open["Severity"]))
+
+
+# Filter Closed Issues as per their KPI targets, returns a copy of df_close with the "Target" column
+@metrics.timed("closedIssuesFilter")
 def closedIssuesFilter():
-    df = df_close
-    df.loc[
-        (
-            (df["days_to_KPI_target"] <= 14)
-            & (
-                (df["Severity"] == "Major")
-                | (df["Severity"] == "Critical")
-                | (df["Severity"] == "Blocker")
-            )
-        ),
-        "Target",
-    ] = "hit"
+    load()
+    return df_close.assign(Target=classify_closed(df_close["days_to_KPI_target"], df_close["Severity"]))
+
+
+# Label for rows without a KPI target (unknown severity or missing days)
+UNCLASSIFIED = "unclassified"
+
+
+# Count issues per Target x Severity x AssigneeName with one bincount over the categorical codes.
+# For every column in values the cube also holds its sum and the number of non-null entries per cell.
+# With counted=True the rows are already grouped: "count" holds their number of issues and every value column
+# its sum, next to a <column>_count column with the number of non-null entries (e.g. GROUP BY results of a database).
+@metrics.timed("kpi_cube")
+def kpi_cube(df, targets, values=(), counted=False):
+    target = pd.Categorical(df["Target"], categories=targets)
+    severity = fixed_categorical(df["Severity"], SEVERITY_LEVELS)
+    # An empty partition still gets one (all zero) assignee so that every Target x Severity cell exists
+    assignees = sorted(df["AssigneeName"].dropna().unique()) or ["No Assignee"]
+    assignee = pd.Categorical(df["AssigneeName"], categories=assignees)
+
+    # Rows without a target are counted in the last, UNCLASSIFIED slot
+    target_codes = np.where(target.codes < 0, len(targets), target.codes)
+    codes = (target_codes, severity.codes, assignee.codes)
+    shape = (len(targets) + 1, len(severity.categories), len(assignee.categories))
+    size = int(np.prod(shape))
+    valid = (codes[1] >= 0) & (codes[2] >= 0)
+    flat = np.ravel_multi_index(tuple(c[valid] for c in codes), shape)
+
+    if counted:
+        count = df["count"].values[valid].astype(float)
+        cube = {"count": np.bincount(flat, weights=count, minlength=size).astype(np.int64)}
+        for column in values:
+            known = df[column + "_count"].values[valid].astype(float)
+            value = np.nan_to_num(df[column].values[valid].astype(float))
+            cube[column] = np.bincount(flat, weights=value, minlength=size)
+            cube[column + "_count"] = np.bincount(flat, weights=known, minlength=size).astype(np.int64)
+        return pd.DataFrame(cube, index=cube_index(targets, severity, assignee))
+
+    cube = {"count": np.bincount(flat, minlength=size)}
+    for column in values:
+        value = df[column].values[valid].astype(float)
+        known = ~np.isnan(value)
+        cube[column] = np.bincount(flat[known], weights=value[known], minlength=size)
+        cube[column + "_count"] = np.bincount(flat[known], minlength=size)
+
+    return pd.DataFrame(cube, index=cube_index(targets, severity, assignee))
+
+
+def cube_index(targets, severity, assignee):
+    return pd.MultiIndex.from_product(
+        [targets + [UNCLASSIFIED], list(severity.categories), list(assignee.categories)],
+        names=["Target", "Severity", "AssigneeName"],
+    )
 
-    df.loc[((df["days_to_KPI_target"] <= 90) & (df["Severity"] == "Medium")), "Target"] = "hit"
 
-    df.loc[((df["days_to_KPI_target"] <= 365) & (df["Severity"] == "Minor")), "Target"] = "hit"
+# Collapse one column of a KPI cube onto the given levels
+def cube_totals(cube, levels, column="count"):
+    return cube[column].groupby(level=levels, sort=False).sum()
 
-    df.loc[
-        (
-            (df["days_to_KPI_target"] > 14)
-            & (
-                (df["Severity"] == "Major")
-                | (df["Severity"] == "Critical")
-                | (df["Severity"] == "Blocker")
-            )
-        ),
-        "Target",
-    ] = "miss"
 
-    df.loc[((df["days_to_KPI_target"] > 90) & (df["Severity"] == "Medium")), "Target"] = "miss"
+# Merge KPI cubes of several partitions, keeping the target and severity order of the charts
+def merge_cubes(cubes):
+    targets = list(dict.fromkeys(t for cube in cubes for t in cube.index.get_level_values("Target").unique()))
+    severities = set(s for cube in cubes for s in cube.index.get_level_values("Severity").unique())
+    assignees = set(a for cube in cubes for a in cube.index.get_level_values("AssigneeName").unique())
+    index = pd.MultiIndex.from_product(
+        [targets, SEVERITY_LEVELS + sorted(severities - set(SEVERITY_LEVELS)), sorted(assignees)],
+        names=["Target", "Severity", "AssigneeName"],
+    )
+    merged = cubes[0].reindex(index, fill_value=0)
+    for cube in cubes[1:]:
+        merged = merged + cube.reindex(index, fill_value=0)
+    return merged
 
-    df.loc[((df["days_to_KPI_target"] > 365) & (df["Severity"] == "Minor")), "Target"] = "miss"
 
-    return df
+# Columns shown in the DataTable of open issues violating or about to violate their KPI targets
+AT_RISK_COLUMNS = ["Git Issue Id", "Title", "AssigneeName", "Severity", "Target"]
+
+
+# Compliance events (see compliance.events) of issue rows with their creation date, closing date, severity and,
+# for closed issues, their hit / miss Target. A "count" column weighs rows standing for several issues.
+def compliance_events(df, targets=None):
+    warn, limit = kpi_thresholds(df["Severity"], targets)
+    weight = df["count"] if "count" in df else None
+    return compliance.events(df["IssueCreatedAt"], df["IssueClosedDate"], warn, limit, df["Target"], weight)
+
+
+# Reduce security_data, df_open and df_close (of the whole export or of one chunk) to the aggregates the KPIs need.
+# Aggregates of separate partitions are combined with merge_aggregates.
+@metrics.timed("issue_aggregates")
+def issue_aggregates(security_data, df_open, df_close):
+    df_open = df_open.assign(Target=classify_open(df_open["bussinessDays"], df_open["Severity"]))
+    df_close = df_close.assign(Target=classify_closed(df_close["days_to_KPI_target"], df_close["Severity"]))
+    at_risk = df_open["Target"].isin(["about_to_violate", "violated"])
+    issues = pd.concat(
+        [df_open[["IssueCreatedAt", "Severity"]], df_close[["IssueCreatedAt", "IssueClosedDate", "Severity", "Target"]]]
+    )
+    return {
+        "open_cube": kpi_cube(df_open, OPEN_TARGETS),
+        "closed_cube": kpi_cube(df_close, CLOSED_TARGETS, values=["days_to_KPI_target"]),
+        "daily": security_data.groupby(["IssueCreatedAt", "State"], observed=True).size(),
+        "open_daily": df_open.groupby(["IssueCreatedAt", "Severity"], observed=True).size(),
+        "backlog_events": backlog.events(df_open, df_close),
+        "compliance_events": compliance_events(issues),
+        "resolution_days": resolution.histogram(df_close),
+        "at_risk": df_open.loc[at_risk, AT_RISK_COLUMNS],
+    }
+
+
+@metrics.timed("merge_aggregates")
+def merge_aggregates(parts):
+    daily = pd.concat([p["daily"] for p in parts]).groupby(level=[0, 1]).sum()
+    open_daily = pd.concat([p["open_daily"] for p in parts]).groupby(level=[0, 1]).sum()
+    backlog_events = pd.concat([p["backlog_events"] for p in parts]).groupby(level=[0, 1]).sum()
+    compliance_events = pd.concat([p["compliance_events"] for p in parts]).groupby(level=[0, 1]).sum()
+    resolution_days = pd.concat([p["resolution_days"] for p in parts])
+    resolution_days = resolution_days.groupby(level=list(range(resolution_days.index.nlevels))).sum()
+    return {
+        "open_cube": merge_cubes([p["open_cube"] for p in parts]),
+        "closed_cube": merge_cubes([p["closed_cube"] for p in parts]),
+        "daily": daily[daily != 0],
+        "open_daily": open_daily[open_daily != 0],
+        "backlog_events": backlog_events[backlog_events != 0],
+        "compliance_events": compliance_events[compliance_events != 0],
+        "resolution_days": resolution_days[resolution_days != 0],
+        "at_risk": concat_frames([p["at_risk"] for p in parts]),
+    }
+
+
+# Aggregates that cancel out the given ones when merged, used to retract issues that changed.
+# The at-risk rows cannot be negated and are left empty, the caller drops retracted rows itself.
+def negate_aggregates(aggregates):
+    return {
+        "open_cube": -aggregates["open_cube"],
+        "closed_cube": -aggregates["closed_cube"],
+        "daily": -aggregates["daily"],
+        "open_daily": -aggregates["open_daily"],
+        "backlog_events": -aggregates["backlog_events"],
+        "compliance_events": -aggregates["compliance_events"],
+        "resolution_days": -aggregates["resolution_days"],
+        "at_risk": aggregates["at_risk"].iloc[:0],
+    }
+
+
+# Drop the issues created before start (see filter_security_issues) from the frames and their share from the
+# aggregates, as loading the export as of a later reporting date would. Returns the frames, the aggregates and the
+# number of issues dropped.
+def expire_issues(frames, aggregates, start):
+    security_data, df_open, df_close = frames
+    expired = security_data.loc[security_data["IssueCreatedAt"] < start, "Git Issue Id"]
+    if expired.empty:
+        return frames, aggregates, 0
+
+    gone = [df["Git Issue Id"].isin(expired) for df in frames]
+    removed = issue_aggregates(*(df[drop] for df, drop in zip(frames, gone)))
+    at_risk = aggregates["at_risk"]
+    kept = dict(aggregates, at_risk=at_risk[~at_risk["Git Issue Id"].isin(expired)])
+    frames = tuple(df[~drop] for df, drop in zip(frames, gone))
+    return frames, merge_aggregates([kept, negate_aggregates(removed)]), len(expired)
+
+
+# Read the export in chunks of chunksize rows, filter and classify every chunk and fold it into running aggregates.
+# Only the current chunk and the aggregates are held in memory.
+@metrics.timed("stream_aggregates")
+def stream_aggregates(path=CSV_FILE, today_date=None, chunksize=100000):
+    today_date = as_of(today_date)
+    prev_year = window_start(today_date)
+    aggregates = None
+    for chunk in pd.read_csv(path, chunksize=chunksize, **CSV_OPTIONS):
+        security_chunk = filter_security_issues(chunk, prev_year)
+        if security_chunk.empty:
+            continue
+        part = issue_aggregates(security_chunk, *split_issues(security_chunk, today_date))
+        aggregates = part if aggregates is None else merge_aggregates([aggregates, part])
+    if aggregates is None:
+        raise ValueError("No security issues created after {} in {}".format(prev_year.date(), path))
+    return aggregates
+
+
+# Everything besides the export that parsed frames and databases depend on
+def cache_key(today=None):
+    return "{}|{}|{}".format(as_of(today), calendar.weekmask, ",".join(calendar.holidays))
+
+
+# Load the export with the configured source and backend as of today (default today_date): the issue frames (None
+# where they are not kept), the partial aggregates per project (multi-project mode only) and the aggregates behind
+# the dashboard
+@metrics.timed("load_dataset")
+def load_dataset(today=None):
+    today = as_of(today)
+    if SOURCES:
+        # Multi-project mode: every export is aggregated by its own worker, only the aggregates are kept
+        by_project = projects.ingest_projects(SOURCES, today, WORKERS)
+        return (None, None, None), by_project, merge_aggregates(list(by_project.values()))
+    if BACKEND == "sqlite":
+        # Database mode: filters and counts run in SQL, only their small results are materialized
+        sqlite_backend.load(DATABASE, CSV_FILE, key=cache_key(today), chunksize=CHUNK_SIZE or 100000)
+        return (None, None, None), {}, sqlite_backend.query_aggregates(DATABASE, SCOPE_LABELS, today)
+    if CHUNK_SIZE:
+        # Streaming mode: only the aggregates are kept, the issue frames are never materialized
+        return (None, None, None), {}, stream_aggregates(CSV_FILE, today, CHUNK_SIZE)
+    # Load the parsed frames from the on-disk cache, re-parsing the CSV only when it has changed
+    frames = metrics.timed("cached_frames")(cache.cached_frames)(
+        lambda: load_issues(CSV_FILE, today),
+        CSV_FILE,
+        key=cache_key(today),
+        names=["security_data", "df_open", "df_close"],
+    )
+    return frames, {}, issue_aggregates(*frames)
+
+
+# Names of the loaded dataset: the issue frames, the partial aggregates per project (multi-project mode only),
+# the aggregates and their KPI cubes that every chart reads its counts and sums from.
+# They are only set on first use, __getattr__ loads the dataset when one of them is asked for before.
+DATASET = ["security_data", "df_open", "df_close", "by_project", "aggregates", "open_kpi_cube", "closed_kpi_cube"]
+
+# Dataset version, bumped on every publish so that serialized figures know when to rebuild
+version = 0
+
+_load_lock = threading.Lock()
+
+# Held by whoever reads the published dataset to publish a modification of it (the live clock, reloads, incremental
+# refreshes), so that one never overwrites what another published in between
+publish_lock = threading.RLock()
+
+
+# Load the dataset unless it is loaded or published already, importing main stays cheap until the data is needed
+def load():
+    if "aggregates" not in globals():
+        with _load_lock:
+            if "aggregates" not in globals():
+                frames, project_parts, loaded = load_dataset()
+                swap(loaded, frames, project_parts)
+
+
+def __getattr__(name):
+    if name in DATASET:
+        load()
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+# The current aggregates, loaded on first use
+def current():
+    load()
+    return aggregates
+
+
+def swap(new_aggregates, frames=None, project_parts=None):
+    global aggregates, open_kpi_cube, closed_kpi_cube, security_data, df_open, df_close, by_project
+    # Aggregates published before the dataset was loaded may come without frames or projects of their own
+    if frames is None and "security_data" not in globals():
+        frames = (None, None, None)
+    if project_parts is None and "by_project" not in globals():
+        project_parts = {}
+    if frames is not None:
+        security_data, df_open, df_close = frames
+    if project_parts is not None:
+        by_project = project_parts
+    aggregates = new_aggregates
+    open_kpi_cube = aggregates["open_cube"]
+    closed_kpi_cube = aggregates["closed_cube"]
+
+
+# Swap in new frames and aggregates (e.g. after a refresh), the KPI functions pick them up on their next call
+def publish(new_aggregates, frames=None, project_parts=None):
+    global version
+    with publish_lock:
+        swap(new_aggregates, frames, project_parts)
+        version += 1
+
+
+# Swap in frames whose open issues only aged without any of them changing its KPI target. The aggregates and
+# everything derived from them stay valid, so the version is kept; only the what-if simulators read the ages.
+def publish_ages(frames):
+    with publish_lock:
+        swap(aggregates, frames)
+        scope_cache().update(simulator=None, simulated={})
+
+
+# Label indexes of the current frames and aggregates per label or project selection, dropped when the version changes
+# as well as the query engine behind the cross-filters and the aggregates of the latest filter selections
+_scopes = {
+    "version": None,
+    "indexes": None,
+    "aggregates": {},
+    "query": None,
+    "filtered": {},
+    "simulator": None,
+    "simulated": {},
+}
+
+
+def scope_cache():
+    if _scopes["version"] != version:
+        _scopes.update(
+            version=version, indexes=None, aggregates={}, query=None, filtered={}, simulator=None, simulated={}
+        )
+    return _scopes
+
+
+# Labels occurring in the current security issues, for the label selector
+def label_vocabulary():
+    load()
+    if BACKEND == "sqlite" and not SOURCES:
+        return sqlite_backend.label_vocabulary(DATABASE, SCOPE_LABELS, today_date)
+    if security_data is None:
+        return []
+    return label_indexes()[0].vocabulary
+
+
+def label_indexes():
+    scopes = scope_cache()
+    if scopes["indexes"] is None:
+        scopes["indexes"] = [labels.LabelIndex(df["Labels"]) for df in (security_data, df_open, df_close)]
+    return scopes["indexes"]
+
+
+# Key of a label or project selection in the scope cache, None when it selects the current aggregates.
+# Labels need the issue frames or the database, so in streaming mode only the labels of SCOPE_LABELS apply.
+def scope_key(selected_labels=None, selected_projects=None):
+    load()
+    if selected_projects and by_project:
+        selected = sorted(project for project in selected_projects if project in by_project)
+        return ("projects",) + tuple(selected) if selected else None
+    if selected_labels and (security_data is not None or (BACKEND == "sqlite" and not SOURCES)):
+        return ("labels",) + tuple(sorted(selected_labels))
+    return None
+
+
+# Aggregates of the issues carrying all the selected labels (the current aggregates when none are selected)
+@metrics.timed("label_aggregates")
+def label_aggregates(selected):
+    key = scope_key(selected_labels=selected)
+    if key is None:
+        return aggregates
+    scoped = scope_cache()["aggregates"]
+    if key not in scoped:
+        if security_data is None:
+            scoped[key] = sqlite_backend.query_aggregates(DATABASE, SCOPE_LABELS + list(key[1:]), today_date)
+        else:
+            indexes = label_indexes()
+            frames = [df[index.mask(all_of=key[1:])] for df, index in zip((security_data, df_open, df_close), indexes)]
+            scoped[key] = issue_aggregates(*frames)
+    return scoped[key]
+
+
+# Aggregates of the selected projects merged (the current aggregates when none are selected)
+@metrics.timed("project_aggregates")
+def project_aggregates(selected):
+    key = scope_key(selected_projects=selected)
+    if key is None:
+        return aggregates
+    scoped = scope_cache()["aggregates"]
+    if key not in scoped:
+        scoped[key] = merge_aggregates([by_project[project] for project in key[1:]])
+    return scoped[key]
+
+
+# Aggregates behind the dashboard for the selected projects (multi-project mode) or labels (when frames are kept)
+def scoped_aggregates(selected_labels=None, selected_projects=None):
+    load()
+    if selected_projects and by_project:
+        return project_aggregates(selected_projects)
+    return label_aggregates(selected_labels)
+
+
+# Cross-filters of the dashboard as a dict: creation date range (start, end), severities, assignees and states.
+# They need the issue frames, the modes keeping only aggregates do not offer them.
+FILTERS = ["start", "end", "severities", "assignees", "states"]
+
+
+def filters_supported():
+    load()
+    return security_data is not None
+
+
+# Query engine over the current issue frames, indexed once per dataset version
+def issue_query():
+    scopes = scope_cache()
+    if scopes["query"] is None:
+        scopes["query"] = query.IssueQuery(security_data, df_open, df_close, label_indexes()[0])
+    return scopes["query"]
+
+
+# Key of a filter selection, None when no filter is set
+def filter_key(filters):
+    if not filters or not filters_supported():
+        return None
+    key = tuple(tuple(sorted(value)) if isinstance(value, list) else value for value in map(filters.get, FILTERS))
+    return key if any(key) else None
+
+
+# Aggregates of the issues carrying all the selected labels that pass the filters, answered by the query engine.
+# The latest few are kept so that every figure callback of one selection shares them.
+@metrics.timed("filtered_aggregates")
+def filtered_aggregates(selected_labels=None, filters=None):
+    key = filter_key(filters)
+    if key is None:
+        return label_aggregates(selected_labels)
+    key = (tuple(sorted(selected_labels or [])),) + key
+    filtered = scope_cache()["filtered"]
+    if key not in filtered:
+        if len(filtered) >= 8:
+            filtered.clear()
+        engine = issue_query()
+        filtered[key] = engine.aggregates(engine.select(*key[1:], labels=selected_labels))
+    return filtered[key]
+
+
+# What-if simulator of the KPI targets over the issues carrying all the selected labels that pass the filters.
+# The unscoped one sorts the issue frames once per dataset version, scoped ones pick their rows out of it.
+def target_simulator(selected_labels=None, filters=None):
+    load()
+    scopes = scope_cache()
+    if scopes["simulator"] is None:
+        scopes["simulator"] = whatif.TargetSimulator(df_open, df_close)
+    key = filter_key(filters)
+    if key is None and not selected_labels:
+        return scopes["simulator"]
+    key = (tuple(sorted(selected_labels or [])),) + (key or (None,) * len(FILTERS))
+    simulated = scopes["simulated"]
+    if key not in simulated:
+        if len(simulated) >= 8:
+            simulated.clear()
+        engine = issue_query()
+        picked = np.zeros(len(engine.created), dtype=bool)
+        picked[engine.select(*key[1:], labels=selected_labels)] = True
+        simulated[key] = scopes["simulator"].select(picked[engine.issue_of_open], picked[engine.issue_of_close])
+    return simulated[key]
 
 
 """
 KPI designing begins here
 """
 
-# Open vs Closed Issues
-def issuesTimeChart():
-    count_issues = security_data.groupby(["IssueCreatedAt", "State"]).size()
-    df = count_issues.to_frame(name="Count").reset_index()
+# Values derived from one part of the aggregates, memoized per part object (e.g. for the current and label scopes)
+def derived(cache, part, build):
+    if id(part) not in cache:
+        if len(cache) >= 8:
+            cache.clear()
+        # The part is kept with its derived value so that its id cannot be reused while cached
+        cache[id(part)] = (part, build(part))
+    return cache[id(part)][1]
+
+
+# Day, week and month rollups of the daily counts
+_time_rollups = {}
+
+
+def time_rollups(daily):
+    return derived(_time_rollups, daily, timeseries.rollups)
+
+
+# Open backlog over time, swept from the backlog events
+_backlogs = {}
+
+
+def open_backlog(scope=None):
+    scope = current() if scope is None else scope
+    return derived(_backlogs, scope["backlog_events"], lambda events: backlog.Backlog(events, SEVERITY_LEVELS))
+
+
+# Open issues per severity at the end of the given day
+def backlog_as_of(date, scope=None):
+    return open_backlog(scope).as_of(date)
+
+
+# Open issues per KPI target and closed issues hit / missed so far, swept from the compliance events
+_compliance = {}
+
+
+def kpi_compliance(scope=None):
+    scope = current() if scope is None else scope
+    order = OPEN_TARGETS + CLOSED_TARGETS
+    return derived(_compliance, scope["compliance_events"], lambda events: backlog.Backlog(events, order))
+
+
+# KPI status of the issues as of every day of the reporting window, see compliance.daily
+def compliance_as_of(scope=None):
+    today = pd.to_datetime(today_date, format="%d-%m-%Y")
+    return compliance.daily(kpi_compliance(scope), window_start(today_date), today)
+
+
+# Open vs Closed Issues, for the whole range or a (start, end) window at the finest resolution that stays
+# below timeseries.MAX_POINTS points per trace
+@metrics.timed("issuesTimeChart")
+def issuesTimeChart(scope=None, window=None):
+    scope = current() if scope is None else scope
+    start, end = window or (None, None)
+    resolution, series = timeseries.window_series(time_rollups(scope["daily"]), start, end)
 
     KPI = {
-        "data": [
-            go.Scatter(x=df[df["State"] == i]["IssueCreatedAt"], y=df[df["State"] == i]["Count"], name=i, mode="lines")
-            for i in df.State.unique()
-        ],
+        "data": [go.Scatter(x=s.index, y=s.values, name=state, mode="lines") for state, s in series.items()],
         "layout": {
             "title": "Open and Closed Issues",
             "xaxis": dict(
@@ -192,29 +762,71 @@ def issuesTimeChart():
                 type="date",
                 title="Issue Reported Date",
             ),
-            "yaxis": {"title": "Number of Issues"},
+            "yaxis": {"title": "Number of Issues" if resolution == "day" else "Number of Issues per " + resolution},
             "hovermode": "closest",
             "height": 500,
         },
     }
+    if window:
+        KPI["layout"]["xaxis"]["range"] = [start, end]
     return KPI
 
 
+# Assignees named per page of the assignee charts, the ones ranked before and after the page are summed into buckets
+TOP_ASSIGNEES = int(os.environ.get("KPI_TOP_ASSIGNEES", 25))
+
+
+# Counts per assignee (rows) and level value (columns) in one pivot of a KPI cube, ranked by total and cut down to
+# page number page of TOP_ASSIGNEES assignees. Returns the pivot and, per row, the page a click on it drills down
+# (or back up) to: None for assignees, the next page for the "Other" bucket and the previous one for the "Top" bucket.
+def assignee_page(cube, level, columns=None, page=0, top=None):
+    top = TOP_ASSIGNEES if top is None else top
+    pivot = cube_totals(cube, [level, "AssigneeName"]).unstack(level, fill_value=0)
+    if columns is not None:
+        pivot = pivot.reindex(columns=columns, fill_value=0)
+    totals = pivot.sum(axis=1)
+    pivot = pivot[totals > 0]
+    pivot = pivot.iloc[np.lexsort((pivot.index.astype(str), -totals[totals > 0].values))]
+    if top <= 0 or len(pivot) <= top:
+        return pivot, [None] * len(pivot)
+
+    page = min(max(page, 0), (len(pivot) - 1) // top)
+    start, end = page * top, min((page + 1) * top, len(pivot))
+    rows, drill = [pivot.iloc[start:end]], [None] * (end - start)
+    if start > 0:
+        rows.insert(0, pivot.iloc[:start].sum().rename("Top {} assignees".format(start)).to_frame().T)
+        drill.insert(0, page - 1)
+    if end < len(pivot):
+        rows.append(pivot.iloc[end:].sum().rename("Other ({} assignees)".format(len(pivot) - end)).to_frame().T)
+        drill.append(page + 1)
+    return pd.concat(rows), drill
+
+
+# Stacked bars of an assignee page, one trace per column of the pivot
+def assignee_bars(pivot, drill, names=None):
+    names = names or {}
+    return [
+        go.Bar(
+            x=pivot.index,
+            y=pivot[i],
+            name=names.get(i, i),
+            text=pivot[i].where(pivot[i] > 0),
+            textposition="inside",
+            customdata=drill,
+        )
+        for i in pivot.columns
+        if pivot[i].any()
+    ]
+
+
 # Open Issues with Assignee Name
-def openIssuesWithAssignee():
-    df = df_open.groupby(["AssigneeName", "Severity"]).size().reset_index(name="count")
+@metrics.timed("openIssuesWithAssignee")
+def openIssuesWithAssignee(scope=None, page=0):
+    scope = current() if scope is None else scope
+    pivot, drill = assignee_page(scope["open_cube"], "Severity", page=page)
 
     KPI = {
-        "data": [
-            go.Bar(
-                x=df[df["Severity"] == i]["AssigneeName"],
-                y=df[df["Severity"] == i]["count"],
-                name=i,
-                text=df[df["Severity"] == i]["count"],
-                textposition="inside",
-            )
-            for i in df.Severity.unique()
-        ],
+        "data": assignee_bars(pivot, drill),
         "layout": {
             "title": "Open Issues with Assignee Name",
             "xaxis": {"title": "Assignee Name"},
@@ -229,11 +841,10 @@ def openIssuesWithAssignee():
 
 
 # Highlight open issues about to violate KPI targets, has violated KPI targets and in KPI targets
-def openCriticalIssues():
-    df = openIssuesFilter()
-    counts = {"normal": 0, "about_to_violate": 0, "violated": 0}
-    counts_fill = df["Target"].value_counts().to_dict()
-    counts.update(counts_fill)
+@metrics.timed("openCriticalIssues")
+def openCriticalIssues(scope=None):
+    scope = current() if scope is None else scope
+    counts = cube_totals(scope["open_cube"], "Target")
     labels = [
         "Issues in KPI targets",
         "Issues about to violate KPI targets",
@@ -256,134 +867,66 @@ def openCriticalIssues():
     return KPI
 
 
-# Highlight open issues as per their severity violating, within and missing KPI targets
-def openIssuesSeverityKPITargets():
-    df = openIssuesFilter()
-    counts = {"normal": 0, "about_to_violate": 0, "violated": 0}
-    counts_fill = df["Target"].value_counts().to_dict()
-    counts.update(counts_fill)
-
-    critical_within = df[(df["Target"] == "normal") & (df["Severity"] == "Critical")].shape[0]
-    blocker_within = df[(df["Target"] == "normal") & (df["Severity"] == "Blocker")].shape[0]
-    major_within = df[(df["Target"] == "normal") & (df["Severity"] == "Major")].shape[0]
-    medium_within = df[(df["Target"] == "normal") & (df["Severity"] == "Medium")].shape[0]
-    minor_within = df[(df["Target"] == "normal") & (df["Severity"] == "Minor")].shape[0]
-    none_within = df[(df["Target"] == "normal") & (df["Severity"] == "Not Assigned")].shape[0]
-
-    critical_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Critical")].shape[0]
-    blocker_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Blocker")].shape[0]
-    major_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Major")].shape[0]
-    medium_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Medium")].shape[0]
-    minor_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Minor")].shape[0]
-    none_miss = df[(df["Target"] == "violated") & (df["Severity"] == "Not Assigned")].shape[0]
-
-    critical_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Critical")].shape[0]
-    blocker_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Blocker")].shape[0]
-    major_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Major")].shape[0]
-    medium_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Medium")].shape[0]
-    minor_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Minor")].shape[0]
-    none_about_to = df[(df["Target"] == "about_to_violate") & (df["Severity"] == "Not Assigned")].shape[0]
-
-    in_target = "Still in KPI targets ({})".format(counts["normal"])
-    missed_target = "Violated KPI targets ({})".format(counts["violated"])
-    about_to_violate_target = "About to violate KPI targets ({})".format(counts["about_to_violate"])
-
-    parent = [
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        about_to_violate_target,
-        about_to_violate_target,
-        about_to_violate_target,
-        about_to_violate_target,
-        about_to_violate_target,
-        about_to_violate_target,
-    ]
-    categories = [
-        "Critical ({})".format(critical_within),
-        "Blocker ({})".format(blocker_within),
-        "Major ({})".format(major_within),
-        "Medium ({})".format(medium_within),
-        "Minor ({})".format(minor_within),
-        "Not Assigned ({})".format(none_within),
-        "Critical ({})".format(critical_miss),
-        "Blocker ({})".format(blocker_miss),
-        "Major ({})".format(major_miss),
-        "Medium ({})".format(medium_miss),
-        "Minor ({})".format(minor_miss),
-        "Not Assigned ({})".format(none_miss),
-        "Critical ({})".format(critical_about_to),
-        "Blocker ({})".format(blocker_about_to),
-        "Major ({})".format(major_about_to),
-        "Medium ({})".format(medium_about_to),
-        "Minor ({})".format(minor_about_to),
-        "Not Assigned ({})".format(none_about_to),
-    ]
+# Sunburst of the issues per target (inner ring, labelled by parents) and severity (outer ring) from the cube totals,
+# every target in its color. Built as a trace directly, plotly.express would group a frame of the same sectors again.
+def severity_sunburst(counts, parents, colors):
+    ids, labels, parent, values, sector_colors = [], [], [], [], []
+    for target, label in parents.items():
+        ids.append(label)
+        labels.append(label)
+        parent.append("")
+        values.append(sum(counts[target, severity] for severity in SEVERITY_LEVELS))
+        sector_colors.append(colors[target])
+        for severity in SEVERITY_LEVELS:
+            category = "{} ({})".format(severity, counts[target, severity])
+            ids.append(label + "/" + category)
+            labels.append(category)
+            parent.append(label)
+            values.append(counts[target, severity])
+            sector_colors.append(colors[target])
 
-    values = [
-        critical_within,
-        blocker_within,
-        major_within,
-        medium_within,
-        minor_within,
-        none_within,
-        critical_miss,
-        blocker_miss,
-        major_miss,
-        medium_miss,
-        minor_miss,
-        none_miss,
-        critical_about_to,
-        blocker_about_to,
-        major_about_to,
-        medium_about_to,
-        minor_about_to,
-        none_about_to,
+    data = [
+        go.Sunburst(
+            ids=ids,
+            labels=labels,
+            parents=parent,
+            values=values,
+            branchvalues="total",
+            marker={"colors": sector_colors},
+        )
     ]
+    return {"data": data, "layout": {"uniformtext": dict(minsize=10), "margin": dict(t=10, l=10, r=10, b=10)}}
 
-    df = pd.DataFrame(dict(parent=parent, categories=categories, values=values))
-    fig = px.sunburst(
-        df,
-        path=["parent", "categories"],
-        values="values",
-        color_discrete_sequence=["rgb(99, 110, 250)", "rgb(0, 204, 150)", "rgb(239, 85, 59)",],
-    )
-    fig.update_layout(uniformtext=dict(minsize=10), margin=dict(t=10, l=10, r=10, b=10))
-    return fig
+
+# Highlight open issues as per their severity violating, within and missing KPI targets
+@metrics.timed("openIssuesSeverityKPITargets")
+def openIssuesSeverityKPITargets(scope=None):
+    scope = current() if scope is None else scope
+    counts = cube_totals(scope["open_cube"], ["Target", "Severity"])
+    totals = cube_totals(scope["open_cube"], "Target")
+
+    parents = {
+        "normal": "Still in KPI targets ({})".format(totals["normal"]),
+        "violated": "Violated KPI targets ({})".format(totals["violated"]),
+        "about_to_violate": "About to violate KPI targets ({})".format(totals["about_to_violate"]),
+    }
+
+    colors = {"normal": "rgb(0, 204, 150)", "violated": "rgb(99, 110, 250)", "about_to_violate": "rgb(239, 85, 59)"}
+    return severity_sunburst(counts, parents, colors)
 
 
 # Highlight open issues about to violate KPI targets with assignee name
-def openCriticalIssuesWithAssignee():
-    df = openIssuesFilter()
-    count_issues = df.groupby(["AssigneeName", "Target"]).size()
-    df = count_issues.to_frame(name="Count").reset_index()
+@metrics.timed("openCriticalIssuesWithAssignee")
+def openCriticalIssuesWithAssignee(scope=None, page=0):
+    scope = current() if scope is None else scope
+    pivot, drill = assignee_page(scope["open_cube"], "Target", ["about_to_violate", "violated"], page)
+    names = {
+        "about_to_violate": "Issues about to violate KPI targets",
+        "violated": "Issues have violated KPI targets",
+    }
 
     KPI = {
-        "data": [
-            go.Bar(
-                x=df[df["Target"] == "about_to_violate"]["AssigneeName"],
-                y=df[df["Target"] == "about_to_violate"]["Count"],
-                text=df[df["Target"] == "about_to_violate"]["Count"],
-                textposition="inside",
-                name="Issues about to violate KPI targets",
-            ),
-            go.Bar(
-                x=df[df["Target"] == "violated"]["AssigneeName"],
-                y=df[df["Target"] == "violated"]["Count"],
-                text=df[df["Target"] == "violated"]["Count"],
-                textposition="inside",
-                name="Issues have violated KPI targets",
-            ),
-        ],
+        "data": assignee_bars(pivot, drill, names),
         "layout": {
             "title": "Open Issues violating KPI targets with Assignee Name",
             "xaxis": {"title": "Assignee Name"},
@@ -398,11 +941,10 @@ def openCriticalIssuesWithAssignee():
 
 
 # Highlight closed issues meeting and missing KPI targets
-def closedIssuesKPITargets():
-    df = closedIssuesFilter()
-    counts = {"hit": 0, "miss": 0}
-    counts_fill = df["Target"].value_counts().to_dict()
-    counts.update(counts_fill)
+@metrics.timed("closedIssuesKPITargets")
+def closedIssuesKPITargets(scope=None):
+    scope = current() if scope is None else scope
+    counts = cube_totals(scope["closed_cube"], "Target")
 
     labels = ["Issues fixed in KPI targets", "Issues missing KPI targets"]
     values = [counts["hit"], counts["miss"]]
@@ -418,95 +960,35 @@ def closedIssuesKPITargets():
 
 
 # Highlight closed issues as per their severity meeting and missing KPI targets
-def closedIssuesSeverityKPITargets():
-    df = closedIssuesFilter()
-    counts = {"hit": 0, "miss": 0}
-    counts_fill = df["Target"].value_counts().to_dict()
-    counts.update(counts_fill)
-
-    critical_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Critical")].shape[0]
-
-    blocker_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Blocker")].shape[0]
-    major_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Major")].shape[0]
-    medium_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Medium")].shape[0]
-    minor_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Minor")].shape[0]
-    none_hit = df[(df["Target"] == "hit") & (df["Severity"] == "Not Assigned")].shape[0]
-
-    critical_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Critical")].shape[0]
-    blocker_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Blocker")].shape[0]
-    major_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Major")].shape[0]
-    medium_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Medium")].shape[0]
-    minor_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Minor")].shape[0]
-    none_miss = df[(df["Target"] == "miss") & (df["Severity"] == "Not Assigned")].shape[0]
-
-    in_target = "Fixed in KPI targets ({})".format(counts["hit"])
-    missed_target = "Missed KPI targets ({})".format(counts["miss"])
-
-    parent = [
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        in_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-        missed_target,
-    ]
-    categories = [
-        "Critical ({})".format(critical_hit),
-        "Blocker ({})".format(blocker_hit),
-        "Major ({})".format(major_hit),
-        "Medium ({})".format(medium_hit),
-        "Minor ({})".format(minor_hit),
-        "Not Assigned ({})".format(none_hit),
-        "Critical ({})".format(critical_miss),
-        "Blocker ({})".format(blocker_miss),
-        "Major ({})".format(major_miss),
-        "Medium ({})".format(medium_miss),
-        "Minor ({})".format(minor_miss),
-        "Not Assigned ({})".format(none_miss),
-    ]
-
-    values = [
-        critical_hit,
-        blocker_hit,
-        major_hit,
-        medium_hit,
-        minor_hit,
-        none_hit,
-        critical_miss,
-        blocker_miss,
-        major_miss,
-        medium_miss,
-        minor_miss,
-        none_miss,
-    ]
+@metrics.timed("closedIssuesSeverityKPITargets")
+def closedIssuesSeverityKPITargets(scope=None):
+    scope = current() if scope is None else scope
+    counts = cube_totals(scope["closed_cube"], ["Target", "Severity"])
+    totals = cube_totals(scope["closed_cube"], "Target")
+
+    parents = {
+        "hit": "Fixed in KPI targets ({})".format(totals["hit"]),
+        "miss": "Missed KPI targets ({})".format(totals["miss"]),
+    }
 
-    df = pd.DataFrame(dict(parent=parent, categories=categories, values=values))
-    fig = px.sunburst(
-        df,
-        path=["parent", "categories"],
-        values="values",
-        color_discrete_sequence=["rgb(99, 110, 250)", "rgb(239, 85, 59)"],
-    )
-    fig.update_layout(uniformtext=dict(minsize=10), margin=dict(t=10, l=10, r=10, b=10))
-    return fig
+    colors = {"hit": "rgb(99, 110, 250)", "miss": "rgb(239, 85, 59)"}
+    return severity_sunburst(counts, parents, colors)
 
 
 # Average Issue resolution time
-def averageIssueResolutionTime():
-    df = df_close
-    avg_critical = df.loc[(df["Severity"] == "Critical", "days_to_KPI_target")].mean().round()
-    avg_blocker = df.loc[(df["Severity"] == "Blocker", "days_to_KPI_target")].mean().round()
-    avg_major = df.loc[(df["Severity"] == "Major", "days_to_KPI_target")].mean().round()
-    avg_medium = df.loc[(df["Severity"] == "Medium", "days_to_KPI_target")].mean()
-    avg_minor = df.loc[(df["Severity"] == "Minor", "days_to_KPI_target")].mean().round()
-    avg_none = df.loc[(df["Severity"] == "Not Assigned", "days_to_KPI_target")].mean().round()
-    total_average = (df["days_to_KPI_target"].sum() / df_close["Severity"].value_counts().sum()).round()
+@metrics.timed("averageIssueResolutionTime")
+def averageIssueResolutionTime(scope=None):
+    scope = current() if scope is None else scope
+    days = cube_totals(scope["closed_cube"], "Severity", "days_to_KPI_target")
+    known = cube_totals(scope["closed_cube"], "Severity", "days_to_KPI_target_count")
+    average = days / known
+    avg_critical = average["Critical"].round()
+    avg_blocker = average["Blocker"].round()
+    avg_major = average["Major"].round()
+    avg_medium = average["Medium"].round()
+    avg_minor = average["Minor"].round()
+    avg_none = average["Not Assigned"].round()
+    total_average = (days.sum() / known.sum()).round()
 
     labels = [
         "Critical",
@@ -562,14 +1044,17 @@ def averageIssueResolutionTime():
 
 
 # Total Open Critical/High/Medium/Low Issues at any point of time
-def totalOpenIssues():
-    df = df_open
-    # Filter: Show only 3 months old data
-    last_3months = pd.to_datetime((datetime.today() - timedelta(days=92)))
-    df.loc[:, "IssueCreatedAt"] = pd.to_datetime(df["IssueCreatedAt"])
-    df = df.loc[(df["IssueCreatedAt"] >= last_3months)]
-
-    df = pd.crosstab(df["IssueCreatedAt"], df["Severity"])
+@metrics.timed("totalOpenIssues")
+def totalOpenIssues(scope=None):
+    scope = current() if scope is None else scope
+    counts = scope["open_daily"]
+    # Filter: Show only 3 months old data, counted back from the reporting date
+    last_3months = pd.to_datetime(today_date, format="%d-%m-%Y") - timedelta(days=92)
+    counts = counts[counts.index.get_level_values("IssueCreatedAt") >= last_3months]
+
+    df = counts.unstack("Severity", fill_value=0)
+    # Severities in display order, whichever backend grouped the counts
+    df = df[sorted(df.columns, key=lambda x: SEVERITY_LEVELS.index(x) if x in SEVERITY_LEVELS else len(SEVERITY_LEVELS))]
     data = []
     for x in df.columns:
         data.append(go.Bar(name=str(x), x=df.index, y=df[x], text=df[x], textposition="outside",))
@@ -598,3 +1083,192 @@ def totalOpenIssues():
         ),
     }
     return KPI
+
+
+# Open Issues per Severity at the end of every day, from the sweep-line over creation and closing events.
+# Only issues created within the reporting window are counted.
+@metrics.timed("openBacklog")
+def openBacklog(scope=None):
+    swept = open_backlog(scope)
+    today = pd.to_datetime(today_date, format="%d-%m-%Y")
+    df = swept.daily(end=today)
+
+    KPI = {
+        "data": [go.Scatter(x=df.index, y=df[x], name=x, mode="lines", stackgroup="backlog") for x in df.columns],
+        "layout": dict(
+            title="Open Issues over time ({} open on {})".format(int(swept.as_of(today).sum()), today.date()),
+            xaxis=dict(
+                # Sliding window for Graph
+                rangeselector=dict(
+                    buttons=list(
+                        [
+                            dict(count=1, label="1m", step="month", stepmode="backward"),
+                            dict(count=3, label="3m", step="month", stepmode="backward"),
+                            dict(count=6, label="6m", step="month", stepmode="backward"),
+                            dict(step="all"),
+                        ]
+                    )
+                ),
+                type="date",
+                title="Date",
+            ),
+            yaxis={"title": "Number of Open Issues"},
+            hovermode="x",
+        ),
+    }
+    return KPI
+
+
+# Open Issues per KPI target and the share of closed issues fixed in KPI targets for every day of the reporting window,
+# evaluated as of each day in one sweep over the compliance events
+@metrics.timed("kpiComplianceOverTime")
+def kpiComplianceOverTime(scope=None):
+    df = compliance_as_of(scope)
+    names = {
+        "normal": "Issues in KPI targets",
+        "about_to_violate": "Issues about to violate KPI targets",
+        "violated": "Issues have violated KPI targets",
+    }
+    colors = {
+        "normal": "rgb(0, 204, 150)",
+        "about_to_violate": "rgb(239, 85, 59)",
+        "violated": "rgb(99, 110, 250)",
+    }
+
+    data = [
+        go.Scatter(
+            x=df.index, y=df[target], name=name, mode="lines", stackgroup="open", line=dict(color=colors[target])
+        )
+        for target, name in names.items()
+    ]
+    data.append(
+        go.Scatter(
+            x=df.index,
+            y=df["hit_rate"],
+            name="Closed issues fixed in KPI targets (%)",
+            mode="lines",
+            yaxis="y2",
+            line=dict(color="rgb(0, 0, 0)", dash="dot"),
+        )
+    )
+    KPI = {
+        "data": data,
+        "layout": dict(
+            title="KPI compliance over time",
+            xaxis=dict(type="date", title="Date"),
+            yaxis={"title": "Number of Open Issues"},
+            yaxis2=dict(title="Fixed in KPI targets (%)", overlaying="y", side="right", range=[0, 100]),
+            legend=dict(orientation="h", y=-0.2),
+            hovermode="x",
+        ),
+    }
+    return KPI
+
+
+# Resolution time percentiles (in business days) of the closed issues per severity, with buttons switching to the
+# busiest assignees and, with several sources, to projects. They are read off the merged resolution_days histogram.
+@metrics.timed("resolutionTimePercentiles")
+def resolutionTimePercentiles(scope=None):
+    scope = current() if scope is None else scope
+    counts = scope["resolution_days"]
+    overall = resolution.percentiles(counts)
+    by_severity = resolution.percentiles(counts, ["Severity"])
+    by_assignee = resolution.percentiles(counts, ["AssigneeName"]).nlargest(TOP_ASSIGNEES, "issues")
+    views = {
+        "Severity": by_severity.reindex([s for s in SEVERITY_LEVELS if s in by_severity.index]),
+        "Assignee": by_assignee.sort_values("issues"),
+    }
+    if "Project" in counts.index.names:
+        views["Project"] = resolution.percentiles(counts, ["Project"]).sort_index()
+    colors = ["rgb(0, 204, 150)", "rgb(99, 110, 250)", "rgb(239, 85, 59)"]
+    percentile_columns = ["p{}".format(p) for p in resolution.PERCENTILES]
+
+    data = []
+    for number, df in enumerate(views.values()):
+        df = pd.concat([df, overall])
+        for column, color in zip(percentile_columns, colors):
+            data.append(
+                go.Bar(
+                    y=[str(label) for label in df.index],
+                    x=df[column].round(1),
+                    name=column,
+                    orientation="h",
+                    marker={"color": color},
+                    customdata=df["issues"],
+                    hovertemplate="%{y}: %{x} days (%{customdata} issues)",
+                    visible=number == 0,
+                )
+            )
+    buttons = [
+        dict(
+            label=view,
+            method="update",
+            args=[{"visible": [n // len(percentile_columns) == number for n in range(len(data))]}],
+        )
+        for number, view in enumerate(views)
+    ]
+
+    KPI = {
+        "data": data,
+        "layout": {
+            "title": "Issues Resolution Time Percentiles",
+            "barmode": "group",
+            "yaxis": {"automargin": True},
+            "xaxis": {"title": "Number of Business Days"},
+            "hovermode": "closest",
+            "margin": dict(l=100,),
+            "updatemenus": [dict(type="buttons", direction="right", buttons=buttons, x=1, y=1.15)],
+        },
+    }
+    return KPI
+
+
+# Open and closed issues per severity under proposed KPI targets ((warn, limit) business days per severity), next to
+# the counts under KPI_TARGETS, as counted by a what-if simulator
+@metrics.timed("whatIfKPITargets")
+def whatIfKPITargets(targets=None, simulator=None):
+    targets = KPI_TARGETS if targets is None else targets
+    simulator = target_simulator() if simulator is None else simulator
+    proposed = simulator.counts(targets)
+    baseline = simulator.counts(KPI_TARGETS)
+    names = {
+        "normal": ("Issues in KPI targets", "rgb(0, 204, 150)"),
+        "about_to_violate": ("Issues about to violate KPI targets", "rgb(239, 85, 59)"),
+        "violated": ("Issues have violated KPI targets", "rgb(99, 110, 250)"),
+        "hit": ("Issues fixed in KPI targets", "rgb(0, 204, 150)"),
+        "miss": ("Issues missing KPI targets", "rgb(99, 110, 250)"),
+    }
+
+    data = []
+    for target, (name, color) in names.items():
+        state = "Open" if target in OPEN_TARGETS else "Closed"
+        change = proposed[target] - baseline[target]
+        data.append(
+            go.Bar(
+                x=[list(proposed.index), [state] * len(proposed)],
+                y=proposed[target],
+                name=name,
+                marker={"color": color},
+                customdata=change,
+                hovertemplate="%{y} issues (%{customdata:+d} against the current KPI targets)",
+            )
+        )
+
+    def hit_rate(counts):
+        closed = counts["hit"].sum() + counts["miss"].sum()
+        return round(100 * counts["hit"].sum() / closed, 1) if closed else 0
+
+    KPI = {
+        "data": data,
+        "layout": {
+            "title": "What-if KPI targets: {} open issues violated (now {}), {}% of closed issues fixed in targets "
+            "(now {}%)".format(
+                proposed["violated"].sum(), baseline["violated"].sum(), hit_rate(proposed), hit_rate(baseline)
+            ),
+            "barmode": "stack",
+            "yaxis": {"title": "Number of Issues"},
+            "hovermode": "closest",
+            "legend": dict(orientation="h", y=-0.2),
+        },
+    }
+    return KPI
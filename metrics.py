@@ -0,0 +1,191 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+import flask
+import pandas as pd
+
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Set KPI_TRACEMALLOC=1 to also record the peak memory allocated by every stage (slows the pipeline down)
+if os.environ.get("KPI_TRACEMALLOC") == "1":
+    tracemalloc.start()
+
+# Set KPI_PROFILING=1 to allow profiling a single request with cProfile through /metrics/profile
+PROFILING = os.environ.get("KPI_PROFILING") == "1"
+
+_lock = threading.Lock()
+# stage -> {"count", "seconds", "rows", "peak_bytes"}
+stages = {}
+# route -> {"buckets": [...], "count", "seconds"}
+requests = {}
+
+
+def record_stage(stage, seconds, rows=None, peak_bytes=None):
+    with _lock:
+        entry = stages.setdefault(stage, {"count": 0, "seconds": 0.0, "rows": None, "peak_bytes": None})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        if rows is not None:
+            entry["rows"] = rows
+        if peak_bytes is not None:
+            entry["peak_bytes"] = max(entry["peak_bytes"] or 0, peak_bytes)
+
+
+def record_request(route, seconds):
+    with _lock:
+        entry = requests.setdefault(route, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "seconds": 0.0})
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                entry["buckets"][i] += 1
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+
+# Number of rows of a stage's result: a DataFrame, or the first DataFrame of a tuple
+def result_rows(result):
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    return None
+
+
+# Peaks of the stages being timed on this thread that their nested stages reset, innermost last
+_peaks = threading.local()
+
+
+# Decorator recording the wall time, result rows and (with tracemalloc) peak memory of every call under the stage name.
+# The traced peak is reset for every stage. Stages nest (load_dataset -> load_issues -> ...), so the peak a nested
+# stage resets is carried over to the enclosing one, as is the nested stage's own peak once it returns.
+# Tracing is process wide: stages running at the same time on other threads add to each other's peaks.
+def timed(stage):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                stack = _peaks.__dict__.setdefault("stack", [])
+                if stack:
+                    stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+                held = tracemalloc.get_traced_memory()[0]
+                stack.append(0)
+            try:
+                start = time.perf_counter()
+                result = function(*args, **kwargs)
+                seconds = time.perf_counter() - start
+            finally:
+                if tracing:
+                    peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+                    if stack:
+                        stack[-1] = max(stack[-1], peak)
+            record_stage(stage, seconds, result_rows(result), peak - held if tracing else None)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# All metrics in the Prometheus text exposition format
+def exposition():
+    lines = []
+    with _lock:
+        lines.append("# HELP kpi_stage_seconds Wall time of pipeline stages and KPI functions")
+        lines.append("# TYPE kpi_stage_seconds summary")
+        for stage, entry in sorted(stages.items()):
+            lines.append('kpi_stage_seconds_count{{stage="{}"}} {}'.format(escape(stage), entry["count"]))
+            lines.append('kpi_stage_seconds_sum{{stage="{}"}} {}'.format(escape(stage), entry["seconds"]))
+        lines.append("# HELP kpi_stage_rows Rows returned by the last run of a pipeline stage")
+        lines.append("# TYPE kpi_stage_rows gauge")
+        for stage, entry in sorted(stages.items()):
+            if entry["rows"] is not None:
+                lines.append('kpi_stage_rows{{stage="{}"}} {}'.format(escape(stage), entry["rows"]))
+        lines.append("# HELP kpi_stage_peak_bytes Peak memory allocated by a pipeline stage (KPI_TRACEMALLOC=1)")
+        lines.append("# TYPE kpi_stage_peak_bytes gauge")
+        for stage, entry in sorted(stages.items()):
+            if entry["peak_bytes"] is not None:
+                lines.append('kpi_stage_peak_bytes{{stage="{}"}} {}'.format(escape(stage), entry["peak_bytes"]))
+
+        lines.append("# HELP kpi_request_seconds Latency of Dash callbacks and other requests")
+        lines.append("# TYPE kpi_request_seconds histogram")
+        for route, entry in sorted(requests.items()):
+            label = 'route="{}"'.format(escape(route))
+            for bound, count in zip(LATENCY_BUCKETS, entry["buckets"]):
+                lines.append('kpi_request_seconds_bucket{{{},le="{}"}} {}'.format(label, bound, count))
+            lines.append('kpi_request_seconds_bucket{{{},le="+Inf"}} {}'.format(label, entry["count"]))
+            lines.append("kpi_request_seconds_sum{{{}}} {}".format(label, entry["seconds"]))
+            lines.append("kpi_request_seconds_count{{{}}} {}".format(label, entry["count"]))
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    lines.append("# HELP kpi_process_max_rss_bytes Peak resident memory of this worker process")
+    lines.append("# TYPE kpi_process_max_rss_bytes gauge")
+    lines.append("kpi_process_max_rss_bytes {}".format(max_rss))
+    return "\n".join(lines) + "\n"
+
+
+# Route label of the current request, Dash callbacks are told apart by their outputs
+def request_route():
+    if flask.request.path.endswith("_dash-update-component"):
+        body = flask.request.get_json(silent=True) or {}
+        return "callback:" + str(body.get("output", ""))
+    rule = flask.request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+# One-shot cProfile: arming it profiles the next request, whose statistics are then served from /metrics/profile
+_profile = {"armed": False, "report": "No request profiled yet\n"}
+
+
+# Time every request of the server and expose /metrics (and /metrics/profile when KPI_PROFILING=1)
+def register(server):
+    @server.before_request
+    def start_timer():
+        flask.g.kpi_request_start = time.perf_counter()
+        if _profile["armed"] and not flask.request.path.startswith("/metrics"):
+            _profile["armed"] = False
+            flask.g.kpi_profiler = cProfile.Profile()
+            flask.g.kpi_profiler.enable()
+
+    @server.after_request
+    def stop_timer(response):
+        profiler = flask.g.pop("kpi_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            report = io.StringIO()
+            report.write("Profile of {} {}\n".format(flask.request.method, request_route()))
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+            _profile["report"] = report.getvalue()
+        start = flask.g.pop("kpi_request_start", None)
+        if start is not None:
+            record_request(request_route(), time.perf_counter() - start)
+        return response
+
+    def serve_metrics():
+        return flask.Response(exposition(), mimetype="text/plain; version=0.0.4")
+
+    def serve_profile():
+        if not PROFILING:
+            flask.abort(404)
+        if flask.request.args.get("arm"):
+            _profile["armed"] = True
+            return flask.Response("Profiling the next request\n", mimetype="text/plain")
+        return flask.Response(_profile["report"], mimetype="text/plain")
+
+    server.add_url_rule("/metrics", "metrics", serve_metrics)
+    server.add_url_rule("/metrics/profile", "metrics_profile", serve_profile)
@@ -0,0 +1,61 @@
+import glob
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+import main
+
+
+# Exports of a directory (every *.csv in it) or of a glob pattern, in a stable order
+def source_files(sources):
+    pattern = os.path.join(sources, "*.csv") if os.path.isdir(sources) else sources
+    return sorted(glob.glob(pattern))
+
+
+# Project name of every export: its path relative to the common directory, without extension
+# ("exports/api.csv" -> "api", "exports/api/issues.csv" -> "api/issues")
+def project_names(paths):
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    return [os.path.splitext(os.path.relpath(os.path.abspath(p), common))[0] for p in paths]
+
+
+# Worker: parse and classify one export into its partial aggregates, None when it has no security issues in the window
+def ingest_project(path, project, today_date):
+    security_data, df_open, df_close = main.load_issues(path, today_date)
+    if security_data.empty:
+        return None
+    part = main.issue_aggregates(security_data, df_open, df_close)
+    part["at_risk"].insert(0, "Project", project)
+    part["resolution_days"] = pd.concat({project: part["resolution_days"]}, names=["Project"])
+    return part
+
+
+# Process pool for the workers. Workers are not forked from the server, whose threads may hold locks (e.g. the
+# metrics lock) at fork time: they are forked from a fork server that only imported main, else spawned.
+# Workers start without the server's data, initializer(*initargs) hands them what they need.
+def process_pool(workers=None, initializer=None, initargs=()):
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["main"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer, initargs=initargs)
+
+
+# Partial aggregates of every project of a directory or glob of exports, parsed in parallel.
+# Returns {project: aggregates} for the projects with security issues, merge_aggregates combines them.
+def ingest_projects(sources, today_date, workers=None):
+    paths = source_files(sources)
+    if not paths:
+        raise ValueError("No exports found for {}".format(sources))
+    names = project_names(paths)
+    with process_pool(workers) as pool:
+        parts = pool.map(ingest_project, paths, names, repeat(today_date))
+        by_project = {name: part for name, part in zip(names, parts) if part is not None}
+    if not by_project:
+        prev_year = main.window_start(today_date)
+        raise ValueError("No security issues created after {} in {}".format(prev_year.date(), sources))
+    return by_project
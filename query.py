@@ -0,0 +1,306 @@
+import numpy as np
+import pandas as pd
+
+import compliance
+import main
+
+
+# Codes of a column over the given categories, the missing values (code -1) moved to an extra last slot
+def slot_codes(values, categories):
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+    return np.where(codes < 0, len(categories), codes)
+
+
+# Days of datetime values as codes into their sorted distinct days
+def day_codes(values):
+    days, codes = np.unique(np.asarray(values, dtype="datetime64[D]"), return_inverse=True)
+    return days, codes
+
+
+# Non-zero sums of day x category cells as a Series indexed like a group by over the two, categories being codes of
+# the cells. A last slot of missing categories, if any, is left out.
+def cell_series(sums, days, categories, names):
+    sums = sums.reshape(len(days), -1)[:, : len(categories)].ravel()
+    cells = np.flatnonzero(sums)
+    index = pd.MultiIndex.from_arrays(
+        [
+            pd.DatetimeIndex(days[cells // len(categories)], name=names[0]),
+            pd.CategoricalIndex(
+                pd.Categorical.from_codes(cells % len(categories), categories=categories), name=names[1]
+            ),
+        ]
+    )
+    return pd.Series(sums[cells], index=index)
+
+
+# Boolean lookup table over the codes of categories (plus the missing slot): True for the selected values,
+# everything when none are selected
+def allowed(categories, selected):
+    if not selected:
+        return np.ones(len(categories) + 1, dtype=bool)
+    return np.append(np.isin(np.asarray(categories, dtype=object), list(selected)), False)
+
+
+# Sums per cell of the rows of the picked issues (a boolean array over the sorted issues) for a table of
+# (issue of every row or None when the rows are the issues, {name: (cell of every row, weight or None, cells)})
+def tally(table, picked):
+    issue, columns = table
+    rows = np.flatnonzero(picked if issue is None else picked[issue])
+    return {
+        name: np.bincount(cell[rows], weights=None if weight is None else weight[rows], minlength=size)
+        for name, (cell, weight, size) in columns.items()
+    }
+
+
+# In-memory query engine behind the cross-filters of the dashboard.
+# Issues are sorted once by creation date so that a date range is a binary search and a slice. Severity, assignee,
+# state and labels are tested through lookup tables over their categorical codes. Every open and closed issue is
+# precomputed as the cells of the cubes and daily counts it adds to, and its backlog and compliance events as those of
+# its profile (see profile_events), so the aggregates of any selection are a handful of bincounts instead of
+# re-running the classification, group bys and sweeps of issue_aggregates. When most issues are selected the rest is
+# counted and subtracted from the totals, which bounds the work by half of the issues.
+class IssueQuery:
+    def __init__(self, security_data, df_open, df_close, label_index=None):
+        order = np.argsort(security_data["IssueCreatedAt"].values, kind="mergesort")
+        issues = security_data.iloc[order]
+        self.created = issues["IssueCreatedAt"].values
+        self.label_index = label_index
+        self.order = order
+        # Sorted position of every row of security_data
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        self.severities = list(main.fixed_categorical(security_data["Severity"], main.SEVERITY_LEVELS).categories)
+        self.assignees = sorted(security_data["AssigneeName"].dropna().unique())
+        self.states = list(security_data["State"].cat.categories)
+        self.severity = slot_codes(issues["Severity"], self.severities)
+        self.assignee = slot_codes(issues["AssigneeName"], self.assignees)
+        self.state = slot_codes(issues["State"], self.states)
+
+        # df_open and df_close hold the opened and closed rows of security_data in its order (see split_issues), which
+        # maps issues to their rows by position: the index labels of frames grown by incremental refreshes may repeat
+        self.issue_of_open = rank[np.flatnonzero(security_data["State"].values == "opened")]
+        self.issue_of_close = rank[np.flatnonzero(security_data["State"].values == "closed")]
+        open_severity = slot_codes(df_open["Severity"], self.severities)
+        closed_severity = slot_codes(df_close["Severity"], self.severities)
+
+        open_target = main.classify_open(df_open["bussinessDays"], df_open["Severity"])
+        closed_target = main.classify_closed(df_close["days_to_KPI_target"], df_close["Severity"])
+        self.at_risk = df_open.assign(Target=open_target)[main.AT_RISK_COLUMNS]
+        self.at_risk_rows = np.flatnonzero(open_target.isin(["about_to_violate", "violated"]).values)
+        # Rows kpi_cube does not count but whose assignee it lists
+        self.open_assignee = slot_codes(df_open["AssigneeName"], self.assignees)
+        self.closed_assignee = slot_codes(df_close["AssigneeName"], self.assignees)
+        self.open_uncounted = np.flatnonzero(open_severity == len(self.severities))
+        self.closed_uncounted = np.flatnonzero(closed_severity == len(self.severities))
+
+        self.timestamps, timestamp = np.unique(self.created, return_inverse=True)
+        open_timestamp = np.searchsorted(self.timestamps, df_open["IssueCreatedAt"].values)
+        days = df_close["days_to_KPI_target"].values.astype(float)
+        closed_size = self.cube_size(main.CLOSED_TARGETS)
+        closed_cell = self.cube_cells(closed_target, main.CLOSED_TARGETS, df_close)
+        unknown = np.flatnonzero(np.isnan(days))
+        # Rows of the aggregates per table they come from
+        self.tables = [
+            # Issues per (creation timestamp, state)
+            (None, {"daily": (timestamp * (len(self.states) + 1) + self.state, None, self.daily_size(self.states))}),
+            (
+                self.issue_of_open,
+                {
+                    "open_cube": (
+                        self.cube_cells(open_target, main.OPEN_TARGETS, df_open),
+                        None,
+                        self.cube_size(main.OPEN_TARGETS),
+                    ),
+                    # Open issues per (creation timestamp, severity)
+                    "open_daily": (
+                        open_timestamp * (len(self.severities) + 1) + open_severity,
+                        None,
+                        self.daily_size(self.severities),
+                    ),
+                },
+            ),
+            (
+                self.issue_of_close,
+                {
+                    "closed_cube": (closed_cell, None, closed_size),
+                    "closed_days": (closed_cell, np.nan_to_num(days), closed_size),
+                    "resolution": self.resolution_cells(days, closed_severity),
+                },
+            ),
+            # Closed issues without days, which kpi_cube leaves out of the count of days
+            (self.issue_of_close[unknown], {"closed_unknown": (closed_cell[unknown], None, closed_size)}),
+        ]
+        self.profile_events(df_open, df_close, open_severity, closed_severity, closed_target)
+        # Issues per profile, the last one standing for issues neither open nor closed
+        self.tables.append((None, {"profiles": (self.profile_of_issue, None, self.profile_count)}))
+        everything = np.ones(len(self.created), dtype=bool)
+        self.totals = {name: sums for table in self.tables for name, sums in tally(table, everything).items()}
+
+    # Cell of every closed row in the histogram of resolution times (see resolution.histogram): one per distinct
+    # (severity, assignee, days) of the closed issues, plus a last one for the rows it leaves out.
+    # Sets resolution_index, the histogram index of the cells.
+    def resolution_cells(self, days, closed_severity):
+        known = ~np.isnan(days) & (closed_severity < len(self.severities)) & (self.closed_assignee < len(self.assignees))
+        whole = days[known].astype(np.int64)
+        first = whole.min() if len(whole) else 0
+        span = whole.max() - first + 1 if len(whole) else 1
+        keys = (closed_severity[known] * len(self.assignees) + self.closed_assignee[known]) * span + whole - first
+        keys, cell = np.unique(keys, return_inverse=True)
+        cells = np.full(len(days), len(keys), dtype=np.int64)
+        cells[known] = cell
+        pair, day = np.divmod(keys, span)
+        self.resolution_index = pd.MultiIndex.from_arrays(
+            [
+                pd.Categorical.from_codes(pair // len(self.assignees), categories=self.severities),
+                pd.Categorical.from_codes(pair % len(self.assignees), categories=self.assignees),
+                day + first,
+            ],
+            names=["Severity", "AssigneeName", "Days"],
+        )
+        return cells, None, len(keys) + 1
+
+    def cube_size(self, targets):
+        return (len(targets) + 1) * len(self.severities) * len(self.assignees) + 1
+
+    def daily_size(self, categories):
+        return len(self.timestamps) * (len(categories) + 1)
+
+    # Cell of every row in a Target x Severity x Assignee cube over all categories. Rows without a target go to the
+    # UNCLASSIFIED slot like in kpi_cube, rows that kpi_cube does not count to an extra last cell.
+    def cube_cells(self, target, targets, df):
+        target_codes = np.where(target.cat.codes < 0, len(targets), target.cat.codes)
+        severity = slot_codes(df["Severity"], self.severities)
+        assignee = slot_codes(df["AssigneeName"], self.assignees)
+        counted = (severity < len(self.severities)) & (assignee < len(self.assignees))
+        cell = (target_codes * len(self.severities) + severity) * len(self.assignees) + assignee
+        return np.where(counted, cell, self.cube_size(targets) - 1)
+
+    # Issues with the same creation day, closing day, severity and outcome have the same backlog and compliance events,
+    # so these are computed once per such profile and weighed with the number of selected issues of every profile
+    def profile_events(self, df_open, df_close, open_severity, closed_severity, closed_target):
+        rows = pd.concat(
+            [df_open[["IssueCreatedAt", "Severity"]], df_close[["IssueCreatedAt", "IssueClosedDate", "Severity"]]]
+        )
+        frame = pd.DataFrame(
+            {
+                "created": rows["IssueCreatedAt"].values.astype("datetime64[D]"),
+                "closed": rows["IssueClosedDate"].values.astype("datetime64[D]"),
+                "severity": np.concatenate([open_severity, closed_severity]),
+                "outcome": np.concatenate([np.full(len(df_open), -1), closed_target.cat.codes]),
+            }
+        )
+        # Profiles are numbered in order of their first row, like in main.parse_distinct
+        profile = frame.groupby(list(frame.columns), sort=False, dropna=False).ngroup().values
+        first = frame.drop_duplicates().index.values
+        self.profile_count = len(first) + 1
+        self.profile_of_issue = np.full(len(self.created), len(first))
+        self.profile_of_issue[np.concatenate([self.issue_of_open, self.issue_of_close])] = profile
+
+        created, closed, severity = (frame[column].values[first] for column in ["created", "closed", "severity"])
+        ended = np.flatnonzero(~np.isnat(closed))
+        self.backlog_days, day = day_codes(np.concatenate([created, closed[ended]]))
+        width = len(self.severities) + 1
+        self.events = {
+            "backlog_events": (
+                np.concatenate([np.arange(len(first)), ended]),
+                day * width + np.concatenate([severity, severity[ended]]),
+                np.repeat(np.array([1, -1]), [len(first), len(ended)]),
+                len(self.backlog_days) * width,
+            )
+        }
+
+        warn, limit = main.kpi_thresholds(rows["Severity"].values[first])
+        outcome = np.concatenate([np.full(len(df_open), np.nan, dtype=object), np.asarray(closed_target, dtype=object)])
+        profiles, dates, targets, changes = compliance.transitions(created, closed, warn, limit, outcome[first])
+        self.compliance_days, day = day_codes(dates)
+        width = len(main.OPEN_TARGETS + main.CLOSED_TARGETS)
+        self.events["compliance_events"] = (profiles, day * width + targets, changes, len(self.compliance_days) * width)
+
+    # Net change per cell of the events of the profiles, weighed by their number of selected issues
+    def event_sums(self, name, issues_per_profile):
+        profile, cell, change, size = self.events[name]
+        return np.bincount(cell, weights=issues_per_profile[profile] * change, minlength=size).astype(np.int64)
+
+    # Positions (into the sorted issues) of the issues created within [start, end] with one of the severities,
+    # assignees and states and all of the labels, None meaning any
+    def select(self, start=None, end=None, severities=None, assignees=None, states=None, labels=None):
+        lo = 0 if start is None else np.searchsorted(self.created, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = len(self.created)
+        if end is not None:
+            # The whole end day is part of the range
+            hi = np.searchsorted(self.created, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1)), side="left")
+        mask = allowed(self.severities, severities)[self.severity[lo:hi]]
+        mask &= allowed(self.assignees, assignees)[self.assignee[lo:hi]]
+        mask &= allowed(self.states, states)[self.state[lo:hi]]
+        if labels:
+            mask &= self.label_index.mask(all_of=labels)[self.order[lo:hi]]
+        return lo + np.flatnonzero(mask)
+
+    # The KPI aggregates (as issue_aggregates builds them) of the selected issues
+    def aggregates(self, selected):
+        chosen = np.zeros(len(self.created), dtype=bool)
+        chosen[selected] = True
+        if 2 * len(selected) > len(chosen):
+            left_out = {name: sums for table in self.tables for name, sums in tally(table, ~chosen).items()}
+            sums = {name: self.totals[name] - left_out[name] for name in self.totals}
+        else:
+            sums = {name: sums for table in self.tables for name, sums in tally(table, chosen).items()}
+
+        targets = main.OPEN_TARGETS + main.CLOSED_TARGETS
+        open_uncounted = self.open_uncounted[chosen[self.issue_of_open[self.open_uncounted]]]
+        closed_uncounted = self.closed_uncounted[chosen[self.issue_of_close[self.closed_uncounted]]]
+        closed_cube = {
+            "count": sums["closed_cube"],
+            "days_to_KPI_target": sums["closed_days"],
+            "days_to_KPI_target_count": sums["closed_cube"] - sums["closed_unknown"],
+        }
+        return {
+            "open_cube": self.cube({"count": sums["open_cube"]}, self.open_assignee[open_uncounted], main.OPEN_TARGETS),
+            "closed_cube": self.cube(closed_cube, self.closed_assignee[closed_uncounted], main.CLOSED_TARGETS),
+            "daily": cell_series(sums["daily"], self.timestamps, self.states, ["IssueCreatedAt", "State"]),
+            "open_daily": cell_series(
+                sums["open_daily"], self.timestamps, self.severities, ["IssueCreatedAt", "Severity"]
+            ),
+            "backlog_events": cell_series(
+                self.event_sums("backlog_events", sums["profiles"]),
+                self.backlog_days,
+                self.severities,
+                ["Date", "Severity"],
+            ),
+            "compliance_events": cell_series(
+                self.event_sums("compliance_events", sums["profiles"]),
+                self.compliance_days,
+                targets,
+                ["Date", "Target"],
+            ),
+            "resolution_days": self.resolution_series(sums["resolution"]),
+            "at_risk": self.at_risk.iloc[self.at_risk_rows[chosen[self.issue_of_open[self.at_risk_rows]]]],
+        }
+
+    # Histogram of resolution times from the sums per cell, without the cells of the rows it leaves out
+    def resolution_series(self, sums):
+        cells = np.flatnonzero(sums[:-1])
+        return pd.Series(sums[cells].astype(np.int64), index=self.resolution_index[cells], name="count")
+
+    # KPI cube (see main.kpi_cube) from the sums per cell of its columns, the last cell holding the rows it does not
+    # count. Like kpi_cube it only lists the selected assignees (also of uncounted rows) and extra severities.
+    def cube(self, columns, uncounted_assignees, targets):
+        shape = (len(targets) + 1, len(self.severities), len(self.assignees))
+        columns = {name: values[:-1].reshape(shape) for name, values in columns.items()}
+        count = columns["count"]
+        present = count.sum(axis=(0, 1)) > 0
+        present |= np.bincount(uncounted_assignees, minlength=len(self.assignees) + 1)[:-1] > 0
+        kept = np.arange(shape[1]) < len(main.SEVERITY_LEVELS)
+        kept |= count.sum(axis=(0, 2)) > 0
+
+        assignees = [a for a, p in zip(self.assignees, present) if p]
+        for name, values in columns.items():
+            values = values[:, kept][:, :, present]
+            if not assignees:
+                # An empty selection still gets one (all zero) assignee so that every Target x Severity cell exists
+                values = np.zeros((shape[0], int(kept.sum()), 1), dtype=values.dtype)
+            columns[name] = values.ravel()
+        severity = pd.Categorical([], categories=[s for s, k in zip(self.severities, kept) if k])
+        assignee = pd.Categorical([], categories=assignees or ["No Assignee"])
+        return pd.DataFrame(columns, index=main.cube_index(targets, severity, assignee))
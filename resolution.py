@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Resolution time percentiles reported per group
+PERCENTILES = [50, 90, 99]
+
+
+# Closed issues per Severity x AssigneeName x Days, the business days they took to close: an exact histogram of the
+# resolution times. Resolution times are whole business days, so the histogram only has a cell per distinct day of a
+# group and, unlike a sampling sketch, merges by summing and retracts by negating like the other aggregates.
+# A "count" column weighs rows standing for several issues. Issues without days or severity are left out.
+def histogram(df):
+    days = df["days_to_KPI_target"].values.astype(float)
+    known = ~np.isnan(days) & df["Severity"].notnull().values & df["AssigneeName"].notnull().values
+    frame = pd.DataFrame(
+        {
+            "Severity": df["Severity"].values[known],
+            "AssigneeName": df["AssigneeName"].values[known],
+            "Days": days[known].astype(np.int64),
+            "count": df["count"].values[known].astype(np.int64) if "count" in df else 1,
+        }
+    )
+    return frame.groupby(["Severity", "AssigneeName", "Days"], observed=True)["count"].sum()
+
+
+# Resolution time percentiles (interpolated between the closest ranks like numpy.percentile) and number of issues
+# per value of the given levels of a histogram, or of all issues (as "All") without levels.
+# Every percentile is a binary search of its rank in the cumulative counts, the issues are never sorted.
+def percentiles(counts, levels=(), percentiles=PERCENTILES):
+    columns = ["p{}".format(p) for p in percentiles] + ["issues"]
+    counts = counts.groupby(level=list(levels) + ["Days"], observed=True).sum()
+    counts = counts[counts > 0]
+    if counts.empty:
+        return pd.DataFrame(columns=columns, dtype=float)
+
+    groups = counts.index.droplevel("Days") if levels else pd.Index(["All"] * len(counts))
+    codes, names = pd.factorize(groups)
+    days = counts.index.get_level_values("Days").values
+    cumulative = np.cumsum(counts.values)
+    issues = np.bincount(codes, weights=counts.values).astype(np.int64)
+    first = np.cumsum(issues) - issues
+
+    result = {}
+    for p in percentiles:
+        rank = (issues - 1) * p / 100
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, issues - 1)
+        below = days[np.searchsorted(cumulative, first + low, side="right")]
+        above = days[np.searchsorted(cumulative, first + high, side="right")]
+        result["p{}".format(p)] = below + (rank - low) * (above - below)
+    result["issues"] = issues
+    return pd.DataFrame(result, index=names, columns=columns)
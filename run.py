@@ -3,28 +3,56 @@ import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
 import dash_table as dt
-import plotly.graph_objs as go
-import plotly.express as px
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
-# Import all functions from main file
-from main import *
+import flask
+import main
+import clock
+import figure_store
+import incremental
+import jobs
+import metrics
+import table_index
+import timeseries
 
-# create a subset of openIssuesFilter dataframe for datatable
-df_open_critical_issues = openIssuesFilter()[["Git Issue Id", "Title", "AssigneeName", "Severity", "Target"]]
+# Recomputations (label and project scopes, reloads of the export) run as background jobs off the request threads
+runner = jobs.JobRunner()
+
+
+# Aggregates of a selection (see scope_data): filtered by the query engine when a filter is set, else those of its
+# labels or projects
+def selected_aggregates(selection):
+    if main.filter_key(selection.get("filters")) is not None:
+        return main.filtered_aggregates(selection["labels"], selection["filters"])
+    return runner.scope_aggregates(selection["labels"], selection["projects"])
+
+
+# Open issues about_to_violate or violated their KPI targets, subset of openIssuesFilter dataframe for datatable.
+# Read through main so that refreshed aggregates are picked up, scoped to the selection if any.
+def critical_issues(selection=None):
+    return selected_aggregates(selection or scope_data())["at_risk"]
 
-# Filter: Keep only about_to_violate and violated data
-df_open_critical_issues = df_open_critical_issues.loc[
-    (df_open_critical_issues["Target"] == "about_to_violate") | (df_open_critical_issues["Target"] == "violated")
-]
 
 # Dropdown to filter datatable values
-dpdown = []
-for i in df_open_critical_issues["Target"].unique():
-    str(dpdown.append({"label": i, "value": (i)}))
+def dropdown_options():
+    dpdown = []
+    for i in critical_issues()["Target"].unique():
+        str(dpdown.append({"label": i, "value": (i)}))
+    return dpdown
+
+
+# Job workers started from `python run.py` run this module again as __mp_main__ (see projects.process_pool),
+# only the server itself ages and refreshes its dataset
+SERVER = __name__ != "__mp_main__"
+
+# Age open issues across their KPI thresholds while the server runs
+if main.LIVE_CLOCK and SERVER:
+    clock.start_refresher()
+
+# Pick up the changes of the export while the server runs
+if main.REFRESH_INTERVAL and SERVER:
+    incremental.start_refresher(main.REFRESH_INTERVAL)
 
 
 """
@@ -38,94 +66,487 @@ server=app.server
 
 app.title = "Key Performance Indicators"
 
+# Per request latency and pipeline stage timings on /metrics
+metrics.register(server)
 
-@app.callback(
-    dash.dependencies.Output("table-container", "children"), [dash.dependencies.Input("dropdown", "value")],
+
+# KPI figures, serialized and compressed once per dataset version and served from /_kpi-figures/<name>
+KPI_FIGURES = {
+    "issuesTimeChart": main.issuesTimeChart,
+    "openIssuesWithAssignee": main.openIssuesWithAssignee,
+    "openCriticalIssues": main.openCriticalIssues,
+    "openIssuesSeverityKPITargets": main.openIssuesSeverityKPITargets,
+    "openCriticalIssuesWithAssignee": main.openCriticalIssuesWithAssignee,
+    "closedIssuesKPITargets": main.closedIssuesKPITargets,
+    "closedIssuesSeverityKPITargets": main.closedIssuesSeverityKPITargets,
+    "averageIssueResolutionTime": main.averageIssueResolutionTime,
+    "totalOpenIssues": main.totalOpenIssues,
+    "openBacklog": main.openBacklog,
+    "kpiComplianceOverTime": main.kpiComplianceOverTime,
+    "resolutionTimePercentiles": main.resolutionTimePercentiles,
+}
+# Graph showing each KPI figure
+KPI_GRAPHS = {
+    "issuesTimeChart": "Open Issues vs Closed Issues",
+    "openIssuesWithAssignee": "Open Issues with Assignee Name",
+    "openCriticalIssues": "Open issues KPI targets",
+    "openIssuesSeverityKPITargets": "Open issues KPI target as per Severity",
+    "openCriticalIssuesWithAssignee": "Open critical issues with Assignee name",
+    "closedIssuesKPITargets": "Closed Issues KPI Targets",
+    "closedIssuesSeverityKPITargets": "Closed issues KPI target as per Severity",
+    "averageIssueResolutionTime": "Avergae Issues Resolution Time",
+    "totalOpenIssues": "Total Open Issues",
+    "openBacklog": "Open Issues over time",
+    "kpiComplianceOverTime": "KPI compliance over time",
+    "resolutionTimePercentiles": "Issues Resolution Time Percentiles",
+}
+# The live clock moves today_date forward without a new version when no issue changed its target
+figures = figure_store.FigureStore(
+    dict(KPI_FIGURES, layout=lambda: serve_layout()), lambda: (main.version, main.today_date)
 )
+figures.register(server, "/_kpi-figures")
 
-# Datatable app layout
-def display_table(dpdown):
-    df_temp = df_open_critical_issues[df_open_critical_issues["Target"] == dpdown]
-    return html.Div(
-        [
-            dt.DataTable(
-                id="main-table",
-                columns=[{"name": i, "id": i} for i in df_temp.columns],
-                data=df_temp.to_dict("rows"),
-                style_cell={"textAlign": "center"},
-                style_as_list_view=True,
-                style_header={"backgroundColor": "rgb(230, 230, 230)", "fontWeight": "bold",},
-                style_cell_conditional=[{"if": {"column_id": "Title"}, "textAlign": "left"}],
-            )
-        ]
+
+# Pick up reloads finished by the job workers, also when another server process started them
+@server.before_request
+def adopt_reloads():
+    runner.sync()
+
+
+# Serve the whole layout from the figure store, with ETag / If-None-Match handling, instead of re-encoding it per load
+@server.before_request
+def cached_layout():
+    if flask.request.path == app.config.routes_pathname_prefix + "_dash-layout":
+        return figures.payload("layout").response()
+
+
+# Rows sent to the browser per DataTable page
+PAGE_SIZE = 25
+
+
+# Datatable app layout, paged, sorted and filtered on the server so that only one page is sent per request
+def critical_issues_table():
+    return dt.DataTable(
+        id="main-table",
+        columns=[{"name": i, "id": i} for i in critical_issues().columns],
+        data=[],
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_action="custom",
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        filter_action="custom",
+        filter_query="",
+        style_cell={"textAlign": "center"},
+        style_as_list_view=True,
+        style_header={"backgroundColor": "rgb(230, 230, 230)", "fontWeight": "bold",},
+        style_cell_conditional=[{"if": {"column_id": "Title"}, "textAlign": "left"}],
     )
 
 
-body = dbc.Container(
+@app.callback(
+    [Output("main-table", "data"), Output("main-table", "page_count")],
     [
-        dbc.Row([html.P("Security KPIs", className="text-center")]),
-        html.P([html.Label("KPI Target"), html.Div(dcc.Dropdown(id="dropdown", options=dpdown)),]),
-        html.Div(id="table-container", className="tableDiv"),
-    ]
+        Input("dropdown", "value"),
+        Input("scope", "data"),
+        Input("main-table", "page_current"),
+        Input("main-table", "page_size"),
+        Input("main-table", "sort_by"),
+        Input("main-table", "filter_query"),
+    ],
 )
+def display_table(dpdown, scope, page_current, page_size, sort_by, filter_query):
+    index = table_index.table_index(critical_issues(scope), "Target", dpdown)
+    df_temp, page_count = index.page(page_current, page_size, sort_by, filter_query)
+    return df_temp.to_dict("records"), page_count
 
-app.layout = html.Div(
+
+# Assignee charts showing one page of assignees at a time, a click on a bucket bar drills into the next or previous page
+DRILL_DOWN_FIGURES = ["openIssuesWithAssignee", "openCriticalIssuesWithAssignee"]
+
+# Figures re-scoped by the label and project selectors and the filters. The time chart and the assignee charts have
+# their own callbacks, as they also follow the zoom or drill-down.
+SCOPED_FIGURES = [name for name in KPI_GRAPHS if name != "issuesTimeChart" and name not in DRILL_DOWN_FIGURES]
+
+
+# Selection whose aggregates the figures show, only updated once its job (if any) has finished.
+# The version makes a reload of the export redraw the figures.
+def scope_data(selected_labels=None, selected_projects=None, filters=None):
+    return {
+        "labels": selected_labels or [],
+        "projects": selected_projects or [],
+        "filters": filters or {},
+        "version": main.version,
+    }
+
+
+# Run the recomputation a selection or the reload button asks for as a background job and poll it until it is done,
+# then hand the new scope to the figure callbacks. Selections computed before are shown right away, and so are
+# filtered ones: the query engine answers them within the request.
+@app.callback(
     [
-        html.Div([html.H4("Key Performance Indicators", className="text-center")]),
-        html.Div(
-            [dcc.Graph(id="Open Issues vs Closed Issues", figure=issuesTimeChart())],
-            className="shadow-sm p-2 bg-white rounded m-2",
-        ),
-        html.Div(
-            [dcc.Graph(id="Open Issues with Assignee Name", figure=openIssuesWithAssignee())],
-            className="shadow-sm p-2 bg-white rounded m-2",
-        ),
-        html.Div(
-            [
-                dcc.Graph(id="Open issues KPI targets", figure=openCriticalIssues(), className="col",),
-                dcc.Graph(
-                    id="Open issues KPI target as per Severity", figure=openIssuesSeverityKPITargets(), className="col",
-                ),
-            ],
-            className="shadow-sm bg-white rounded row m-2",
-        ),
+        Output("scope", "data"),
+        Output("job", "data"),
+        Output("job-poll", "disabled"),
+        Output("job-progress", "children"),
+    ],
+    [
+        Input("label-filter", "value"),
+        Input("project-filter", "value"),
+        Input("date-filter", "start_date"),
+        Input("date-filter", "end_date"),
+        Input("severity-filter", "value"),
+        Input("assignee-filter", "value"),
+        Input("state-filter", "value"),
+        Input("reload-button", "n_clicks"),
+        Input("job-poll", "n_intervals"),
+    ],
+    [State("job", "data")],
+    prevent_initial_call=True,
+)
+def track_job(
+    selected_labels, selected_projects, start, end, severities, assignees, states, reload_clicks, n_intervals, job_id
+):
+    filters = dict(zip(main.FILTERS, [start, end, severities, assignees, states]))
+    trigger = dash.callback_context.triggered[0]["prop_id"]
+    if trigger.startswith("job-poll"):
+        if job_id is None:
+            raise PreventUpdate
+    elif trigger.startswith("reload-button"):
+        job_id = runner.submit("reload", [main.today_date], reuse=False)
+    elif main.filter_key(filters) is not None:
+        return scope_data(selected_labels, selected_projects, filters), None, True, None
+    else:
+        job_id = runner.submit_scope(selected_labels, selected_projects)
+        if job_id is None:
+            return scope_data(selected_labels, selected_projects, filters), None, True, None
+
+    job = runner.status(job_id)
+    if job["state"] == jobs.DONE:
+        if job["kind"] == "reload":
+            runner.adopt_reload()
+        return scope_data(selected_labels, selected_projects, filters), None, True, None
+    if job["state"] == jobs.FAILED:
+        return dash.no_update, None, True, html.Div(job["message"], className="text-danger")
+    progress = dbc.Progress(
+        value=round(100 * job["progress"]), children=job["message"] or job["state"], striped=True, animated=True
+    )
+    return dash.no_update, job_id, False, progress
+
+
+# Re-scope every KPI figure to the issues carrying all selected labels or to the selected projects and to the filters,
+# the layout already holds the unscoped ones
+@app.callback(
+    [Output(KPI_GRAPHS[name], "figure") for name in SCOPED_FIGURES],
+    [Input("scope", "data")],
+    prevent_initial_call=True,
+)
+def display_label_scope(selection):
+    scope = selected_aggregates(selection)
+    if scope is main.aggregates:
+        return [figures.figure(name) for name in SCOPED_FIGURES]
+    return [KPI_FIGURES[name](scope) for name in SCOPED_FIGURES]
+
+
+# Re-sample the time chart for the zoomed window (or the selected scope) so that it never ships every daily point
+@app.callback(
+    Output(KPI_GRAPHS["issuesTimeChart"], "figure"),
+    [Input("scope", "data"), Input(KPI_GRAPHS["issuesTimeChart"], "relayoutData")],
+    prevent_initial_call=True,
+)
+def display_time_window(selection, relayout):
+    window = timeseries.relayout_window(relayout)
+    if window is False:
+        # Zooms and pans that leave the x axis alone keep the current figure
+        if dash.callback_context.triggered[0]["prop_id"].endswith("relayoutData"):
+            raise PreventUpdate
+        window = None
+    scope = selected_aggregates(selection)
+    if scope is main.aggregates and window is None:
+        return figures.figure("issuesTimeChart")
+    return main.issuesTimeChart(scope, window)
+
+
+# Scope the assignee chart and follow clicks on its "Top" and "Other" buckets to the previous or next page of assignees
+def drill_down(name):
+    @app.callback(
+        Output(KPI_GRAPHS[name], "figure"),
+        [Input("scope", "data"), Input(KPI_GRAPHS[name], "clickData")],
+        prevent_initial_call=True,
+    )
+    def display_assignee_page(selection, click):
+        page = 0
+        if dash.callback_context.triggered[0]["prop_id"].endswith("clickData"):
+            page = ((click or {}).get("points") or [{}])[0].get("customdata")
+            # Clicks on assignees themselves do not change the page
+            if page is None:
+                raise PreventUpdate
+        scope = selected_aggregates(selection)
+        if scope is main.aggregates and page == 0:
+            return figures.figure(name)
+        return KPI_FIGURES[name](scope, page)
+
+
+for name in DRILL_DOWN_FIGURES:
+    drill_down(name)
+
+
+# What-if panel: a (warn, limit) slider per severity with a KPI target, starting at KPI_TARGETS, and the issues per
+# target under the thresholds they set. Only shown when the issue frames are kept, like the filters.
+WHAT_IF_GRAPH = "What-if KPI targets"
+WHAT_IF_MAX_DAYS = 2 * max(limit for _, limit in main.KPI_TARGETS.values())
+
+
+def target_slider_id(severity):
+    return "target-" + severity.replace(" ", "-")
+
+
+# Count the issues of the selected scope under the slider thresholds on every slider move
+@app.callback(
+    Output(WHAT_IF_GRAPH, "figure"),
+    [Input(target_slider_id(severity), "value") for severity in main.KPI_TARGETS] + [Input("scope", "data")],
+)
+def display_what_if(*values):
+    *thresholds, selection = values
+    if not main.filters_supported():
+        raise PreventUpdate
+    targets = {severity: tuple(value) for severity, value in zip(main.KPI_TARGETS, thresholds)}
+    selection = selection or scope_data()
+    return main.whatIfKPITargets(targets, main.target_simulator(selection["labels"], selection["filters"]))
+
+
+def what_if_panel():
+    sliders = [
         html.Div(
             [
+                html.Label(severity, className="col-2"),
                 html.Div(
-                    [dcc.Graph(id="Open critical issues with Assignee name", figure=openCriticalIssuesWithAssignee(),)]
-                ),
-                html.Div(
-                    [
-                        html.Label("KPI Status", style={"width": "10%"}),
-                        dcc.Dropdown(id="dropdown", options=dpdown, style={"width": "90%"}, className="col-4",),
-                    ],
-                    className="bg-white row pb-2 ",
+                    dcc.RangeSlider(
+                        id=target_slider_id(severity),
+                        min=0,
+                        max=WHAT_IF_MAX_DAYS,
+                        value=[warn, limit],
+                        marks={limit: str(limit)},
+                        allowCross=False,
+                        updatemode="drag",
+                        tooltip={"placement": "bottom"},
+                    ),
+                    className="col-10",
                 ),
-                html.Div(id="table-container"),
             ],
-            className="shadow-sm bg-white rounded col p-4",
-        ),
-        html.Div(
-            [
-                dcc.Graph(id="Closed Issues KPI Targets", figure=closedIssuesKPITargets(), className="col-6"),
-                dcc.Graph(
-                    id="Closed issues KPI target as per Severity",
-                    figure=closedIssuesSeverityKPITargets(),
-                    className="col-6",
-                ),
-            ],
-            className="shadow-sm bg-white rounded row m-2",
-        ),
-        html.Div(
-            [
-                dcc.Graph(id="Avergae Issues Resolution Time", figure=averageIssueResolutionTime(), className="col-5",),
-                dcc.Graph(id="Total Open Issues", figure=totalOpenIssues(), className="col-7"),
-            ],
-            className="shadow-sm bg-light rounded row m-2",
-        ),
-    ],
-    className="bg-light p-4 text-dark",
+            className="row",
+        )
+        for severity, (warn, limit) in main.KPI_TARGETS.items()
+    ]
+    return html.Div(
+        [html.H5("What-if KPI targets (business days to about to violate / violated)")]
+        + sliders
+        + [dcc.Graph(id=WHAT_IF_GRAPH)],
+        className="shadow-sm p-4 bg-white rounded m-2",
+        style={} if main.filters_supported() else {"display": "none"},
+    )
+
+
+# Assignees of the current security issues, for the assignee filter
+def filter_assignees():
+    if not main.filters_supported():
+        return []
+    return sorted(main.security_data["AssigneeName"].dropna().unique())
+
+
+# The layout is built on every page load so that figures reflect the latest published aggregates
+def serve_layout():
+    return html.Div(
+        [
+            html.Div([html.H4("Key Performance Indicators", className="text-center")]),
+            html.Div(
+                [
+                    html.Label("Labels", style={"width": "10%"}),
+                    dcc.Dropdown(
+                        id="label-filter",
+                        options=[{"label": label, "value": label} for label in main.label_vocabulary()],
+                        multi=True,
+                        placeholder="All " + ", ".join(main.SCOPE_LABELS) + " issues",
+                        style={"width": "90%"},
+                        className="col-6",
+                    ),
+                ],
+                className="bg-white row p-2 m-2",
+            ),
+            # Only shown in multi-project mode
+            html.Div(
+                [
+                    html.Label("Projects", style={"width": "10%"}),
+                    dcc.Dropdown(
+                        id="project-filter",
+                        options=[{"label": project, "value": project} for project in main.by_project],
+                        multi=True,
+                        placeholder="All projects",
+                        style={"width": "90%"},
+                        className="col-6",
+                    ),
+                ],
+                className="bg-white row p-2 m-2",
+                style={} if main.by_project else {"display": "none"},
+            ),
+            # Only shown when the issue frames are kept, the query engine filters them
+            html.Div(
+                [
+                    html.Label("Filters", style={"width": "10%"}),
+                    dcc.DatePickerRange(
+                        id="date-filter",
+                        start_date_placeholder_text="Created from",
+                        end_date_placeholder_text="Created until",
+                        clearable=True,
+                        className="col-3",
+                    ),
+                    dcc.Dropdown(
+                        id="severity-filter",
+                        options=[{"label": severity, "value": severity} for severity in main.SEVERITY_LEVELS],
+                        multi=True,
+                        placeholder="All severities",
+                        className="col-2",
+                    ),
+                    dcc.Dropdown(
+                        id="assignee-filter",
+                        options=[{"label": assignee, "value": assignee} for assignee in filter_assignees()],
+                        multi=True,
+                        placeholder="All assignees",
+                        className="col-3",
+                    ),
+                    dcc.Dropdown(
+                        id="state-filter",
+                        options=[{"label": state, "value": state} for state in main.STATES],
+                        multi=True,
+                        placeholder="All states",
+                        className="col-2",
+                    ),
+                ],
+                className="bg-white row p-2 m-2",
+                style={} if main.filters_supported() else {"display": "none"},
+            ),
+            # Progress of the background job behind the current selection or reload
+            html.Div(
+                [
+                    html.Button("Reload data", id="reload-button", className="btn btn-outline-secondary btn-sm"),
+                    html.Div(id="job-progress", className="col-6"),
+                    dcc.Store(id="scope", data=scope_data()),
+                    dcc.Store(id="job"),
+                    dcc.Interval(id="job-poll", interval=500, disabled=True),
+                ],
+                className="bg-white row p-2 m-2",
+            ),
+            html.Div(
+                [dcc.Graph(id="Open Issues vs Closed Issues", figure=figures.figure("issuesTimeChart"))],
+                className="shadow-sm p-2 bg-white rounded m-2",
+            ),
+            html.Div(
+                [dcc.Graph(id="Open Issues with Assignee Name", figure=figures.figure("openIssuesWithAssignee"))],
+                className="shadow-sm p-2 bg-white rounded m-2",
+            ),
+            html.Div(
+                [
+                    dcc.Graph(id="Open issues KPI targets", figure=figures.figure("openCriticalIssues"), className="col"),
+                    dcc.Graph(
+                        id="Open issues KPI target as per Severity",
+                        figure=figures.figure("openIssuesSeverityKPITargets"),
+                        className="col",
+                    ),
+                ],
+                className="shadow-sm bg-white rounded row m-2",
+            ),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            dcc.Graph(
+                                id="Open critical issues with Assignee name",
+                                figure=figures.figure("openCriticalIssuesWithAssignee"),
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        [
+                            html.Label("KPI Status", style={"width": "10%"}),
+                            dcc.Dropdown(
+                                id="dropdown", options=dropdown_options(), style={"width": "90%"}, className="col-4",
+                            ),
+                        ],
+                        className="bg-white row pb-2 ",
+                    ),
+                    html.Div(critical_issues_table(), id="table-container"),
+                ],
+                className="shadow-sm bg-white rounded col p-4",
+            ),
+            html.Div(
+                [
+                    dcc.Graph(
+                        id="Closed Issues KPI Targets", figure=figures.figure("closedIssuesKPITargets"), className="col-6"
+                    ),
+                    dcc.Graph(
+                        id="Closed issues KPI target as per Severity",
+                        figure=figures.figure("closedIssuesSeverityKPITargets"),
+                        className="col-6",
+                    ),
+                ],
+                className="shadow-sm bg-white rounded row m-2",
+            ),
+            html.Div(
+                [
+                    dcc.Graph(
+                        id="Avergae Issues Resolution Time",
+                        figure=figures.figure("averageIssueResolutionTime"),
+                        className="col-5",
+                    ),
+                    dcc.Graph(id="Total Open Issues", figure=figures.figure("totalOpenIssues"), className="col-7"),
+                ],
+                className="shadow-sm bg-light rounded row m-2",
+            ),
+            html.Div(
+                [dcc.Graph(id="Open Issues over time", figure=figures.figure("openBacklog"))],
+                className="shadow-sm p-2 bg-white rounded m-2",
+            ),
+            html.Div(
+                [dcc.Graph(id="KPI compliance over time", figure=figures.figure("kpiComplianceOverTime"))],
+                className="shadow-sm p-2 bg-white rounded m-2",
+            ),
+            html.Div(
+                [
+                    dcc.Graph(
+                        id="Issues Resolution Time Percentiles", figure=figures.figure("resolutionTimePercentiles")
+                    )
+                ],
+                className="shadow-sm p-2 bg-light rounded m-2",
+            ),
+            what_if_panel(),
+        ],
+        className="bg-light p-4 text-dark",
+    )
+
+
+# Components the callbacks refer to, for Dash to check them against. With these given upfront Dash does not build
+# the whole layout (and load the dataset behind its figures) when it is assigned, but on the first request.
+app.validation_layout = html.Div(
+    [dcc.Graph(id=graph) for graph in list(KPI_GRAPHS.values()) + [WHAT_IF_GRAPH]]
+    + [dcc.RangeSlider(id=target_slider_id(severity)) for severity in main.KPI_TARGETS]
+    + [
+        dcc.Dropdown(id="label-filter"),
+        dcc.Dropdown(id="project-filter"),
+        dcc.DatePickerRange(id="date-filter"),
+        dcc.Dropdown(id="severity-filter"),
+        dcc.Dropdown(id="assignee-filter"),
+        dcc.Dropdown(id="state-filter"),
+        dcc.Dropdown(id="dropdown"),
+        dt.DataTable(id="main-table"),
+        html.Button(id="reload-button"),
+        html.Div(id="job-progress"),
+        dcc.Store(id="scope"),
+        dcc.Store(id="job"),
+        dcc.Interval(id="job-poll"),
+    ]
 )
+app.layout = serve_layout
 
 
 if __name__ == "__main__":
@@ -0,0 +1,318 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+import cache
+import labels
+import main
+import metrics
+import resolution
+
+
+# Issues with dates already parsed the way the pandas pipeline parses them, one row per row of the export.
+# Labels are split into issue_labels so that label filters are index lookups instead of substring scans.
+# calendar holds the cumulative business day count of every day, so business days are two lookups in SQL too.
+SCHEMA = """
+CREATE TABLE issues (
+    row INTEGER PRIMARY KEY,
+    id INTEGER,
+    title TEXT,
+    state TEXT,
+    assignee TEXT,
+    severity TEXT,
+    created_at TEXT,
+    kpi_created_at TEXT,
+    closed_at TEXT
+);
+CREATE TABLE issue_labels (issue INTEGER REFERENCES issues (row), label TEXT);
+CREATE TABLE calendar (day TEXT PRIMARY KEY, cumulative INTEGER) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE INDEX issues_state ON issues (state, created_at);
+CREATE INDEX issues_severity ON issues (severity);
+CREATE INDEX issues_created_at ON issues (created_at);
+CREATE INDEX issues_closed_at ON issues (closed_at);
+CREATE INDEX issues_assignee ON issues (assignee);
+CREATE INDEX issue_labels_label ON issue_labels (label, issue);
+"""
+
+
+def iso_dates(dates):
+    return dates.dt.strftime("%Y-%m-%d").where(dates.notnull(), None)
+
+
+# Rows of the issues table for one chunk of the export.
+# created_at is parsed like filter_security_issues, kpi_created_at and closed_at like split_issues for closed issues.
+def issue_rows(chunk, first_row):
+    created = main.parse_distinct(pd.to_datetime, chunk["IssueCreatedAt"].rename("created"))
+    state = chunk["State"].astype(str).str.strip()
+    closed = state == "closed"
+    kpi_created = pd.Series(pd.NaT, index=chunk.index)
+    closed_at = pd.Series(pd.NaT, index=chunk.index)
+    if closed.any():
+        kpi_created[closed], closed_at[closed] = main.parse_distinct(
+            main.closed_issue_dates, created[closed].rename("created"), chunk["IssueClosedDate"][closed]
+        )
+    return pd.DataFrame(
+        {
+            "row": np.arange(first_row, first_row + len(chunk)),
+            "id": chunk["Git Issue Id"].astype(np.int64),
+            "title": chunk["Title"],
+            "state": state,
+            "assignee": chunk["AssigneeName"].fillna("No Assignee"),
+            "severity": chunk["Severity"],
+            "created_at": iso_dates(created),
+            "kpi_created_at": iso_dates(pd.to_datetime(kpi_created)),
+            "closed_at": iso_dates(pd.to_datetime(closed_at)),
+        }
+    )
+
+
+# Rows of the issue_labels table, every distinct label combination of the chunk is parsed once
+def label_rows(chunk, first_row):
+    combinations = chunk["Labels"].astype("category")
+    parsed = [labels.split_labels(c) for c in combinations.cat.categories]
+    rows = range(first_row, first_row + len(chunk))
+    return [
+        (row, label)
+        for row, code in zip(rows, combinations.cat.codes.values)
+        if code >= 0
+        for label in parsed[code]
+    ]
+
+
+# Cumulative business days of main.calendar for every day of [first, last]: the business days before that day
+def calendar_rows(first, last):
+    first, last = np.datetime64(first, "D"), np.datetime64(last, "D")
+    start, cumulative = main.calendar.extend(first, last)
+    days = np.arange(first, last + np.timedelta64(1, "D"), dtype="datetime64[D]")
+    cumulative = cumulative[(days - start).astype(np.int64)]
+    return list(zip(days.astype(str), cumulative.tolist()))
+
+
+# Build the database at path from the export
+def build(path, source, key=None, chunksize=100000):
+    with closing(sqlite3.connect(path)) as conn:
+        # Nothing to recover from a crash while building, the half written file is simply discarded
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        row = 1
+        for chunk in pd.read_csv(source, chunksize=chunksize, **main.CSV_OPTIONS):
+            # Blank lines of the export come through as rows without an id
+            chunk = chunk.dropna(subset=["Git Issue Id"])
+            rows = issue_rows(chunk, row).astype(object)
+            rows = rows.where(rows.notnull(), None).values.tolist()
+            conn.executemany("INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO issue_labels VALUES (?, ?)", label_rows(chunk, row))
+            row += len(chunk)
+
+        # Calendar around every date of the issues and the reporting date, with a margin for the day after
+        first, last = conn.execute(
+            """SELECT MIN(day), MAX(day) FROM (
+                SELECT created_at AS day FROM issues
+                UNION ALL SELECT kpi_created_at FROM issues
+                UNION ALL SELECT closed_at FROM issues
+            )"""
+        ).fetchone()
+        today = pd.to_datetime(main.today_date, format="%d-%m-%Y").strftime("%Y-%m-%d")
+        first, last = min(first or today, today), max(last or today, today)
+        conn.executemany(
+            "INSERT INTO calendar VALUES (?, ?)",
+            calendar_rows(pd.Timestamp(first) - pd.Timedelta(days=366), pd.Timestamp(last) + pd.Timedelta(days=366)),
+        )
+        conn.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (json.dumps(cache.fingerprint(source, key)),))
+        conn.commit()
+
+
+# (Re)build the database from the export unless it was built from the same file and key.
+# The database is built next to its final path and swapped in, readers never see a half written one.
+def load(database, source, key=None, chunksize=100000):
+    stored = read_meta(database).get("fingerprint")
+    if stored and cache.is_fresh(stored, source, key):
+        return False
+
+    os.makedirs(os.path.dirname(database) or ".", exist_ok=True)
+    cache.atomic_write(database, lambda path: build(path, source, key, chunksize))
+    return True
+
+
+def read_meta(database):
+    if not os.path.exists(database):
+        return {}
+    try:
+        with closing(sqlite3.connect(database)) as conn:
+            return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+    except (sqlite3.Error, ValueError):
+        return {}
+
+
+# Business days in [start, end) as SQL, with the same negative count as np.busday_count when end < start
+def business_days_sql(start, end):
+    lookup = "(SELECT cumulative FROM calendar WHERE day = {})"
+    return (
+        "CASE WHEN {start} IS NULL OR {end} IS NULL THEN NULL "
+        "WHEN {end} < {start} THEN {after_end} - {after_start} "
+        "ELSE {at_end} - {at_start} END".format(
+            start=start,
+            end=end,
+            after_end=lookup.format("date({}, '+1 day')".format(end)),
+            after_start=lookup.format("date({}, '+1 day')".format(start)),
+            at_end=lookup.format(end),
+            at_start=lookup.format(start),
+        )
+    )
+
+
+# Common table expressions selecting the issues in scope: created within the window, carrying all the labels,
+# optionally of the given severities, plus the KPI targets and the business days of every open and closed issue
+def scope_sql(labels_, severities, targets):
+    conditions = ["created_at >= :start"]
+    params = {}
+    for i, label in enumerate(labels_):
+        conditions.append("row IN (SELECT issue FROM issue_labels WHERE label = :label{})".format(i))
+        params["label{}".format(i)] = label
+    if severities:
+        names = []
+        for i, severity in enumerate(severities):
+            names.append(":severity{}".format(i))
+            params["severity{}".format(i)] = severity
+        conditions.append("severity IN ({})".format(", ".join(names)))
+
+    target_rows = []
+    for i, (severity, (warn, limit)) in enumerate(targets.items()):
+        target_rows.append("(:target{0}, :warn{0}, :limit{0})".format(i))
+        params.update({"target{}".format(i): severity, "warn{}".format(i): warn, "limit{}".format(i): limit})
+
+    sql = """
+    WITH scoped AS (SELECT * FROM issues WHERE {conditions}),
+    targets (severity, warn, limit_days) AS (VALUES {targets}),
+    open_issues AS (
+        SELECT s.*, {open_days} AS days, t.warn, t.limit_days FROM scoped s
+        LEFT JOIN targets t ON t.severity = s.severity WHERE s.state = 'opened'
+    ),
+    closed_issues AS (
+        SELECT s.*, {closed_days} AS days, t.limit_days FROM scoped s
+        LEFT JOIN targets t ON t.severity = s.severity WHERE s.state = 'closed'
+    ),
+    classified_open AS (
+        SELECT *, CASE
+            WHEN warn IS NULL OR days IS NULL THEN NULL
+            WHEN days < warn THEN 'normal'
+            WHEN days <= limit_days THEN 'about_to_violate'
+            ELSE 'violated' END AS target
+        FROM open_issues
+    ),
+    classified_closed AS (
+        SELECT *, CASE
+            WHEN limit_days IS NULL OR days IS NULL THEN NULL
+            WHEN days <= limit_days THEN 'hit'
+            ELSE 'miss' END AS target
+        FROM closed_issues
+    )
+    """.format(
+        conditions=" AND ".join(conditions),
+        targets=", ".join(target_rows) if target_rows else "(NULL, NULL, NULL)",
+        open_days=business_days_sql("s.created_at", ":today"),
+        closed_days=business_days_sql("s.kpi_created_at", "s.closed_at"),
+    )
+    return sql, params
+
+
+# Group by results of the database as the Series the KPI functions read, ordered like the pandas group bys:
+# by date, then by severity level or state name
+def counts_series(df, levels):
+    df["IssueCreatedAt"] = pd.to_datetime(df["IssueCreatedAt"])
+    if "Severity" in levels:
+        df["Severity"] = main.fixed_categorical(df["Severity"], main.SEVERITY_LEVELS)
+    return df.set_index(levels)["count"].sort_index()
+
+
+# The KPI aggregates of the issues carrying all the given labels, computed in the database.
+# Only the grouped counts and the at-risk rows are materialized, never the issues themselves.
+@metrics.timed("sqlite_aggregates")
+def query_aggregates(database, labels_, today_date, severities=(), targets=None):
+    targets = main.KPI_TARGETS if targets is None else targets
+    sql, params = scope_sql(labels_, severities, targets)
+    params["start"] = main.window_start(today_date).strftime("%Y-%m-%d")
+    params["today"] = pd.to_datetime(today_date, format="%d-%m-%Y").strftime("%Y-%m-%d")
+
+    def query(select):
+        return pd.read_sql_query(sql + select, conn, params=params)
+
+    with closing(sqlite3.connect(database)) as conn:
+        open_cube = query(
+            """SELECT target AS Target, severity AS Severity, assignee AS AssigneeName, COUNT(*) AS count
+            FROM classified_open GROUP BY target, severity, assignee"""
+        )
+        closed_cube = query(
+            """SELECT target AS Target, severity AS Severity, assignee AS AssigneeName, COUNT(*) AS count,
+            SUM(days) AS days_to_KPI_target, COUNT(days) AS days_to_KPI_target_count
+            FROM classified_closed GROUP BY target, severity, assignee"""
+        )
+        daily = query(
+            """SELECT created_at AS IssueCreatedAt, state AS State, COUNT(*) AS count
+            FROM scoped GROUP BY created_at, state"""
+        )
+        open_daily = query(
+            """SELECT created_at AS IssueCreatedAt, severity AS Severity, COUNT(*) AS count
+            FROM classified_open GROUP BY created_at, severity"""
+        )
+        events = query(
+            """SELECT day AS IssueCreatedAt, severity AS Severity, SUM(change) AS count FROM (
+                SELECT created_at AS day, severity, 1 AS change FROM open_issues
+                UNION ALL SELECT kpi_created_at, severity, 1 FROM closed_issues
+                UNION ALL SELECT closed_at, severity, -1 FROM closed_issues WHERE closed_at IS NOT NULL
+            ) GROUP BY day, severity HAVING SUM(change) != 0"""
+        )
+        issues = query(
+            """SELECT created_at AS IssueCreatedAt, NULL AS IssueClosedDate, severity AS Severity, NULL AS Target,
+                COUNT(*) AS count FROM open_issues GROUP BY created_at, severity
+            UNION ALL SELECT kpi_created_at, closed_at, severity, target, COUNT(*)
+                FROM classified_closed GROUP BY kpi_created_at, closed_at, severity, target"""
+        )
+        resolution_days = query(
+            """SELECT severity AS Severity, assignee AS AssigneeName, days AS days_to_KPI_target, COUNT(*) AS count
+            FROM closed_issues WHERE days IS NOT NULL GROUP BY severity, assignee, days"""
+        )
+        at_risk = query(
+            """SELECT id AS "Git Issue Id", title AS Title, assignee AS AssigneeName, severity AS Severity,
+            target AS Target FROM classified_open WHERE target IN ('about_to_violate', 'violated') ORDER BY row"""
+        )
+
+    at_risk["Git Issue Id"] = at_risk["Git Issue Id"].astype(np.int32)
+    at_risk["AssigneeName"] = at_risk["AssigneeName"].astype("category")
+    at_risk["Severity"] = main.fixed_categorical(at_risk["Severity"], main.SEVERITY_LEVELS)
+    at_risk["Target"] = pd.Categorical(at_risk["Target"], categories=main.OPEN_TARGETS)
+    backlog_events = counts_series(events, ["IssueCreatedAt", "Severity"])
+    backlog_events.index = backlog_events.index.rename("Date", level=0)
+    issues["IssueCreatedAt"] = pd.to_datetime(issues["IssueCreatedAt"])
+    resolution_days["Severity"] = main.fixed_categorical(resolution_days["Severity"], main.SEVERITY_LEVELS)
+    resolution_days["AssigneeName"] = resolution_days["AssigneeName"].astype("category")
+    issues["IssueClosedDate"] = pd.to_datetime(issues["IssueClosedDate"])
+    return {
+        "open_cube": main.kpi_cube(open_cube, main.OPEN_TARGETS, counted=True),
+        "closed_cube": main.kpi_cube(closed_cube, main.CLOSED_TARGETS, ["days_to_KPI_target"], counted=True),
+        "daily": counts_series(daily, ["IssueCreatedAt", "State"]),
+        "open_daily": counts_series(open_daily, ["IssueCreatedAt", "Severity"]),
+        "backlog_events": backlog_events,
+        "compliance_events": main.compliance_events(issues, targets),
+        "resolution_days": resolution.histogram(resolution_days),
+        "at_risk": at_risk,
+    }
+
+
+# Labels of the issues in the window carrying all the given labels, for the label selector
+def label_vocabulary(database, labels_, today_date):
+    sql, params = scope_sql(labels_, (), {})
+    params["start"] = main.window_start(today_date).strftime("%Y-%m-%d")
+    params["today"] = pd.to_datetime(today_date, format="%d-%m-%Y").strftime("%Y-%m-%d")
+    with closing(sqlite3.connect(database)) as conn:
+        rows = conn.execute(
+            sql + "SELECT DISTINCT label FROM issue_labels WHERE issue IN (SELECT row FROM scoped) ORDER BY label",
+            params,
+        ).fetchall()
+    return [row[0] for row in rows]
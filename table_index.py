@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+# Operators of the DataTable filter_query syntax as (name, symbol), ">=" before ">" so the longer symbol wins
+FILTER_OPERATORS = [
+    ("ge", ">="),
+    ("le", "<="),
+    ("ne", "!="),
+    ("eq", "="),
+    ("lt", "<"),
+    ("gt", ">"),
+    ("contains", "contains"),
+    ("datestartswith", "datestartswith"),
+]
+
+
+# Split one "{column} operator value" part of a filter_query into (column, operator name, value)
+def split_filter_part(filter_part):
+    filter_part = filter_part.strip()
+    if not filter_part.startswith("{") or "}" not in filter_part:
+        return None, None, None
+    column, rest = filter_part[1:].split("}", 1)
+    rest = rest.strip()
+    for name, symbol in FILTER_OPERATORS:
+        for token in (symbol, name + " "):
+            if rest.startswith(token):
+                value = rest[len(token) :].strip()
+                if len(value) > 1 and value[0] == value[-1] and value[0] in ("'", '"', "`"):
+                    value = value[1:-1]
+                return column, name, value
+    return None, None, None
+
+
+# Boolean mask of the rows matching a DataTable filter_query such as "{Severity} = Major && {Title} contains fuzz"
+def filter_mask(df, filter_query):
+    mask = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return mask
+    for filter_part in filter_query.split(" && "):
+        column, operator, value = split_filter_part(filter_part)
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if operator == "contains":
+            matched = values.astype(str).str.contains(value, regex=False)
+        elif operator == "datestartswith":
+            matched = values.astype(str).str.startswith(value)
+        elif pd.api.types.is_numeric_dtype(values):
+            try:
+                matched = getattr(values, operator)(float(value))
+            except ValueError:
+                matched = pd.Series(False, index=values.index)
+        else:
+            matched = getattr(values.astype(str), operator)(value)
+        mask &= matched.values
+    return mask
+
+
+# Presorted row orders of one frame, so that each DataTable request only slices out a single page.
+# Orders are built lazily per column the first time that column is sorted on.
+class TableIndex:
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.orders = {}
+
+    # Stable row order of a column, ties keep their row order in both directions as with sort_values
+    def order(self, column, ascending=True):
+        if (column, ascending) not in self.orders:
+            values = self.df[column].values
+            if ascending:
+                order = np.argsort(values, kind="mergesort")
+            else:
+                # The ascending order of the reversed rows, read backwards, puts ties back in row order
+                order = (len(values) - 1 - np.argsort(values[::-1], kind="mergesort"))[::-1]
+            self.orders[(column, ascending)] = order
+        return self.orders[(column, ascending)]
+
+    # Row positions of the frame in the requested sort order (only the first sort_by entry is presorted)
+    def sorted_positions(self, sort_by):
+        if not sort_by:
+            return np.arange(len(self.df))
+        if len(sort_by) > 1:
+            by = [s["column_id"] for s in sort_by]
+            ascending = [s["direction"] == "asc" for s in sort_by]
+            return self.df.sort_values(by, ascending=ascending, kind="mergesort").index.values
+        return self.order(sort_by[0]["column_id"], sort_by[0]["direction"] == "asc")
+
+    # One page of the filtered and sorted frame plus the number of pages
+    def page(self, page_current, page_size, sort_by=None, filter_query=None):
+        positions = self.sorted_positions(sort_by)
+        if filter_query:
+            mask = filter_mask(self.df, filter_query)
+            positions = positions[mask[positions]]
+        page_count = max(1, -(-len(positions) // page_size))
+        start = min(page_current or 0, page_count - 1) * page_size
+        return self.df.iloc[positions[start : start + page_size]], page_count
+
+
+# TableIndex of the rows of df where column == value, kept until a refresh publishes a new df
+_indexes = {}
+
+
+def table_index(df, column, value):
+    cached = _indexes.get((column, value))
+    if cached is None or cached[0] is not df:
+        cached = _indexes[(column, value)] = (df, TableIndex(df[df[column] == value]))
+    return cached[1]
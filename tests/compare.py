@@ -0,0 +1,32 @@
+import pandas as pd
+
+
+def string_index(index):
+    return pd.MultiIndex.from_arrays([index.get_level_values(i).astype(str) for i in range(index.nlevels)])
+
+
+# Aggregates (see main.issue_aggregates) in a form that does not depend on how they were computed: cells without
+# issues dropped, categorical levels as strings, sorted, and the at-risk issues in id order
+def canonical(aggregates):
+    result = {}
+    for name, value in aggregates.items():
+        if name == "at_risk":
+            value = value.astype(str).sort_values("Git Issue Id").reset_index(drop=True)
+        else:
+            if name in ("open_cube", "closed_cube"):
+                value = value[value["count"] != 0].astype(float)
+            else:
+                value = value[value != 0].astype(float).rename(None)
+            value = value.set_axis(string_index(value.index)).sort_index()
+        result[name] = value
+    return result
+
+
+def assert_same_aggregates(got, expected):
+    got, expected = canonical(got), canonical(expected)
+    assert sorted(got) == sorted(expected)
+    for name in expected:
+        if isinstance(expected[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(got[name], expected[name], check_dtype=False, obj=name)
+        else:
+            pd.testing.assert_series_equal(got[name], expected[name], check_dtype=False, obj=name)
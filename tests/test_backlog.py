@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backlog
+
+SEVERITIES = ["Critical", "Major", "Minor"]
+
+
+@pytest.fixture
+def issues():
+    rng = np.random.default_rng(2)
+    n = 500
+    created = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 200, n), unit="D")
+    closed = created + pd.to_timedelta(rng.integers(0, 60, n), unit="D")
+    severity = rng.choice(SEVERITIES, n)
+    state = rng.random(n) < 0.3
+    df_open = pd.DataFrame({"IssueCreatedAt": created[state], "Severity": severity[state]})
+    df_close = pd.DataFrame(
+        {"IssueCreatedAt": created[~state], "IssueClosedDate": closed[~state], "Severity": severity[~state]}
+    )
+    # A few closed issues without a closing date stay open
+    df_close.loc[df_close.index[:10], "IssueClosedDate"] = pd.NaT
+    return df_open, df_close
+
+
+# Open issues of a severity at the end of a day: created on or before it and not closed on or before it
+def brute_force(df_open, df_close, day, severity):
+    opened = (df_open["IssueCreatedAt"] <= day) & (df_open["Severity"] == severity)
+    created = (df_close["IssueCreatedAt"] <= day) & (df_close["Severity"] == severity)
+    still_open = df_close["IssueClosedDate"].isnull() | (df_close["IssueClosedDate"] > day)
+    return int(opened.sum() + (created & still_open).sum())
+
+
+def test_sweep_line_matches_brute_force(issues):
+    df_open, df_close = issues
+    engine = backlog.Backlog(backlog.events(df_open, df_close), order=["Major"])
+    assert engine.columns == ["Major", "Critical", "Minor"]
+
+    daily = engine.daily("2019-12-25", "2020-10-01")
+    for day in pd.date_range("2019-12-25", "2020-10-01"):
+        for severity in SEVERITIES:
+            expected = brute_force(df_open, df_close, day, severity)
+            assert daily.loc[day, severity] == expected, (day, severity)
+            assert engine.as_of(day + pd.Timedelta(hours=13))[severity] == expected, (day, severity)
+
+
+# Events of separate partitions sum to the events of the whole
+def test_events_merge_by_summing(issues):
+    df_open, df_close = issues
+    whole = backlog.events(df_open, df_close)
+    parts = pd.concat([backlog.events(df_open[:50], df_close[:200]), backlog.events(df_open[50:], df_close[200:])])
+    merged = parts.groupby(level=[0, 1]).sum()
+    pd.testing.assert_series_equal(merged[merged != 0].sort_index(), whole.sort_index(), check_names=False)
+
+
+def test_empty_backlog():
+    engine = backlog.Backlog(pd.Series([], index=pd.MultiIndex.from_tuples([], names=["Date", "Severity"]), dtype=int))
+    assert engine.daily().empty
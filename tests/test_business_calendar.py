@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+import pytest
+
+import business_calendar
+
+HOLIDAYS = ["2020-01-01", "2020-04-10", "2020-04-13", "2020-12-25", "2021-01-01", "2021-05-24"]
+
+
+def random_dates(rng, size, low="2015-01-01", high="2025-12-31"):
+    low, high = np.datetime64(low, "D"), np.datetime64(high, "D")
+    return low + rng.integers(0, (high - low).astype(int), size).astype("timedelta64[D]")
+
+
+# Counts from the cumulative table equal np.busday_count, for reversed ranges and ranges that grow the table too
+@pytest.mark.parametrize("weekmask, holidays", [("1111100", []), ("1111100", HOLIDAYS), ("0111111", HOLIDAYS)])
+def test_count_matches_busday_count(weekmask, holidays):
+    rng = np.random.default_rng(7)
+    calendar = business_calendar.BusinessCalendar(weekmask, holidays)
+    expected_calendar = np.busdaycalendar(weekmask=weekmask, holidays=holidays)
+    for low, high in [("2020-01-01", "2020-12-31"), ("2015-01-01", "2025-12-31"), ("1990-01-01", "2040-12-31")]:
+        start, end = random_dates(rng, 2000, low, high), random_dates(rng, 2000, low, high)
+        expected = np.busday_count(start, end, busdaycal=expected_calendar)
+        np.testing.assert_array_equal(calendar.count(start, end), expected)
+
+    day = np.array(["2020-04-10"], dtype="datetime64[D]")
+    np.testing.assert_array_equal(calendar.count(day, day), [0])
+    assert len(calendar.count(day[:0], day[:0])) == 0
+
+
+# Threads counting while others grow the table only ever see a consistent table
+def test_concurrent_counts():
+    calendar = business_calendar.BusinessCalendar(holidays=HOLIDAYS)
+    expected_calendar = np.busdaycalendar(weekmask="1111100", holidays=HOLIDAYS)
+    errors = []
+
+    def count(seed):
+        rng = np.random.default_rng(seed)
+        for year in range(30):
+            low = "{}-01-01".format(2000 + (year if seed % 2 else -year))
+            high = "{}-12-31".format(2000 + (year if seed % 2 else -year))
+            start, end = random_dates(rng, 500, low, high), random_dates(rng, 500, low, high)
+            if not np.array_equal(calendar.count(start, end), np.busday_count(start, end, busdaycal=expected_calendar)):
+                errors.append((seed, year))
+
+    threads = [threading.Thread(target=count, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+# The first date an issue is `days` business days old is the first date whose count from its creation reaches days
+@pytest.mark.parametrize("weekmask, holidays", [("1111100", []), ("1111100", HOLIDAYS)])
+def test_first_aged(weekmask, holidays):
+    rng = np.random.default_rng(11)
+    calendar = business_calendar.BusinessCalendar(weekmask, holidays)
+    expected_calendar = np.busdaycalendar(weekmask=weekmask, holidays=holidays)
+    created = random_dates(rng, 300, "2019-12-01", "2021-01-31")
+    days = rng.integers(0, 40, len(created))
+
+    aged = calendar.first_aged(created, days)
+    assert (np.busday_count(created, aged, busdaycal=expected_calendar) >= days).all()
+    day_before = aged - np.timedelta64(1, "D")
+    assert ((np.busday_count(created, day_before, busdaycal=expected_calendar) < days) | (aged == created)).all()
+    np.testing.assert_array_equal(aged[days == 0], created[days == 0])
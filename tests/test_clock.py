@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clock
+import main
+from compare import assert_same_aggregates
+
+
+@pytest.fixture
+def published(monkeypatch):
+    today = main.today_date
+    monkeypatch.setattr(main, "today_date", today)
+    frames, by_project, aggregates = main.load_dataset(today)
+    main.publish(aggregates, frames, by_project)
+    yield
+    frames, by_project, aggregates = main.load_dataset(today)
+    main.publish(aggregates, frames, by_project)
+
+
+# Advancing the clock leaves the frames and aggregates a load as of the new date would: issues age into other targets
+# and, once the one year window has moved past their creation, drop out
+@pytest.mark.parametrize("dates", [["2020-07-20"], ["2020-09-01", "2021-01-15"], ["2021-01-15"]])
+def test_advance_matches_load(published, dates):
+    live = clock.LiveClock()
+    for date in dates:
+        live.advance(date)
+        today = pd.Timestamp(date).strftime("%d-%m-%Y")
+        assert main.today_date == today
+
+        (security_data, df_open, df_close), _, aggregates = main.load_dataset(today)
+        assert_same_aggregates(main.aggregates, aggregates)
+        assert len(main.security_data) == len(security_data)
+        assert sorted(main.df_open["Git Issue Id"]) == sorted(df_open["Git Issue Id"])
+        assert sorted(main.df_close["Git Issue Id"]) == sorted(df_close["Git Issue Id"])
+        aged = main.df_open.sort_values("Git Issue Id")["bussinessDays"]
+        np.testing.assert_array_equal(aged, df_open.sort_values("Git Issue Id")["bussinessDays"])
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backlog
+import compliance
+import main
+
+# Fractional thresholds too: about to violate from an age of ceil(warn), violated above limit
+TARGETS = [None, {"Critical": (1.5, 3.5), "Major": (2, 2), "Minor": (0.5, 10.25)}]
+
+
+def issues(targets, n=400):
+    rng = np.random.default_rng(4)
+    created = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 150, n), unit="D")
+    closed = pd.Series(created + pd.to_timedelta(rng.integers(0, 90, n), unit="D"))
+    closed[rng.random(n) < 0.3] = pd.NaT
+    severity = rng.choice(list(main.KPI_TARGETS) + ["Not Assigned"], n)
+    df = pd.DataFrame({"IssueCreatedAt": created, "IssueClosedDate": closed, "Severity": severity})
+    days = main.business_days(df["IssueCreatedAt"], df["IssueClosedDate"])
+    df["Target"] = main.classify_closed(days, df["Severity"], targets).astype(object).where(closed.notnull())
+    return df
+
+
+# Every issue classified as of every day the way the dashboard classifies them on its reporting date: issues open at
+# the end of the day by their business day age, issues closed by then by their outcome
+def brute_force(df, day, targets):
+    created, closed = df["IssueCreatedAt"], df["IssueClosedDate"]
+    alive = (created <= day) & (closed.isnull() | (closed > day))
+    start = created[alive].values.astype("datetime64[D]")
+    age = np.busday_count(start, np.datetime64(day.date(), "D"), busdaycal=main.calendar.busdaycalendar)
+    counts = main.classify_open(age, df.loc[alive, "Severity"].values, targets).value_counts()
+    done = closed <= day
+    counts = pd.concat([counts, df.loc[done, "Target"].value_counts()])
+    return counts.reindex(main.OPEN_TARGETS + main.CLOSED_TARGETS, fill_value=0)
+
+
+@pytest.mark.parametrize("targets", TARGETS)
+def test_trend_matches_daily_classification(targets):
+    df = issues(targets)
+    swept = backlog.Backlog(main.compliance_events(df, targets), main.OPEN_TARGETS + main.CLOSED_TARGETS)
+    trend = compliance.daily(swept, "2019-12-20", "2020-09-30")
+
+    for day, row in trend.iterrows():
+        expected = brute_force(df, day, targets)
+        assert row[main.OPEN_TARGETS + main.CLOSED_TARGETS].astype(int).to_dict() == expected.to_dict(), day
+        closed = expected["hit"] + expected["miss"]
+        if closed:
+            assert row["hit_rate"] == round(100 * expected["hit"] / closed, 1)
+        else:
+            assert np.isnan(row["hit_rate"])
+
+
+# Weighted rows count as that many issues
+def test_weighted_events():
+    df = issues(None, n=100)
+    weighted = df.assign(count=3)
+    expected = main.compliance_events(df)
+    pd.testing.assert_series_equal(main.compliance_events(weighted), 3 * expected)
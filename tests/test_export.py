@@ -0,0 +1,21 @@
+import json
+
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+
+import export
+import main
+
+
+# A report as of the dashboard's reporting date holds the dashboard's issues and figures
+def test_report_for_today_reproduces_the_dashboard(tmp_path):
+    today = pd.to_datetime(main.today_date, format="%d-%m-%Y")
+    issues = export.export_snapshot(today, None, [main.CSV_FILE], str(tmp_path), cdn=True)
+    frames, _, aggregates = main.load_dataset()
+    assert issues == len(frames[0])
+
+    directory = tmp_path / today.strftime("%Y-%m-%d")
+    for name in export.FIGURES:
+        expected = json.loads(pio.to_json(go.Figure(getattr(main, name)(aggregates))))
+        assert json.loads((directory / (name + ".json")).read_text()) == expected, name
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental
+import main
+from compare import assert_same_aggregates
+
+
+@pytest.fixture
+def export():
+    return pd.read_csv(main.CSV_FILE, **main.CSV_OPTIONS)
+
+
+def write(df, path):
+    df.to_csv(path, sep=";", index=False)
+
+
+def rebuilt(path):
+    return main.issue_aggregates(*main.load_issues(path, main.today_date))
+
+
+# Every refresh leaves the frames and aggregates a full rebuild of the export would have: new issues,
+# issues that were closed in the meantime and issues that disappeared from the export
+def test_refresh_matches_rebuild(export, tmp_path):
+    path = str(tmp_path / "issues.csv")
+    issues = incremental.IncrementalIssues(path, main.today_date)
+
+    first = export.iloc[:200].copy()
+    first.loc[first.index[:30], "State"] = " opened"
+    first.loc[first.index[:30], "IssueClosedDate"] = np.nan
+    write(first, path)
+    assert issues.refresh() == 200
+    assert_same_aggregates(issues.aggregates, rebuilt(path))
+
+    write(export.iloc[:250].drop(index=[5]), path)
+    assert issues.refresh() > 0
+    assert_same_aggregates(issues.aggregates, rebuilt(path))
+
+    write(export, path)
+    issues.refresh()
+    assert_same_aggregates(issues.aggregates, rebuilt(path))
+    security_data, df_open, df_close = main.load_issues(path, main.today_date)
+    assert len(issues.df_open) == len(df_open) and len(issues.df_close) == len(df_close)
+
+    assert issues.refresh() == 0
+
+
+# Published refreshes reach the KPI functions, and a dataset published by someone else makes the next one start over
+def test_refresh_and_publish(export, tmp_path):
+    path = str(tmp_path / "issues.csv")
+    write(export.iloc[:200], path)
+    issues = incremental.IncrementalIssues(path, main.today_date)
+    issues.refresh_and_publish()
+    assert main.aggregates is issues.aggregates
+
+    version = main.version
+    assert issues.refresh_and_publish() == 0
+    assert main.version == version
+
+    frames, by_project, aggregates = main.load_dataset()
+    main.publish(aggregates, frames, by_project)
+    write(export, path)
+    issues.refresh_and_publish()
+    assert_same_aggregates(main.aggregates, rebuilt(path))
+
+
+# Once the reporting date moves on, issues created before the new one year window drop out of the frames and the
+# aggregates, as in a rebuild as of that date. Only the ages of the open issues (open_cube, at_risk) are left to the
+# live clock.
+def test_refresh_expires_issues_out_of_the_window(export, tmp_path):
+    path = str(tmp_path / "issues.csv")
+    write(export, path)
+    issues = incremental.IncrementalIssues(path, main.today_date)
+    issues.refresh()
+
+    issues.fixed_date = "15-01-2021"
+    assert issues.refresh() > 0
+    security_data, df_open, df_close = main.load_issues(path, issues.fixed_date)
+    expected = main.issue_aggregates(security_data, df_open, df_close)
+    aged = ["open_cube", "at_risk"]
+    assert_same_aggregates(
+        {k: v for k, v in issues.aggregates.items() if k not in aged},
+        {k: v for k, v in expected.items() if k not in aged},
+    )
+    assert sorted(issues.security_data["Git Issue Id"]) == sorted(security_data["Git Issue Id"])
+    assert sorted(issues.df_open["Git Issue Id"]) == sorted(df_open["Git Issue Id"])
+    assert sorted(issues.df_close["Git Issue Id"]) == sorted(df_close["Git Issue Id"])
+    assert issues.aggregates["open_cube"]["count"].sum() == len(df_open)
+
+    assert issues.refresh() == 0
@@ -0,0 +1,49 @@
+import os
+import time
+
+import jobs
+import main
+
+
+# Stand-ins for run_job in the workers: one dies like an out of memory kill, the other finishes the job
+def crash(database, job_id, kind, params):
+    os._exit(1)
+
+
+def finish(database, job_id, kind, params):
+    jobs.JobStore(database).update(job_id, state=jobs.DONE, progress=1.0, message="Done")
+
+
+def wait(runner, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while runner.status(job_id)["state"] not in (jobs.DONE, jobs.FAILED) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return runner.status(job_id)
+
+
+# A job whose worker dies fails instead of running forever, and the next job gets a new pool
+def test_dead_worker_fails_its_job(tmp_path, monkeypatch):
+    runner = jobs.JobRunner(jobs.JobStore(str(tmp_path / "jobs.sqlite")), workers=1)
+    try:
+        monkeypatch.setattr(jobs, "run_job", crash)
+        job = wait(runner, runner.submit("reload", [main.today_date]))
+        assert job["state"] == jobs.FAILED and "BrokenProcessPool" in job["error"]
+
+        monkeypatch.setattr(jobs, "run_job", finish)
+        job = wait(runner, runner.submit("reload", [main.today_date]))
+        assert job["state"] == jobs.DONE
+    finally:
+        runner.shutdown()
+
+
+# A job nobody reports on any more, e.g. as its server process died, times out
+def test_stale_job_times_out(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite"), timeout=60)
+    job_id = store.create("reload", "key")
+    store.update(job_id, state=jobs.RUNNING, progress=0.5)
+    assert store.get(job_id)["state"] == jobs.RUNNING
+
+    with store.connect() as conn:
+        conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time() - 120, job_id))
+    job = store.get(job_id)
+    assert job["state"] == jobs.FAILED and job["message"] == "Timed out"
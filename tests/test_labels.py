@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import labels
+
+# More labels than fit in one 64 bit word
+VOCABULARY = ["label{:03d}".format(i) for i in range(150)] + ["security", "Auto_Created", "Clair"]
+
+
+@pytest.fixture
+def cells():
+    rng = np.random.default_rng(3)
+    cells = []
+    for _ in range(3000):
+        picked = rng.choice(VOCABULARY, size=rng.integers(0, 5), replace=False)
+        cells.append(" [{}]".format(";".join(picked)))
+    cells[::97] = [np.nan] * len(cells[::97])
+    cells[1::89] = [" [ security ; Clair ]"] * len(cells[1::89])
+    return pd.Series(cells)
+
+
+def brute_force(cells, all_of=(), any_of=()):
+    result = []
+    for cell in cells:
+        present = set(labels.split_labels(cell))
+        result.append(set(all_of) <= present and (not any_of or bool(present & set(any_of))))
+    return np.array(result)
+
+
+# Every label query of the multi-hot index selects the rows a set test on every row would
+def test_mask_matches_brute_force(cells):
+    index = labels.LabelIndex(cells)
+    assert index.vocabulary == sorted(set(VOCABULARY))
+
+    rng = np.random.default_rng(5)
+    queries = [((), ()), (["security"], ()), (["security", "Clair"], ()), ((), ["label001", "label149"])]
+    queries += [(["unknown"], ()), ((), ["unknown"]), (["security"], ["unknown", "label064"])]
+    for _ in range(30):
+        all_of = list(rng.choice(VOCABULARY, size=rng.integers(0, 3), replace=False))
+        any_of = list(rng.choice(VOCABULARY, size=rng.integers(0, 4), replace=False))
+        queries.append((all_of, any_of))
+
+    for all_of, any_of in queries:
+        np.testing.assert_array_equal(
+            index.mask(all_of=all_of, any_of=any_of), brute_force(cells, all_of, any_of), err_msg=str((all_of, any_of))
+        )
+
+
+# A categorical column gives the same index as its values
+def test_categorical_column(cells):
+    expected = labels.LabelIndex(cells).mask(all_of=["security"], any_of=["Clair", "label010"])
+    got = labels.LabelIndex(cells.astype("category")).mask(all_of=["security"], any_of=["Clair", "label010"])
+    np.testing.assert_array_equal(got, expected)
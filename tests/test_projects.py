@@ -0,0 +1,31 @@
+import pandas as pd
+
+import main
+import projects
+from compare import assert_same_aggregates
+
+
+# Without the project they are tagged with, the merged aggregates of per-project exports are those of one export
+def untagged(aggregates):
+    resolution_days = aggregates["resolution_days"]
+    return dict(
+        aggregates,
+        at_risk=aggregates["at_risk"].drop(columns="Project"),
+        resolution_days=resolution_days.groupby(level=list(range(1, resolution_days.index.nlevels))).sum(),
+    )
+
+
+def test_projects_merge_to_the_whole_export(tmp_path):
+    export = pd.read_csv(main.CSV_FILE, **main.CSV_OPTIONS)
+    bounds = [0, 60, 130, 200, len(export)]
+    paths = [tmp_path / name for name in ["api.csv", "web.csv", "ops.csv", "db.csv"]]
+    for path, start, stop in zip(paths, bounds[:-1], bounds[1:]):
+        export.iloc[start:stop].to_csv(path, sep=";", index=False)
+
+    by_project = projects.ingest_projects(str(tmp_path), main.today_date, workers=2)
+    expected = main.issue_aggregates(*main.load_issues(main.CSV_FILE, main.today_date))
+    assert_same_aggregates(untagged(main.merge_aggregates(list(by_project.values()))), expected)
+
+    for path, name in zip(paths, projects.project_names([str(p) for p in paths])):
+        assert (by_project[name]["at_risk"]["Project"] == name).all()
+        assert_same_aggregates(untagged(by_project[name]), main.issue_aggregates(*main.load_issues(str(path))))
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import labels
+import main
+import query
+from compare import assert_same_aggregates
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return main.load_issues(main.CSV_FILE, main.today_date)
+
+
+@pytest.fixture(scope="module")
+def engine(frames):
+    return query.IssueQuery(*frames, labels.LabelIndex(frames[0]["Labels"]))
+
+
+# issue_aggregates of the issues passing the filters, selected with plain pandas masks
+def reference(frames, start=None, end=None, severities=None, assignees=None, states=None, labels_=None):
+    security_data, df_open, df_close = frames
+    created = security_data["IssueCreatedAt"]
+    mask = np.ones(len(security_data), dtype=bool)
+    if start is not None:
+        mask &= (created >= pd.Timestamp(start)).values
+    if end is not None:
+        mask &= (created < pd.Timestamp(end) + pd.Timedelta(days=1)).values
+    if severities:
+        mask &= security_data["Severity"].isin(severities).values
+    if assignees:
+        mask &= security_data["AssigneeName"].isin(assignees).values
+    if states:
+        mask &= security_data["State"].isin(states).values
+    if labels_:
+        mask &= labels.LabelIndex(security_data["Labels"]).mask(all_of=labels_)
+    opened = (security_data["State"] == "opened").values
+    closed = (security_data["State"] == "closed").values
+    return main.issue_aggregates(security_data[mask], df_open[mask[opened]], df_close[mask[closed]])
+
+
+def check(engine, frames, **filters):
+    selected = engine.select(
+        filters.get("start"),
+        filters.get("end"),
+        filters.get("severities"),
+        filters.get("assignees"),
+        filters.get("states"),
+        filters.get("labels_"),
+    )
+    assert_same_aggregates(engine.aggregates(selected), reference(frames, **filters))
+
+
+# Selections of everything, of most issues (counted as the totals minus the rest) and of few or none
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"start": "2020-06-01", "end": "2020-09-30"},
+        {"severities": ["Critical", "Medium"]},
+        {"states": ["opened"]},
+        {"states": ["closed"], "severities": ["Major"]},
+        {"labels_": ["APIFuzztest"]},
+        {"start": "2019-12-01", "severities": ["Major", "Minor", "Not Assigned"]},
+        {"start": "2030-01-01"},
+    ],
+)
+def test_filters_match_pandas(engine, frames, filters):
+    check(engine, frames, **filters)
+
+
+def test_random_filters_match_pandas(engine, frames):
+    rng = np.random.default_rng(0)
+    security_data = frames[0]
+    days = pd.date_range(security_data["IssueCreatedAt"].min(), security_data["IssueCreatedAt"].max())
+    assignees = sorted(security_data["AssigneeName"].dropna().unique())
+    vocabulary = labels.LabelIndex(security_data["Labels"]).vocabulary
+
+    def some(values):
+        return list(rng.choice(values, size=rng.integers(1, min(3, len(values)) + 1), replace=False)) if rng.random() < 0.5 else None
+
+    for _ in range(40):
+        start, end = sorted(rng.choice(days, size=2)) if rng.random() < 0.6 else (None, None)
+        check(
+            engine,
+            frames,
+            start=start,
+            end=end,
+            severities=some(main.SEVERITY_LEVELS),
+            assignees=some(assignees),
+            states=some(main.STATES),
+            labels_=some(vocabulary),
+        )
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import resolution
+
+
+@pytest.fixture
+def closed():
+    rng = np.random.default_rng(8)
+    n = 2000
+    days = np.floor(rng.gamma(1.5, 12, n))
+    days[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame(
+        {
+            "Severity": rng.choice(["Critical", "Major", "Minor"], n, p=[0.05, 0.85, 0.1]),
+            "AssigneeName": rng.choice(["Zenith", "Alice", "Bob", "Mike", "Solo"], n, p=[0.4, 0.3, 0.2, 0.0995, 0.0005]),
+            "days_to_KPI_target": days,
+        }
+    )
+
+
+def brute_force(df, level=None):
+    df = df[df["days_to_KPI_target"].notnull()]
+    groups = df.groupby(level) if level else [("All", df)]
+    rows = {}
+    for name, group in groups:
+        days = group["days_to_KPI_target"].values
+        rows[name] = [np.percentile(days, p) for p in resolution.PERCENTILES] + [len(days)]
+    columns = ["p{}".format(p) for p in resolution.PERCENTILES] + ["issues"]
+    return pd.DataFrame.from_dict(rows, orient="index", columns=columns)
+
+
+# Percentiles read off the histogram equal numpy.percentile over the resolution times of every group
+@pytest.mark.parametrize("level", [None, "Severity", "AssigneeName"])
+def test_percentiles_match_numpy(closed, level):
+    got = resolution.percentiles(resolution.histogram(closed), [level] if level else [])
+    expected = brute_force(closed, level)
+    pd.testing.assert_frame_equal(got.sort_index(), expected.sort_index(), check_dtype=False, check_names=False)
+
+
+# Histograms of separate partitions merge by summing, weighted rows count as that many issues
+def test_histograms_merge_and_weigh(closed):
+    parts = pd.concat([resolution.histogram(closed[:700]), resolution.histogram(closed[700:])])
+    merged = parts.groupby(level=[0, 1, 2]).sum()
+    pd.testing.assert_series_equal(merged, resolution.histogram(closed))
+
+    weighted = resolution.histogram(closed.assign(count=2))
+    pd.testing.assert_series_equal(weighted, 2 * resolution.histogram(closed))
+    expected = brute_force(pd.concat([closed, closed]), "Severity")
+    got = resolution.percentiles(weighted, ["Severity"])
+    pd.testing.assert_frame_equal(got.sort_index(), expected.sort_index(), check_dtype=False, check_names=False)
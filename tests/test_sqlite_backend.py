@@ -0,0 +1,30 @@
+import pytest
+
+import labels
+import main
+import sqlite_backend
+from compare import assert_same_aggregates
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("sqlite") / "issues.sqlite")
+    sqlite_backend.load(path, main.CSV_FILE, key=main.cache_key(), chunksize=50)
+    return path
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return main.load_issues(main.CSV_FILE, main.today_date)
+
+
+# The aggregates computed in SQL are those of the pandas pipeline, for all issues and for a label scope
+@pytest.mark.parametrize("selected", [[], ["Anchore"], ["APIFuzztest"]])
+def test_query_aggregates_match_pandas(database, frames, selected):
+    frames = [df[labels.LabelIndex(df["Labels"]).mask(all_of=selected)] for df in frames] if selected else frames
+    got = sqlite_backend.query_aggregates(database, main.SCOPE_LABELS + selected, main.today_date)
+    assert_same_aggregates(got, main.issue_aggregates(*frames))
+
+
+def test_load_skips_a_fresh_database(database):
+    assert not sqlite_backend.load(database, main.CSV_FILE, key=main.cache_key())
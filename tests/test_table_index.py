@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import table_index
+
+
+@pytest.fixture
+def issues():
+    rng = np.random.default_rng(6)
+    n = 300
+    return pd.DataFrame(
+        {
+            "Git Issue Id": rng.permutation(np.arange(1000, 1000 + n)),
+            "Title": rng.choice(["Nessus: Issue", "ZAP: Issue", "APIFuzz: Issue", "Anchore: fuzz"], n),
+            "AssigneeName": pd.Categorical(rng.choice(["Zenith", "Alice", "Bob", "No Assignee"], n)),
+            "Severity": pd.Categorical(rng.choice(["Critical", "Major", "Minor"], n), ["Critical", "Major", "Minor"]),
+            "Days": rng.integers(0, 30, n).astype(float),
+        },
+        index=rng.permutation(n) * 7,
+    )
+
+
+SORTS = [
+    [],
+    [{"column_id": "Git Issue Id", "direction": "asc"}],
+    [{"column_id": "Title", "direction": "desc"}],
+    [{"column_id": "AssigneeName", "direction": "asc"}],
+    [{"column_id": "AssigneeName", "direction": "desc"}],
+    [{"column_id": "Severity", "direction": "desc"}],
+    [{"column_id": "Days", "direction": "desc"}],
+    [{"column_id": "Severity", "direction": "asc"}, {"column_id": "Days", "direction": "desc"}],
+]
+
+# filter_query of the DataTable and the rows it selects
+FILTERS = {
+    "": lambda df: np.ones(len(df), dtype=bool),
+    "{Severity} = Major": lambda df: df["Severity"].astype(str) == "Major",
+    "{Severity} eq 'Major' && {Title} contains fuzz": lambda df: (df["Severity"].astype(str) == "Major")
+    & df["Title"].str.contains("fuzz", regex=False),
+    "{Days} >= 10 && {Days} < 20": lambda df: (df["Days"] >= 10) & (df["Days"] < 20),
+    "{Days} > x": lambda df: np.zeros(len(df), dtype=bool),
+    "{AssigneeName} != Zenith": lambda df: df["AssigneeName"].astype(str) != "Zenith",
+    "{Title} datestartswith ZAP": lambda df: df["Title"].str.startswith("ZAP"),
+    "{Unknown} = 1 && {Days} le 3": lambda df: df["Days"] <= 3,
+}
+
+
+# Every page of the presorted, filtered rows is the page pandas gives by filtering and sorting the whole frame
+@pytest.mark.parametrize("sort_by", SORTS)
+@pytest.mark.parametrize("filter_query", list(FILTERS))
+def test_pages_match_pandas(issues, sort_by, filter_query):
+    index = table_index.TableIndex(issues)
+    expected = issues.reset_index(drop=True)
+    expected = expected[np.asarray(FILTERS[filter_query](expected))]
+    if sort_by:
+        by = [s["column_id"] for s in sort_by]
+        expected = expected.sort_values(by, ascending=[s["direction"] == "asc" for s in sort_by], kind="mergesort")
+
+    page_size = 25
+    page_count = max(1, -(-len(expected) // page_size))
+    for page_current in range(page_count + 1):
+        page, count = index.page(page_current, page_size, sort_by, filter_query)
+        assert count == page_count
+        start = min(page_current, page_count - 1) * page_size
+        pd.testing.assert_frame_equal(page, expected.iloc[start : start + page_size])
+
+
+# The index of a (column, value) subset is kept until another frame is published
+def test_table_index_cache(issues):
+    first = table_index.table_index(issues, "Severity", "Major")
+    assert table_index.table_index(issues, "Severity", "Major") is first
+    assert (first.df["Severity"] == "Major").all()
+    assert table_index.table_index(issues.copy(), "Severity", "Major") is not first
@@ -0,0 +1,101 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import timeseries
+
+
+@pytest.fixture
+def daily():
+    rng = np.random.default_rng(1)
+    days = pd.to_datetime("2019-01-01") + pd.to_timedelta(np.sort(rng.choice(900, 400, replace=False)), unit="D")
+    rows = [(day, state) for day in days for state in ("opened", "closed") if rng.random() < 0.7]
+    index = pd.MultiIndex.from_tuples(rows, names=["IssueCreatedAt", "State"])
+    counts = rng.integers(0, 5, len(rows))
+    return pd.Series(counts, index=index)
+
+
+# Reference Largest-Triangle-Three-Buckets, point by point as in Steinarsson's thesis
+def reference_lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start, avg_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) / 2
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    return kept + [n - 1]
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 4), (100, 7), (1000, 50), (5000, 2000), (5001, 3), (50, 50), (50, 2)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n + threshold)
+    x = np.cumsum(rng.integers(1, 5, n)).astype(float)
+    y = rng.normal(size=n).cumsum()
+    assert list(timeseries.lttb(x, y, threshold)) == reference_lttb(list(x), list(y), threshold)
+
+
+# Days keep the dates with issues, weeks (ending on Sunday) and months add up every day of their period
+def test_rollups_match_brute_force(daily):
+    rolled = timeseries.rollups(daily)
+    periods = {
+        "W": lambda day: day + datetime.timedelta(days=6 - day.weekday()),
+        "M": lambda day: day + pd.offsets.MonthEnd(0),
+    }
+    for state in ("opened", "closed"):
+        series = daily.xs(state, level=1)
+        expected_days = {day: count for day, count in series.items() if count != 0}
+        assert rolled["D"][state].to_dict() == expected_days
+
+        for freq, period in periods.items():
+            sums = {}
+            for day, count in expected_days.items():
+                sums[period(day)] = sums.get(period(day), 0) + count
+            got = rolled[freq][state]
+            assert {key: value for key, value in got.items() if value} == {k: v for k, v in sums.items() if v}
+            assert got.index.min() == min(sums) and got.index.max() == max(sums)
+            assert got.sum() == series.sum()
+
+
+# The finest rollup within max_points points is served, else the coarsest one downsampled to max_points
+def test_window_series(daily):
+    rolled = timeseries.rollups(daily)
+    label, series = timeseries.window_series(rolled, max_points=1000)
+    assert label == "day"
+
+    label, series = timeseries.window_series(rolled, max_points=200)
+    assert label == "week"
+    assert all(len(s) == len(rolled["W"][state]) for state, s in series.items())
+
+    start, end = pd.Timestamp("2019-03-01"), pd.Timestamp("2019-05-31")
+    label, series = timeseries.window_series(rolled, start, end, max_points=100)
+    assert label == "day"
+    for state, s in series.items():
+        assert s.equals(rolled["D"][state].loc[start:end])
+
+    label, series = timeseries.window_series(rolled, max_points=10)
+    assert label == "month"
+    for state, s in series.items():
+        month = rolled["M"][state]
+        assert len(s) == min(10, len(month))
+        assert s.index[0] == month.index[0] and s.index[-1] == month.index[-1]
+
+
+def test_relayout_window():
+    assert timeseries.relayout_window(None) is False
+    assert timeseries.relayout_window({"yaxis.range[0]": 1, "yaxis.range[1]": 2}) is False
+    assert timeseries.relayout_window({"xaxis.autorange": True}) is None
+    window = (pd.Timestamp("2020-01-01"), pd.Timestamp("2020-02-01 12:00"))
+    assert timeseries.relayout_window({"xaxis.range": ["2020-01-01", "2020-02-01 12:00"]}) == window
+    assert timeseries.relayout_window({"xaxis.range[0]": "2020-01-01", "xaxis.range[1]": "2020-02-01 12:00"}) == window
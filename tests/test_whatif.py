@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+import whatif
+
+
+@pytest.fixture(scope="module")
+def frames():
+    security_data, df_open, df_close = main.load_issues(main.CSV_FILE, main.today_date)
+    return df_open, df_close
+
+
+# Counts per severity and target of the dashboard's own classification under the given thresholds
+def brute_force(df_open, df_close, targets):
+    open_targets = main.classify_open(df_open["bussinessDays"], df_open["Severity"], targets)
+    closed_targets = main.classify_closed(df_close["days_to_KPI_target"], df_close["Severity"], targets)
+    counts = pd.concat(
+        [
+            pd.crosstab(df_open["Severity"].astype(str), open_targets),
+            pd.crosstab(df_close["Severity"].astype(str), closed_targets),
+        ],
+        axis=1,
+    )
+    columns = main.OPEN_TARGETS + main.CLOSED_TARGETS
+    return counts.reindex(index=list(main.KPI_TARGETS), columns=columns).fillna(0).astype(np.int64)
+
+
+def random_targets(rng, fractional):
+    targets = {}
+    for severity in main.KPI_TARGETS:
+        warn = rng.integers(0, 40) + (rng.random() if fractional else 0)
+        targets[severity] = (warn, warn + rng.integers(0, 60) + (rng.random() if fractional else 0))
+    return targets
+
+
+# Binary searches over the sorted days count the issues classify_open and classify_closed would put in every target
+def test_counts_match_classification(frames):
+    df_open, df_close = frames
+    simulator = whatif.TargetSimulator(df_open, df_close)
+    rng = np.random.default_rng(9)
+    cases = [dict(main.KPI_TARGETS)] + [random_targets(rng, fractional) for fractional in [False, True] * 20]
+    for targets in cases:
+        expected = brute_force(df_open, df_close, targets)
+        pd.testing.assert_frame_equal(simulator.counts(targets), expected, check_names=False, obj=str(targets))
+
+
+# A simulator over some of the rows counts like one built from those rows, severities without thresholds get none
+def test_select_matches_subset(frames):
+    df_open, df_close = frames
+    simulator = whatif.TargetSimulator(df_open, df_close)
+    rng = np.random.default_rng(10)
+    open_picked = rng.random(len(df_open)) < 0.4
+    close_picked = rng.random(len(df_close)) < 0.6
+    targets = random_targets(rng, True)
+
+    subset = simulator.select(open_picked, close_picked)
+    expected = brute_force(df_open[open_picked], df_close[close_picked], targets)
+    pd.testing.assert_frame_equal(subset.counts(targets), expected, check_names=False)
+
+    partial = {severity: targets[severity] for severity in list(targets)[:2]}
+    counts = subset.counts(partial)
+    assert (counts.iloc[2:] == 0).all().all()
+    pd.testing.assert_frame_equal(counts.iloc[:2], expected.iloc[:2], check_names=False)
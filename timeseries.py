@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+# Most points sent to the browser per trace of a time series chart
+MAX_POINTS = 2000
+
+# Rollup resolutions from finest to coarsest as (pandas frequency, label)
+RESOLUTIONS = [("D", "day"), ("W", "week"), ("M", "month")]
+
+
+# Per day, week and month counts of every state of a daily (date, state) count Series.
+# Days keep only the dates that have issues, weeks and months are complete.
+def rollups(daily):
+    states = daily.index.get_level_values(1).unique()
+    result = {}
+    for freq, _ in RESOLUTIONS:
+        result[freq] = {}
+        for state in states:
+            series = daily.xs(state, level=1)
+            series = series[series != 0].sort_index()
+            result[freq][state] = series if freq == "D" else series.resample(freq).sum()
+    return result
+
+
+# Largest-Triangle-Three-Buckets downsampling of (x, y) to at most threshold points.
+# Keeps the first and last point and, per bucket, the point spanning the largest triangle with its neighbours,
+# so peaks and dips survive where plain averaging would flatten them. Returns the positions of the kept points.
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the last bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_end = max(next_end, end + 1)
+        cx, cy = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+# Series of every state for the window [start, end] (None for the whole range): the finest rollup with at most
+# max_points points per state, or the coarsest one downsampled with LTTB. Returns the resolution label and the series.
+def window_series(rolled, start=None, end=None, max_points=MAX_POINTS):
+    for freq, label in RESOLUTIONS:
+        series = {state: s.loc[start:end] for state, s in rolled[freq].items()}
+        if all(len(s) <= max_points for s in series.values()):
+            return label, series
+    downsampled = {}
+    for state, s in series.items():
+        kept = lttb(s.index.values.astype(np.int64), s.values, max_points)
+        downsampled[state] = s.iloc[kept]
+    return label, downsampled
+
+
+# Visible x range of a Plotly relayoutData event as (start, end) timestamps, None when the whole range is shown
+# and False when the event did not touch the x axis (e.g. a y axis zoom)
+def relayout_window(relayout):
+    relayout = relayout or {}
+    if relayout.get("xaxis.autorange"):
+        return None
+    if "xaxis.range" in relayout:
+        start, end = relayout["xaxis.range"]
+    elif "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        start, end = relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    else:
+        return False
+    return pd.Timestamp(start), pd.Timestamp(end)
@@ -0,0 +1,55 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+# Business days of the rows of every severity, sorted, with the row each entry comes from.
+# Rows without days or of other severities are left out, as classify_open and classify_closed leave them unclassified.
+def sorted_days(days, severity, severities):
+    days = np.asarray(days, dtype=float)
+    codes = pd.Categorical(severity, categories=severities).codes
+    rows = np.flatnonzero(~np.isnan(days) & (codes >= 0))
+    rows = rows[np.lexsort((days[rows], codes[rows]))]
+    bounds = np.searchsorted(codes[rows], np.arange(len(severities) + 1))
+    return {
+        severity: (days[rows[start:stop]], rows[start:stop])
+        for severity, start, stop in zip(severities, bounds[:-1], bounds[1:])
+    }
+
+
+# What-if simulator of the KPI targets: the business days of the open and closed issues of every severity are sorted
+# once, so that the open normal / about_to_violate / violated and closed hit / miss counts under any (warn, limit)
+# thresholds are a few binary searches instead of re-classifying every issue.
+class TargetSimulator:
+    def __init__(self, df_open, df_close, severities=None):
+        self.severities = list(main.KPI_TARGETS) if severities is None else list(severities)
+        self.open = sorted_days(df_open["bussinessDays"], df_open["Severity"], self.severities)
+        self.closed = sorted_days(df_close["days_to_KPI_target"], df_close["Severity"], self.severities)
+
+    # Simulator over the picked rows of df_open and df_close (boolean arrays), the entries stay sorted
+    def select(self, open_picked, close_picked):
+        subset = copy.copy(self)
+        subset.open = {s: (days[open_picked[rows]], rows[open_picked[rows]]) for s, (days, rows) in self.open.items()}
+        subset.closed = {
+            s: (days[close_picked[rows]], rows[close_picked[rows]]) for s, (days, rows) in self.closed.items()
+        }
+        return subset
+
+    # Issues per severity and target under the given (warn, limit) thresholds per severity, classified like
+    # classify_open and classify_closed. Severities without thresholds get no counts.
+    def counts(self, targets):
+        result = np.zeros((len(self.severities), len(main.OPEN_TARGETS + main.CLOSED_TARGETS)), dtype=np.int64)
+        for row, severity in enumerate(self.severities):
+            if severity not in targets:
+                continue
+            warn, limit = targets[severity]
+            days = self.open[severity][0]
+            normal = np.searchsorted(days, warn, side="left")
+            within = np.searchsorted(days, limit, side="right")
+            closed = self.closed[severity][0]
+            hit = np.searchsorted(closed, limit, side="right")
+            result[row] = [normal, within - normal, len(days) - within, hit, len(closed) - hit]
+        return pd.DataFrame(result, index=self.severities, columns=main.OPEN_TARGETS + main.CLOSED_TARGETS)